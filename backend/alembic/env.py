@@ -27,6 +27,7 @@ load_dotenv(env_file, override=True)
 # -----------------------------
 from bdns_core.db.base import Base
 import bdns_core.db.models  # Importar módulo para registrar todos los modelos
+from bdns_portal.rollup.tables import metadata as rollup_metadata
 
 # -----------------------------
 # Alembic Config object
@@ -36,7 +37,7 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-target_metadata = Base.metadata
+target_metadata = [Base.metadata, rollup_metadata]
 
 # Excluir tablas de PostGIS del autogenerate
 EXCLUDE_TABLES = {"spatial_ref_sys"}
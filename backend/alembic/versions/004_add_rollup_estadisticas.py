@@ -0,0 +1,78 @@
+"""add rollup tables for estadisticas
+
+Tablas de agregados precalculados sobre bdns.concesion que alimentan
+los resolvers de estadísticas:
+- rollup_concesion_mensual: (anio, mes, organo, tipo_entidad, region, regimen)
+- rollup_beneficiarios_anual: beneficiarios distintos por anio y region
+
+Se rellenan con `python -m bdns_portal.rollup` tras cada carga ETL.
+
+Revision ID: 004_rollup
+Revises: 003_conv_etl
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004_rollup'
+down_revision: Union[str, None] = '003_conv_etl'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear tablas de rollup."""
+    op.create_table(
+        'rollup_concesion_mensual',
+        sa.Column('anio', sa.SmallInteger(), nullable=False),
+        sa.Column('mes', sa.SmallInteger(), nullable=False),
+        sa.Column('organo_id', sa.Uuid(), nullable=True),
+        sa.Column('tipo_entidad', sa.String(), nullable=True),
+        sa.Column('region_id', sa.Uuid(), nullable=True),
+        sa.Column('regimen', sa.String(), nullable=True),
+        sa.Column('numero_concesiones', sa.BigInteger(), nullable=False),
+        sa.Column('importe_total', sa.Numeric(), nullable=False),
+        schema='bdns'
+    )
+    # NULLS NOT DISTINCT (PostgreSQL 15) para que la celda sea única
+    # aunque alguna dimensión sea desconocida
+    op.execute("""
+        CREATE UNIQUE INDEX uq_rollup_concesion_mensual_celda
+        ON bdns.rollup_concesion_mensual
+        (anio, mes, organo_id, tipo_entidad, region_id, regimen)
+        NULLS NOT DISTINCT
+    """)
+    op.create_index('ix_rollup_mensual_organo', 'rollup_concesion_mensual', ['organo_id', 'anio'], unique=False, schema='bdns')
+    op.create_index('ix_rollup_mensual_region', 'rollup_concesion_mensual', ['region_id', 'anio'], unique=False, schema='bdns')
+    op.create_index('ix_rollup_mensual_tipo_entidad', 'rollup_concesion_mensual', ['tipo_entidad', 'anio'], unique=False, schema='bdns')
+
+    op.create_table(
+        'rollup_beneficiarios_anual',
+        sa.Column('anio', sa.SmallInteger(), nullable=False),
+        sa.Column('region_id', sa.Uuid(), nullable=True),
+        sa.Column('es_total_anual', sa.Boolean(), nullable=False),
+        sa.Column('numero_beneficiarios', sa.BigInteger(), nullable=False),
+        schema='bdns'
+    )
+    op.execute("""
+        CREATE UNIQUE INDEX uq_rollup_beneficiarios_anual_celda
+        ON bdns.rollup_beneficiarios_anual
+        (anio, region_id, es_total_anual)
+        NULLS NOT DISTINCT
+    """)
+
+    op.execute("""
+        COMMENT ON TABLE bdns.rollup_concesion_mensual IS 'Agregados de concesiones por mes, órgano, tipo de entidad, región y régimen';
+        COMMENT ON TABLE bdns.rollup_beneficiarios_anual IS 'Beneficiarios distintos por año y región (es_total_anual = total del año)';
+    """)
+
+
+def downgrade() -> None:
+    """Eliminar tablas de rollup."""
+    op.drop_table('rollup_beneficiarios_anual', schema='bdns')
+    op.drop_table('rollup_concesion_mensual', schema='bdns')
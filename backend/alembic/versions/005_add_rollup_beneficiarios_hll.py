@@ -0,0 +1,81 @@
+"""add HyperLogLog beneficiary sketches
+
+Sustituye rollup_beneficiarios_anual (recuentos exactos no combinables)
+por sketches HyperLogLog de beneficiarios distintos por (anio, region,
+organo). Los sketches se combinan con hll_union_agg para cualquier
+combinación de filtros; error estándar relativo ~0.81% (log2m=14).
+
+Usa la extensión postgresql-hll si el servidor la tiene instalada
+(pg_available_extensions). Si no, no se crean los sketches y los
+recuentos de beneficiarios son siempre exactos sobre bdns.concesion.
+
+Revision ID: 005_rollup_hll
+Revises: 004_rollup
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from bdns_portal.rollup.tables import HLL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005_rollup_hll'
+down_revision: Union[str, None] = '004_rollup'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear sketches HLL y eliminar el recuento exacto anual."""
+    disponible = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'hll'")
+    ).scalar()
+
+    if disponible:
+        op.execute("CREATE EXTENSION IF NOT EXISTS \"hll\"")
+
+        op.create_table(
+            'rollup_beneficiarios_hll',
+            sa.Column('anio', sa.SmallInteger(), nullable=False),
+            sa.Column('region_id', sa.Uuid(), nullable=True),
+            sa.Column('organo_id', sa.Uuid(), nullable=True),
+            sa.Column('beneficiarios', HLL(), nullable=False),
+            schema='bdns'
+        )
+        op.execute("""
+            CREATE UNIQUE INDEX uq_rollup_beneficiarios_hll_celda
+            ON bdns.rollup_beneficiarios_hll
+            (anio, region_id, organo_id)
+            NULLS NOT DISTINCT
+        """)
+
+        op.execute("""
+            COMMENT ON TABLE bdns.rollup_beneficiarios_hll IS 'Sketches HyperLogLog de beneficiarios distintos por año, región y órgano';
+        """)
+
+    op.drop_table('rollup_beneficiarios_anual', schema='bdns')
+
+
+def downgrade() -> None:
+    """Restaurar el recuento exacto anual."""
+    op.create_table(
+        'rollup_beneficiarios_anual',
+        sa.Column('anio', sa.SmallInteger(), nullable=False),
+        sa.Column('region_id', sa.Uuid(), nullable=True),
+        sa.Column('es_total_anual', sa.Boolean(), nullable=False),
+        sa.Column('numero_beneficiarios', sa.BigInteger(), nullable=False),
+        schema='bdns'
+    )
+    op.execute("""
+        CREATE UNIQUE INDEX uq_rollup_beneficiarios_anual_celda
+        ON bdns.rollup_beneficiarios_anual
+        (anio, region_id, es_total_anual)
+        NULLS NOT DISTINCT
+    """)
+
+    op.execute("DROP TABLE IF EXISTS bdns.rollup_beneficiarios_hll")
+    op.execute("DROP EXTENSION IF EXISTS \"hll\"")
@@ -0,0 +1,58 @@
+"""add beneficiario-year activity rollup
+
+rollup_actividad_beneficiario: concesiones, importe y primera/última
+fecha por (beneficiario, anio). Recurrentes, concentración e historial
+por beneficiario pasan a ser recorridos de índice sobre esta tabla.
+
+Revision ID: 006_rollup_actividad
+Revises: 005_rollup_hll
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006_rollup_actividad'
+down_revision: Union[str, None] = '005_rollup_hll'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear rollup de actividad por beneficiario y año."""
+    op.create_table(
+        'rollup_actividad_beneficiario',
+        sa.Column('beneficiario_id', sa.Uuid(), nullable=False),
+        sa.Column('anio', sa.SmallInteger(), nullable=False),
+        sa.Column('tipo_entidad', sa.String(), nullable=True),
+        sa.Column('numero_concesiones', sa.BigInteger(), nullable=False),
+        sa.Column('importe_total', sa.Numeric(), nullable=False),
+        sa.Column('primera_concesion', sa.Date(), nullable=False),
+        sa.Column('ultima_concesion', sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint('beneficiario_id', 'anio'),
+        schema='bdns'
+    )
+    # Rankings por año y globales (ORDER BY ... DESC LIMIT n)
+    op.execute("""
+        CREATE INDEX ix_rollup_actividad_anio_numero
+        ON bdns.rollup_actividad_beneficiario (anio, numero_concesiones DESC);
+        CREATE INDEX ix_rollup_actividad_anio_importe
+        ON bdns.rollup_actividad_beneficiario (anio, importe_total DESC);
+        CREATE INDEX ix_rollup_actividad_numero
+        ON bdns.rollup_actividad_beneficiario (numero_concesiones DESC);
+        CREATE INDEX ix_rollup_actividad_importe
+        ON bdns.rollup_actividad_beneficiario (importe_total DESC);
+    """)
+
+    op.execute("""
+        COMMENT ON TABLE bdns.rollup_actividad_beneficiario IS 'Concesiones, importe y primera/última fecha por beneficiario y año';
+    """)
+
+
+def downgrade() -> None:
+    """Eliminar rollup de actividad por beneficiario."""
+    op.drop_table('rollup_actividad_beneficiario', schema='bdns')
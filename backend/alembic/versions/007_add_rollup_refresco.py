@@ -0,0 +1,54 @@
+"""add rollup refresh watermark
+
+rollup_refresco guarda cada refresco de rollups (completo o incremental)
+con su marca de agua, duración y filas escritas. Los índices sobre
+created_at / updated_at de bdns.concesion permiten localizar las
+concesiones nuevas o modificadas sin recorrer la tabla.
+
+Revision ID: 007_rollup_refresco
+Revises: 006_rollup_actividad
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007_rollup_refresco'
+down_revision: Union[str, None] = '006_rollup_actividad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear historial de refrescos e índices de modificación."""
+    op.create_table(
+        'rollup_refresco',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tipo', sa.String(), nullable=False),
+        sa.Column('marca_agua', sa.DateTime(), nullable=True),
+        sa.Column('ejecutado_en', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('duracion_s', sa.Float(), nullable=False),
+        sa.Column('concesiones', sa.BigInteger(), nullable=True),
+        sa.Column('filas', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        schema='bdns'
+    )
+
+    op.create_index('ix_concesion_created_at', 'concesion', ['created_at'], unique=False, schema='bdns')
+    op.create_index('ix_concesion_updated_at', 'concesion', ['updated_at'], unique=False, schema='bdns')
+
+    op.execute("""
+        COMMENT ON TABLE bdns.rollup_refresco IS 'Historial de refrescos de rollups: marca de agua, duración y filas escritas';
+    """)
+
+
+def downgrade() -> None:
+    """Eliminar historial de refrescos e índices de modificación."""
+    op.drop_index('ix_concesion_updated_at', table_name='concesion', schema='bdns')
+    op.drop_index('ix_concesion_created_at', table_name='concesion', schema='bdns')
+    op.drop_table('rollup_refresco', schema='bdns')
@@ -0,0 +1,33 @@
+"""add concesion keyset index
+
+Índice (fecha_concesion, id) sobre bdns.concesion para la paginación por
+cursor en el orden por defecto (fecha_concesion DESC, id DESC), que lo
+recorre hacia atrás. Al crearse sobre la tabla particionada se propaga a
+cada partición, de modo que tras la poda por fecha cada página es un
+recorrido de índice acotado por LIMIT en lugar de un ordenamiento.
+
+Revision ID: 008_concesion_keyset
+Revises: 007_rollup_refresco
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008_concesion_keyset'
+down_revision: Union[str, None] = '007_rollup_refresco'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear índice de paginación por cursor."""
+    op.create_index('ix_concesion_fecha_id', 'concesion', ['fecha_concesion', 'id'], unique=False, schema='bdns')
+
+
+def downgrade() -> None:
+    """Eliminar índice de paginación por cursor."""
+    op.drop_index('ix_concesion_fecha_id', table_name='concesion', schema='bdns')
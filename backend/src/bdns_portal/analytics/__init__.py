@@ -0,0 +1,4 @@
+# bdns_portal/analytics/__init__.py
+from .motor import motor_estadisticas, MotorEstadisticas, Grupos
+
+__all__ = ["motor_estadisticas", "MotorEstadisticas", "Grupos"]
@@ -0,0 +1,304 @@
+# bdns_portal/analytics/motor.py
+"""
+Motor de estadisticas en memoria.
+
+Carga las columnas de hechos de bdns.concesion en arrays NumPy
+codificados por diccionario y resuelve agrupaciones, top-N y acumulados
+con bincount / argpartition, sin ida y vuelta a PostgreSQL.
+
+Se activa por despliegue con ESTADISTICAS_MOTOR=memoria (requiere el
+extra `memoria`: pip install bdns-portal[memoria]).
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bdns_core.db.models import Concesion as ConcesionModel
+from bdns_core.db.models import Beneficiario as BeneficiarioModel
+from bdns_core.db.models import Convocatoria as ConvocatoriaModel
+from bdns_core.db.models import FormaJuridica as FormaJuridicaModel
+from bdns_core.db.models import RegimenAyuda as RegimenAyudaModel
+from bdns_core.logging import get_logger
+
+try:
+    import numpy as np
+except ImportError:  # extra opcional
+    np = None
+
+logger = get_logger(__name__)
+
+# Columnas codificadas por diccionario (valor original -> entero)
+DIMENSIONES_CODIFICADAS = ("beneficiario", "organo", "region", "tipo_entidad", "regimen")
+
+
+class Diccionario:
+    """Codificacion valor <-> entero de una dimension. None es un valor mas."""
+
+    def __init__(self):
+        self.valores: list = []
+        self.codigos: dict = {}
+
+    def codificar(self, valor) -> int:
+        codigo = self.codigos.get(valor)
+        if codigo is None:
+            codigo = len(self.valores)
+            self.codigos[valor] = codigo
+            self.valores.append(valor)
+        return codigo
+
+    def codigo(self, valor) -> Optional[int]:
+        return self.codigos.get(valor)
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+
+class Grupos:
+    """Resultado de una agrupacion: una posicion por grupo."""
+
+    def __init__(self, motor: "MotorEstadisticas", dimensiones, codigos, inversa, filas, numero, importe):
+        self.motor = motor
+        self.dimensiones = dimensiones
+        self.codigos = codigos          # un array de codigos por dimension
+        self.inversa = inversa          # grupo de cada fila seleccionada
+        self.filas = filas              # indices de las filas seleccionadas
+        self.numero = numero
+        self.importe = importe
+
+    def __len__(self) -> int:
+        return len(self.numero)
+
+    def valores(self, dimension: str) -> list:
+        """Valores decodificados de una dimension, uno por grupo."""
+        codigos = self.codigos[self.dimensiones.index(dimension)]
+        if dimension in DIMENSIONES_CODIFICADAS:
+            valores = self.motor.diccionarios[dimension].valores
+            return [valores[c] for c in codigos]
+        return [int(c) for c in codigos]
+
+    def orden(self, por: str = "importe", limite: Optional[int] = None) -> "np.ndarray":
+        """Indices de grupo ordenados desc. Con limite usa argpartition."""
+        metrica = self.importe if por == "importe" else self.numero
+        if limite is not None and limite < len(metrica):
+            top = np.argpartition(-metrica, limite - 1)[:limite]
+            return top[np.argsort(-metrica[top], kind="stable")]
+        return np.argsort(-metrica, kind="stable")
+
+    def beneficiarios_distintos(self) -> "np.ndarray":
+        """Numero exacto de beneficiarios distintos por grupo."""
+        beneficiario = self.motor.columnas["beneficiario"][self.filas].astype(np.int64)
+        pares = np.unique(self.inversa.astype(np.int64) * len(self.motor.diccionarios["beneficiario"]) + beneficiario)
+        grupo = pares // len(self.motor.diccionarios["beneficiario"])
+        return np.bincount(grupo, minlength=len(self))
+
+    def fecha_min(self) -> "np.ndarray":
+        fechas = self.motor.columnas["fecha"][self.filas].astype(np.int64)
+        resultado = np.full(len(self), np.iinfo(np.int64).max)
+        np.minimum.at(resultado, self.inversa, fechas)
+        return resultado.astype("datetime64[D]")
+
+    def fecha_max(self) -> "np.ndarray":
+        fechas = self.motor.columnas["fecha"][self.filas].astype(np.int64)
+        resultado = np.full(len(self), np.iinfo(np.int64).min)
+        np.maximum.at(resultado, self.inversa, fechas)
+        return resultado.astype("datetime64[D]")
+
+
+class MotorEstadisticas:
+    def __init__(self):
+        self.columnas: Dict[str, "np.ndarray"] = {}
+        self.diccionarios: Dict[str, Diccionario] = {}
+        self.cargado_en: Optional[float] = None
+        self.duracion_carga: Optional[float] = None
+        # Version de datos (cache) de la carga y la ultima vista: si no
+        # coinciden el motor no responde y los resolvers usan los rollups
+        self.version: Optional[int] = None
+        self.version_vigente: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def activo(self) -> bool:
+        return bool(self.columnas) and self.actualizado
+
+    @property
+    def actualizado(self) -> bool:
+        return self.version is None or self.version_vigente is None or self.version == self.version_vigente
+
+    def notificar_version(self, version: int) -> bool:
+        """Anota la version de datos vigente; True si el motor queda obsoleto."""
+        self.version_vigente = version
+        return bool(self.columnas) and not self.actualizado
+
+    @property
+    def filas(self) -> int:
+        return len(self.columnas["importe"]) if self.columnas else 0
+
+    async def cargar(self, db: AsyncSession, lote: int = 100_000, version: Optional[int] = None) -> None:
+        """Carga (o recarga) las columnas de hechos desde PostgreSQL.
+
+        Las columnas nuevas sustituyen a las anteriores de golpe al terminar,
+        asi que las consultas concurrentes nunca ven una carga a medias.
+        version es la version de datos leida antes de empezar la carga.
+        """
+        if np is None:
+            raise RuntimeError("ESTADISTICAS_MOTOR=memoria requiere numpy (extra 'memoria')")
+
+        async with self._lock:
+            inicio = time.monotonic()
+            diccionarios = {d: Diccionario() for d in DIMENSIONES_CODIFICADAS}
+            trozos: Dict[str, list] = {c: [] for c in (
+                "fecha", "importe_nominal", "importe_equivalente", *DIMENSIONES_CODIFICADAS
+            )}
+
+            stmt = (
+                select(
+                    ConcesionModel.fecha_concesion,
+                    ConcesionModel.importe_nominal,
+                    ConcesionModel.importe_equivalente,
+                    ConcesionModel.beneficiario_id,
+                    ConvocatoriaModel.organo_id,
+                    ConcesionModel.region_id,
+                    FormaJuridicaModel.tipo,
+                    RegimenAyudaModel.descripcion_norm
+                )
+                .select_from(ConcesionModel)
+                .join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
+                .outerjoin(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
+                .outerjoin(FormaJuridicaModel, BeneficiarioModel.forma_juridica_id == FormaJuridicaModel.id)
+                .outerjoin(RegimenAyudaModel, ConcesionModel.regimen_ayuda_id == RegimenAyudaModel.id)
+                .execution_options(yield_per=lote)
+            )
+
+            stream = await db.stream(stmt)
+            async for particion in stream.partitions(lote):
+                fecha, nominal, equivalente, beneficiario, organo, region, tipo, regimen = zip(*particion)
+                trozos["fecha"].append(np.array(fecha, dtype="datetime64[D]"))
+                trozos["importe_nominal"].append(np.array(nominal, dtype=np.float64))
+                trozos["importe_equivalente"].append(np.array(equivalente, dtype=np.float64))
+                for nombre, valores in (
+                    ("beneficiario", beneficiario), ("organo", organo), ("region", region),
+                    ("tipo_entidad", tipo), ("regimen", regimen)
+                ):
+                    codificar = diccionarios[nombre].codificar
+                    trozos[nombre].append(np.fromiter((codificar(v) for v in valores), dtype=np.int32, count=len(valores)))
+
+            columnas = {
+                nombre: np.concatenate(partes) if partes else np.empty(0)
+                for nombre, partes in trozos.items()
+            }
+            columnas["fecha"] = columnas["fecha"].astype("datetime64[D]")
+            columnas["anio"] = (columnas["fecha"].astype("datetime64[Y]").astype(np.int64) + 1970).astype(np.int16)
+            columnas["mes"] = (columnas["fecha"].astype("datetime64[M]").astype(np.int64) % 12 + 1).astype(np.int8)
+            columnas["importe"] = (
+                np.nan_to_num(columnas["importe_nominal"]) +
+                np.nan_to_num(columnas["importe_equivalente"])
+            )
+            for nombre in DIMENSIONES_CODIFICADAS:
+                columnas[nombre] = columnas[nombre].astype(np.int32)
+
+            self.columnas = columnas
+            self.diccionarios = diccionarios
+            self.version = version
+            self.cargado_en = time.time()
+            self.duracion_carga = time.monotonic() - inicio
+
+        logger.info(
+            "Motor de estadisticas cargado",
+            extra={"filas": self.filas, "duracion_s": round(self.duracion_carga, 2), "memoria": self.memoria()}
+        )
+
+    def memoria(self) -> dict:
+        """Huella de memoria aproximada en bytes, por columna y total."""
+        columnas = {nombre: int(array.nbytes) for nombre, array in self.columnas.items()}
+        # Coste aproximado de los diccionarios: entrada de dict + objeto valor
+        diccionarios = {nombre: len(d) * 200 for nombre, d in self.diccionarios.items()}
+        return {
+            "filas": self.filas,
+            "columnas": columnas,
+            "diccionarios": diccionarios,
+            "total": sum(columnas.values()) + sum(diccionarios.values()),
+        }
+
+    def mascara(
+        self,
+        anio: Optional[int] = None,
+        anio_desde: Optional[int] = None,
+        anio_hasta: Optional[int] = None,
+        **dimensiones
+    ) -> "np.ndarray":
+        """Filas que cumplen los filtros. dimensiones: tipo_entidad, organo, region, ..."""
+        mascara = np.ones(self.filas, dtype=bool)
+        anios = self.columnas["anio"]
+        if anio is not None:
+            mascara &= anios == anio
+        if anio_desde is not None:
+            mascara &= anios >= anio_desde
+        if anio_hasta is not None:
+            mascara &= anios <= anio_hasta
+        for nombre, valor in dimensiones.items():
+            if valor is None:
+                continue
+            codigo = self.diccionarios[nombre].codigo(valor)
+            if codigo is None:
+                return np.zeros(self.filas, dtype=bool)
+            mascara &= self.columnas[nombre] == codigo
+        return mascara
+
+    def agrupar(self, dimensiones: Sequence[str], mascara: "np.ndarray") -> Grupos:
+        """GROUP BY de numero de concesiones e importe sobre las filas de la mascara.
+
+        Las filas con valor desconocido (None) en alguna dimension se
+        descartan, igual que el JOIN de la consulta SQL equivalente.
+        """
+        filas = np.flatnonzero(mascara)
+        codigos = []
+        tamanos = []
+        for nombre in dimensiones:
+            columna = self.columnas[nombre][filas].astype(np.int64)
+            if nombre in DIMENSIONES_CODIFICADAS:
+                nulo = self.diccionarios[nombre].codigo(None)
+                if nulo is not None:
+                    validas = columna != nulo
+                    filas, columna = filas[validas], columna[validas]
+                    codigos = [c[validas] for c in codigos]
+                tamanos.append(max(len(self.diccionarios[nombre]), 1))
+            else:
+                tamanos.append(int(self.columnas[nombre].max()) + 1 if self.filas else 1)
+            codigos.append(columna)
+
+        if not len(filas):
+            vacio = np.empty(0, dtype=np.int64)
+            return Grupos(self, list(dimensiones), [vacio for _ in dimensiones], vacio, filas, vacio, np.empty(0))
+
+        clave = np.ravel_multi_index(codigos, tamanos)
+        unicas, inversa = np.unique(clave, return_inverse=True)
+        numero = np.bincount(inversa)
+        importe = np.bincount(inversa, weights=self.columnas["importe"][filas])
+        return Grupos(
+            self,
+            list(dimensiones),
+            list(np.unravel_index(unicas, tamanos)),
+            inversa,
+            filas,
+            numero,
+            importe
+        )
+
+
+def seleccionar(grupos: Grupos, indices) -> List[dict]:
+    """Filas (dict) de los grupos indicados, con dimensiones decodificadas."""
+    valores = {d: grupos.valores(d) for d in grupos.dimensiones}
+    return [
+        dict(
+            {d: valores[d][i] for d in grupos.dimensiones},
+            numero_concesiones=int(grupos.numero[i]),
+            importe_total=float(grupos.importe[i])
+        )
+        for i in indices
+    ]
+
+
+motor_estadisticas = MotorEstadisticas()
@@ -0,0 +1,5 @@
+# bdns_portal/benchmark/__init__.py
+from .escenarios import ESCENARIOS, Escenario
+from .medicion import ejecutar_benchmark, comprobar_regresiones
+
+__all__ = ["ESCENARIOS", "Escenario", "ejecutar_benchmark", "comprobar_regresiones"]
@@ -0,0 +1,80 @@
+# bdns_portal/benchmark/__main__.py
+"""
+Benchmark de la API GraphQL contra la base de datos local.
+
+Uso:
+    python -m bdns_portal.benchmark --repeticiones 50 --salida resultado.json
+    python -m bdns_portal.benchmark --base resultado.json --tolerancia 0.2
+    python -m bdns_portal.benchmark --umbrales umbrales.json --solo concesiones top_convocatorias
+
+Pensado para el dataset de python -m bdns_portal.sintetico con los
+rollups reconstruidos. Sale con código 1 si hay regresiones.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from .escenarios import escenarios_para
+from .medicion import ejecutar_benchmark, comprobar_regresiones
+
+
+def _leer_json(ruta):
+    if not ruta:
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de la API GraphQL en proceso")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--calentamiento", type=int, default=1, help="Ejecuciones descartadas por escenario")
+    parser.add_argument("--anio", type=int, default=2024, help="Año de referencia de los escenarios")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla con la que se generó el dataset sintético")
+    parser.add_argument("--solo", nargs="*", help="Escenarios a ejecutar (por defecto todos)")
+    parser.add_argument("--salida", help="Fichero JSON de resultados (por defecto stdout)")
+    parser.add_argument("--umbrales", help="Fichero JSON con umbrales por escenario")
+    parser.add_argument("--base", help="Resultado JSON previo con el que comparar")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=0.2,
+        help="Crecimiento de latencia admitido frente a la base (fracción)"
+    )
+    args = parser.parse_args()
+
+    escenarios = escenarios_para(args.anio, args.semilla)
+    if args.solo:
+        desconocidos = set(args.solo) - {e.nombre for e in escenarios}
+        if desconocidos:
+            parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+        escenarios = [e for e in escenarios if e.nombre in args.solo]
+
+    resultado = asyncio.run(ejecutar_benchmark(escenarios, args.repeticiones, args.calentamiento))
+    resultado["anio"] = args.anio
+    resultado["regresiones"] = comprobar_regresiones(
+        resultado,
+        umbrales=_leer_json(args.umbrales),
+        base=_leer_json(args.base),
+        tolerancia=args.tolerancia
+    )
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if resultado["regresiones"]:
+        for r in resultado["regresiones"]:
+            print(
+                f"REGRESION {r['escenario']} [{r['modo']}] {r['metrica']}={r['valor']} > {r['limite']} ({r['origen']})",
+                file=sys.stderr
+            )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
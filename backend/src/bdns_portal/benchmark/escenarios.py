@@ -0,0 +1,150 @@
+# bdns_portal/benchmark/escenarios.py
+"""
+Mezcla de operaciones GraphQL del benchmark.
+
+Cubre los listados paginados (convocatorias, concesiones, beneficiarios)
+y todos los campos de estadisticas. anio es el año de referencia del
+benchmark y semilla la del dataset sintético, de la que se derivan los
+ids deterministas (ver sintetico.generador).
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List
+from uuid import UUID
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    query: str
+    variables: Dict = field(default_factory=dict)
+
+
+def _uuid_sintetico(semilla: int, clave: str, i: int) -> str:
+    """Mismo id que pg_temp.uuid_det del generador."""
+    return str(UUID(hashlib.md5(f"{semilla}:{clave}:{i}".encode()).hexdigest()))
+
+
+def _escenarios(anio: int, semilla: int) -> List[Escenario]:
+    # El beneficiario 1 es el de más concesiones (cola pesada del generador)
+    beneficiario = _uuid_sintetico(semilla, "ben", 1)
+    return [
+        # ============ LISTADOS ============
+        Escenario("convocatorias", """
+            query($p: PaginationInput) {
+              convocatorias(pagination: $p) {
+                totalCount
+                edges { node { id codigoBdns titulo presupuestoTotal organo { nombre } } }
+                pageInfo { hasNextPage endCursor }
+              }
+            }
+        """, {"p": {"first": 20}}),
+        Escenario("convocatorias_abiertas", """
+            query($p: PaginationInput) {
+              convocatorias(pagination: $p, where: { abierto: true }) {
+                totalCount
+                edges { node { id codigoBdns titulo } }
+              }
+            }
+        """, {"p": {"first": 20}}),
+        Escenario("concesiones", """
+            query($p: PaginationInput) {
+              concesiones(pagination: $p) {
+                totalCount
+                edges { node { id fechaConcesion importe beneficiario { nombre } } }
+                pageInfo { hasNextPage endCursor }
+              }
+            }
+        """, {"p": {"first": 20}}),
+        Escenario("beneficiarios", """
+            query($p: PaginationInput) {
+              beneficiarios(pagination: $p) {
+                totalCount
+                edges { node { id nif nombre formaJuridica { descripcion } } }
+                pageInfo { hasNextPage endCursor }
+              }
+            }
+        """, {"p": {"first": 20}}),
+
+        # ============ ESTADÍSTICAS ============
+        Escenario("estadisticas_cubo", """
+            query($anio: Int!) {
+              estadisticas(dimensiones: [REGION, TIPO_ENTIDAD], filtros: { anio: $anio }) {
+                regionNombre tipoEntidad dimensionesAgregadas numeroConcesiones importeTotal
+              }
+            }
+        """, {"anio": anio}),
+        Escenario("estadisticas_por_tipo_entidad", """
+            query($anio: Int!) {
+              estadisticasPorTipoEntidad(filtros: { anio: $anio }) { tipoEntidad anio numeroConcesiones importeTotal }
+            }
+        """, {"anio": anio}),
+        Escenario("estadisticas_por_organo", """
+            query {
+              estadisticasPorOrgano { organoId organoNombre anio numeroConcesiones importeTotal }
+            }
+        """),
+        Escenario("concentracion_subvenciones", """
+            query {
+              concentracionSubvenciones(limite: 10) { beneficiarioNombre tipoEntidad anio importeTotal }
+            }
+        """),
+        Escenario("estadisticas_evolucion_mensual", """
+            query($anio: Int!) {
+              estadisticasEvolucionMensual(anio: $anio) { mes importeMensual acumuladoAnual porcentajeTotal }
+            }
+        """, {"anio": anio}),
+        Escenario("estadisticas_evolucion_mensual_anios", """
+            query($desde: Int!, $hasta: Int!) {
+              estadisticasEvolucionMensualAnios(anioDesde: $desde, anioHasta: $hasta) { anio meses { mes importeMensual } }
+            }
+        """, {"desde": anio - 4, "hasta": anio}),
+        Escenario("estadisticas_por_regimen", """
+            query($anio: Int!) {
+              estadisticasPorRegimen(anio: $anio) { regimen importeTotal porcentajeImporte }
+            }
+        """, {"anio": anio}),
+        Escenario("estadisticas_por_region", """
+            query($anio: Int!) {
+              estadisticasPorRegion(anio: $anio) { regionNombre importeTotal numeroBeneficiarios }
+            }
+        """, {"anio": anio}),
+        Escenario("top_convocatorias", """
+            query {
+              topConvocatorias(limite: 10) { codigoBdns titulo importeConcedido porcentajeEjecutado }
+            }
+        """),
+        Escenario("beneficiarios_recurrentes", """
+            query($anio: Int!) {
+              beneficiariosRecurrentes(anio: $anio) { beneficiarioNombre numeroConcesiones primeraConcesion }
+            }
+        """, {"anio": anio}),
+        Escenario("historial_beneficiario", """
+            query($id: UUID!) {
+              historialBeneficiario(beneficiarioId: $id) { anio numeroConcesiones importeTotal }
+            }
+        """, {"id": beneficiario}),
+        Escenario("comparativa_anual", """
+            query($base: Int!, $comparar: Int!) {
+              comparativaAnual(anioBase: $base, anioComparar: $comparar) { variacionImporte variacionBeneficiarios }
+            }
+        """, {"base": anio - 1, "comparar": anio}),
+        Escenario("comparativa_anual_serie", """
+            query($desde: Int!, $hasta: Int!) {
+              comparativaAnualSerie(anioDesde: $desde, anioHasta: $hasta) { anio totalConcedido variacionImportePorcentual }
+            }
+        """, {"desde": anio - 4, "hasta": anio}),
+        Escenario("numero_beneficiarios", """
+            query($anio: Int!) {
+              numeroBeneficiarios(filtros: { anio: $anio }) { numeroBeneficiarios exacto errorRelativo }
+            }
+        """, {"anio": anio}),
+    ]
+
+
+# Mezcla por defecto (año de referencia 2024, semilla del generador)
+ESCENARIOS = _escenarios(2024, 42)
+
+
+def escenarios_para(anio: int, semilla: int = 42) -> List[Escenario]:
+    return _escenarios(anio, semilla)
@@ -0,0 +1,233 @@
+# bdns_portal/benchmark/medicion.py
+"""
+Medición de la mezcla de operaciones contra el schema GraphQL en proceso.
+
+Cada escenario se ejecuta en tres modos: caché fría (se vacían las claves
+estadisticas:* antes de cada repetición), l2 (solo se vacía la L1 en
+proceso: lectura de Redis y decodificación) y caliente. Por ejecución se
+mide la latencia de schema.execute, con eventos del engine las sentencias
+SQL lanzadas y las filas devueltas, y del codec de la caché los bytes
+escritos y leídos y el tiempo de codificar y decodificar.
+"""
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import event
+
+from bdns_portal.cache.redis_cache import redis_cache
+from bdns_portal.core.database import get_engine
+from bdns_portal.graphql import graphql_schema as schema
+from .escenarios import Escenario
+
+MODOS = ("fria", "l2", "caliente")
+METRICAS_LATENCIA = ("p50_ms", "p95_ms", "p99_ms")
+METRICAS_BD = ("consultas", "filas")
+
+
+class ContadorConsultas:
+    """Cuenta sentencias y filas devueltas por el engine compartido.
+
+    Incluye las sesiones abiertas por agregar_por_anio, que usan el mismo
+    engine. rowcount de asyncpg sale de la etiqueta "SELECT n".
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.filas = 0
+
+    def reiniciar(self) -> None:
+        self.consultas = 0
+        self.filas = 0
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.consultas += 1
+        self.filas += max(cursor.rowcount or 0, 0)
+
+    def __enter__(self):
+        event.listen(get_engine().sync_engine, "after_cursor_execute", self._despues)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(get_engine().sync_engine, "after_cursor_execute", self._despues)
+
+
+def percentil(valores: Sequence[float], p: float) -> float:
+    """Percentil con interpolación lineal entre rangos."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    posicion = (len(ordenados) - 1) * p / 100
+    i = int(posicion)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (posicion - i)
+
+
+def _medidas_codec() -> tuple:
+    codec = redis_cache.codec
+    return (
+        codec.bytes_codificados,
+        codec.bytes_decodificados,
+        codec.segundos_codificar,
+        codec.segundos_decodificar,
+    )
+
+
+async def _ejecutar(escenario: Escenario, contador: ContadorConsultas) -> dict:
+    contador.reiniciar()
+    codec_antes = _medidas_codec()
+    inicio = time.perf_counter()
+    resultado = await schema.execute(
+        escenario.query,
+        variable_values=escenario.variables,
+        context_value={}
+    )
+    ms = (time.perf_counter() - inicio) * 1000
+    escritos, leidos, codificar, decodificar = (
+        despues - antes for despues, antes in zip(_medidas_codec(), codec_antes)
+    )
+    return {
+        "ms": ms,
+        "consultas": contador.consultas,
+        "filas": contador.filas,
+        "bytes_escritos": escritos,
+        "bytes_leidos": leidos,
+        "codificar_ms": codificar * 1000,
+        "decodificar_ms": decodificar * 1000,
+        "error": resultado.errors[0].message if resultado.errors else None
+    }
+
+
+def _resumen(ejecuciones: List[dict]) -> dict:
+    latencias = [e["ms"] for e in ejecuciones]
+    errores = [e["error"] for e in ejecuciones if e["error"]]
+    n = len(ejecuciones) or 1
+    resumen = {
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "media_ms": round(sum(latencias) / n, 3),
+        "consultas": round(sum(e["consultas"] for e in ejecuciones) / n, 2),
+        "filas": round(sum(e["filas"] for e in ejecuciones) / n, 2),
+        "bytes_escritos": round(sum(e["bytes_escritos"] for e in ejecuciones) / n, 1),
+        "bytes_leidos": round(sum(e["bytes_leidos"] for e in ejecuciones) / n, 1),
+        "codificar_ms": round(sum(e["codificar_ms"] for e in ejecuciones) / n, 4),
+        "decodificar_ms": round(sum(e["decodificar_ms"] for e in ejecuciones) / n, 4),
+        "errores": len(errores),
+    }
+    if errores:
+        resumen["primer_error"] = errores[0]
+    return resumen
+
+
+async def _iniciar_cache() -> bool:
+    """Conecta Redis si está disponible; sin Redis el modo l2 equivale al frío."""
+    try:
+        await redis_cache.init()
+        await redis_cache.client.ping()
+        return True
+    except Exception:
+        redis_cache.client = None
+        return False
+
+
+async def ejecutar_benchmark(
+    escenarios: Sequence[Escenario],
+    repeticiones: int = 20,
+    calentamiento: int = 1
+) -> dict:
+    """Ejecuta cada escenario en cada modo de MODOS y resume las medidas."""
+    cache = await _iniciar_cache()
+    resultados: Dict[str, dict] = {}
+
+    with ContadorConsultas() as contador:
+        for escenario in escenarios:
+            # Descartadas: abren conexiones del pool y compilan sentencias
+            for _ in range(calentamiento):
+                await _ejecutar(escenario, contador)
+
+            frias = []
+            for _ in range(repeticiones):
+                await redis_cache.clear_pattern("estadisticas:*")
+                frias.append(await _ejecutar(escenario, contador))
+
+            # La última ejecución en frío deja Redis poblado
+            l2 = []
+            for _ in range(repeticiones):
+                redis_cache.local.clear_pattern("estadisticas:*")
+                l2.append(await _ejecutar(escenario, contador))
+
+            # Y la última en l2 la L1
+            calientes = [await _ejecutar(escenario, contador) for _ in range(repeticiones)]
+
+            resultados[escenario.nombre] = {
+                "fria": _resumen(frias),
+                "l2": _resumen(l2),
+                "caliente": _resumen(calientes),
+            }
+
+    if redis_cache.client:
+        await redis_cache.client.close()
+
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "repeticiones": repeticiones,
+        "cache": cache,
+        "cache_estadisticas": redis_cache.estadisticas(),
+        "escenarios": resultados,
+    }
+
+
+def _limites(umbrales: dict, escenario: str, modo: str) -> dict:
+    """Umbrales aplicables, de menos a más específico: *, *:modo, escenario, escenario:modo."""
+    limites = {}
+    for clave in ("*", f"*:{modo}", escenario, f"{escenario}:{modo}"):
+        limites.update(umbrales.get(clave, {}))
+    return limites
+
+
+def comprobar_regresiones(
+    resultado: dict,
+    umbrales: Optional[dict] = None,
+    base: Optional[dict] = None,
+    tolerancia: float = 0.2
+) -> List[dict]:
+    """Compara un resultado con umbrales absolutos y con una ejecución base.
+
+    umbrales: {"*": {"p95_ms": 500}, "concesiones:fria": {"consultas": 3}}.
+    Frente a la base, las latencias pueden crecer hasta `tolerancia`
+    (fracción) y el número de consultas y filas no puede crecer.
+    """
+    regresiones = []
+    for nombre, modos in resultado["escenarios"].items():
+        for modo in MODOS:
+            medidas = modos[modo]
+
+            if medidas["errores"]:
+                regresiones.append({
+                    "escenario": nombre, "modo": modo, "metrica": "errores",
+                    "valor": medidas["errores"], "limite": 0, "origen": "errores"
+                })
+
+            for metrica, limite in _limites(umbrales or {}, nombre, modo).items():
+                if metrica in medidas and medidas[metrica] > limite:
+                    regresiones.append({
+                        "escenario": nombre, "modo": modo, "metrica": metrica,
+                        "valor": medidas[metrica], "limite": limite, "origen": "umbral"
+                    })
+
+            anterior = (base or {}).get("escenarios", {}).get(nombre, {}).get(modo)
+            if not anterior:
+                continue
+            for metrica in METRICAS_LATENCIA + METRICAS_BD:
+                if metrica not in anterior:
+                    continue
+                margen = tolerancia if metrica in METRICAS_LATENCIA else 0
+                limite = anterior[metrica] * (1 + margen)
+                if medidas[metrica] > limite:
+                    regresiones.append({
+                        "escenario": nombre, "modo": modo, "metrica": metrica,
+                        "valor": medidas[metrica], "limite": round(limite, 3), "origen": "base"
+                    })
+    return regresiones
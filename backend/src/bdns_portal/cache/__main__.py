@@ -0,0 +1,89 @@
+# bdns_portal/cache/__main__.py
+"""
+Operaciones sobre la cache de la API.
+
+Uso:
+    python -m bdns_portal.cache invalidar --anio 2024 --organo <uuid>
+    python -m bdns_portal.cache invalidar --patron "estadisticas:*"
+    python -m bdns_portal.cache version     # nueva version de datos
+    python -m bdns_portal.cache calentar --anios 3 --concurrencia 4
+
+invalidar --anio/--organo borra por etiquetas (sin recorrer Redis),
+incluidas las entradas sin filtro de esa dimension; los workers de la API
+vacian su L1 en el siguiente sondeo de version. version invalida toda
+la cache versionada; python -m bdns_portal.rollup ya la incrementa.
+calentar calcula el catalogo de estadisticas del dashboard (conviene
+lanzarlo tras el refresco de rollups de cada carga).
+"""
+import argparse
+import asyncio
+
+from .redis_cache import redis_cache, etiqueta, con_todos
+
+
+def _progreso(hechas: int, total: int, resultado: dict) -> None:
+    estado = f"ERROR {resultado['error']}" if resultado["error"] else f"{resultado['segundos']:.2f}s"
+    print(f"[{hechas}/{total}] {resultado['consulta']} {estado}")
+
+
+async def _calentar(args) -> None:
+    # Importa el schema GraphQL completo: solo para este comando
+    from bdns_portal.graphql.calentador import calentar_cache
+
+    resumen = await calentar_cache(
+        anios_recientes=args.anios,
+        campos=args.campos,
+        concurrencia=args.concurrencia,
+        progreso=_progreso
+    )
+    print(f"{resumen['consultas']} consultas en {resumen['duracion_s']}s ({resumen['errores']} errores)")
+
+
+async def _run(args) -> None:
+    await redis_cache.init()
+    try:
+        if args.comando == "version":
+            print(f"Version de datos: {await redis_cache.incrementar_version_datos()}")
+            return
+        if args.comando == "calentar":
+            await _calentar(args)
+            return
+
+        etiquetas = []
+        for dimension, valores in (("anio", args.anio), ("organo", args.organo)):
+            if valores:
+                etiquetas += [etiqueta(dimension, v) for v in valores]
+        if etiquetas:
+            borradas = await redis_cache.invalidar_etiquetas(etiquetas)
+            print(f"{', '.join(con_todos(etiquetas))}: {borradas} claves borradas")
+        if args.patron:
+            borradas = await redis_cache.clear_pattern(args.patron)
+            print(f"{args.patron}: {borradas} claves borradas")
+    finally:
+        await redis_cache.client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Operaciones sobre la cache de la API")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    invalidar = comandos.add_parser("invalidar", help="Borra entradas por etiqueta o patron")
+    invalidar.add_argument("--anio", type=int, action="append", help="Repetible")
+    invalidar.add_argument("--organo", action="append", help="Id de organo (repetible)")
+    invalidar.add_argument("--patron", help="Patron glob de Redis (SCAN + UNLINK por lotes)")
+
+    comandos.add_parser("version", help="Incrementa la version de datos")
+
+    calentar = comandos.add_parser("calentar", help="Calcula en cache las estadisticas del dashboard")
+    calentar.add_argument("--anios", type=int, help="Ultimos N años con datos (CACHE_CALENTAR_ANIOS)")
+    calentar.add_argument("--campos", nargs="*", help="Campos GraphQL del catalogo (por defecto todos)")
+    calentar.add_argument("--concurrencia", type=int, help="Consultas simultaneas (CACHE_CALENTAR_CONCURRENCIA)")
+
+    args = parser.parse_args()
+    if args.comando == "invalidar" and not (args.anio or args.organo or args.patron):
+        parser.error("invalidar necesita --anio, --organo o --patron")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
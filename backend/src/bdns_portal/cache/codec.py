@@ -0,0 +1,218 @@
+# bdns_portal/cache/codec.py
+"""
+Codificación binaria de las entradas de cache.
+
+Cada entrada es una cabecera de dos bytes (formato y compresión) seguida
+del sobre serializado, así que cualquier proceso lee lo que escribió otro
+aunque tengan distinto CACHE_CODEC. Antes de serializar, los tipos
+registrados con registrar_tipos se guardan con su nombre y sus campos, y
+fechas, UUID, Decimal y enums con una marca de tipo: al leer se
+reconstruyen los mismos objetos (EstadisticasConcesiones, date...) y no
+dicts con cadenas.
+
+Formatos: json (stdlib), orjson y msgpack; zstd para las entradas grandes.
+Los tres últimos requieren el extra `cache`: pip install bdns-portal[cache].
+"""
+import dataclasses
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict
+from uuid import UUID
+
+from bdns_core.logging import get_logger
+
+try:
+    import orjson
+except ImportError:  # extra opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # extra opcional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # extra opcional
+    zstandard = None
+
+logger = get_logger(__name__)
+
+# Primer byte de la cabecera
+FORMATOS = {"json": b"j", "orjson": b"o", "msgpack": b"m"}
+# Segundo byte de la cabecera
+COMPRIMIDO = b"z"
+SIN_COMPRIMIR = b"-"
+
+# Marcas de tipo en la forma primitiva
+_TIPO = "__tipo__"
+_CAMPOS = "campos"
+
+_TIPOS: Dict[str, type] = {}
+
+
+class CodecError(ValueError):
+    """Entrada que este proceso no puede leer: corrupta, de otro codec no
+    instalado o con un tipo que no está registrado aquí."""
+
+
+# Lo que pueden lanzar los deserializadores y la reconstrucción de tipos
+# con datos corruptos (msgpack y orjson lanzan subclases de ValueError)
+_ERRORES_LECTURA = (ValueError, TypeError, KeyError, AttributeError, ArithmeticError, RecursionError)
+if zstandard is not None:
+    _ERRORES_LECTURA += (zstandard.ZstdError,)
+
+
+def registrar_tipos(*tipos: type) -> None:
+    """Tipos (dataclasses Strawberry y enums) que pueden guardarse en cache."""
+    for tipo in tipos:
+        _TIPOS[tipo.__name__] = tipo
+
+
+def a_primitivo(valor: Any) -> Any:
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if isinstance(valor, (list, tuple)):
+        return [a_primitivo(v) for v in valor]
+    if isinstance(valor, dict):
+        return {str(k): a_primitivo(v) for k, v in valor.items()}
+    if isinstance(valor, Enum):
+        return {_TIPO: type(valor).__name__, "valor": valor.value}
+    if isinstance(valor, datetime):
+        return {_TIPO: "datetime", "valor": valor.isoformat()}
+    if isinstance(valor, date):
+        return {_TIPO: "date", "valor": valor.isoformat()}
+    if isinstance(valor, UUID):
+        return {_TIPO: "uuid", "valor": str(valor)}
+    if isinstance(valor, Decimal):
+        return {_TIPO: "decimal", "valor": str(valor)}
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        nombre = type(valor).__name__
+        if _TIPOS.get(nombre) is not type(valor):
+            raise TypeError(f"Tipo {nombre} no registrado en la cache (registrar_tipos)")
+        return {
+            _TIPO: nombre,
+            _CAMPOS: {f.name: a_primitivo(getattr(valor, f.name)) for f in dataclasses.fields(valor)}
+        }
+    raise TypeError(f"No se puede guardar en cache un {type(valor).__name__}")
+
+
+def desde_primitivo(valor: Any) -> Any:
+    if isinstance(valor, list):
+        return [desde_primitivo(v) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    tipo = valor.get(_TIPO)
+    if tipo is None:
+        return {k: desde_primitivo(v) for k, v in valor.items()}
+    if tipo == "datetime":
+        return datetime.fromisoformat(valor["valor"])
+    if tipo == "date":
+        return date.fromisoformat(valor["valor"])
+    if tipo == "uuid":
+        return UUID(valor["valor"])
+    if tipo == "decimal":
+        return Decimal(valor["valor"])
+    clase = _TIPOS.get(tipo)
+    if clase is None:
+        raise CodecError(f"Tipo {tipo} desconocido en la cache")
+    if issubclass(clase, Enum):
+        return clase(valor["valor"])
+    return clase(**{k: desde_primitivo(v) for k, v in valor[_CAMPOS].items()})
+
+
+class Codec:
+    """Serializa el sobre de cada entrada y lleva la cuenta de bytes y tiempo."""
+
+    def __init__(self, formato: str = "json", compresion_min_bytes: int = 0):
+        disponibles = {"json": True, "orjson": orjson is not None, "msgpack": msgpack is not None}
+        if formato not in disponibles:
+            raise ValueError(f"CACHE_CODEC desconocido: {formato}")
+        if not disponibles[formato]:
+            logger.warning("Codec de cache %s no instalado, se usa json", formato)
+            formato = "json"
+        if compresion_min_bytes and zstandard is None:
+            logger.warning("zstandard no instalado, cache sin comprimir")
+            compresion_min_bytes = 0
+
+        self.formato = formato
+        self.compresion_min_bytes = compresion_min_bytes
+        self.codificadas = 0
+        self.decodificadas = 0
+        self.bytes_codificados = 0
+        self.bytes_decodificados = 0
+        self.segundos_codificar = 0.0
+        self.segundos_decodificar = 0.0
+
+    def codificar(self, valor: Any) -> bytes:
+        inicio = time.perf_counter()
+        primitivo = a_primitivo(valor)
+        if self.formato == "msgpack":
+            datos = msgpack.packb(primitivo, use_bin_type=True)
+        elif self.formato == "orjson":
+            datos = orjson.dumps(primitivo)
+        else:
+            datos = json.dumps(primitivo, separators=(",", ":")).encode("utf-8")
+
+        compresion = SIN_COMPRIMIR
+        if self.compresion_min_bytes and len(datos) >= self.compresion_min_bytes:
+            datos = zstandard.ZstdCompressor().compress(datos)
+            compresion = COMPRIMIDO
+
+        datos = FORMATOS[self.formato] + compresion + datos
+        self.codificadas += 1
+        self.bytes_codificados += len(datos)
+        self.segundos_codificar += time.perf_counter() - inicio
+        return datos
+
+    def decodificar(self, datos: bytes) -> Any:
+        """Valor de una entrada. CodecError si no se puede leer en este proceso."""
+        inicio = time.perf_counter()
+        try:
+            valor = self._decodificar(datos)
+        except CodecError:
+            raise
+        except _ERRORES_LECTURA as e:
+            raise CodecError(f"Entrada de cache ilegible: {e}") from e
+
+        self.decodificadas += 1
+        self.bytes_decodificados += len(datos)
+        self.segundos_decodificar += time.perf_counter() - inicio
+        return valor
+
+    def _decodificar(self, datos: bytes) -> Any:
+        formato, compresion, cuerpo = datos[:1], datos[1:2], datos[2:]
+
+        if formato not in FORMATOS.values() or compresion not in (COMPRIMIDO, SIN_COMPRIMIR):
+            # Entrada anterior a los codecs: JSON en texto plano
+            return json.loads(datos)
+
+        if compresion == COMPRIMIDO:
+            if zstandard is None:
+                raise CodecError("Entrada comprimida con zstd y zstandard no instalado")
+            cuerpo = zstandard.ZstdDecompressor().decompress(cuerpo)
+        if formato == FORMATOS["msgpack"]:
+            if msgpack is None:
+                raise CodecError("Entrada msgpack y msgpack no instalado")
+            primitivo = msgpack.unpackb(cuerpo, raw=False)
+        elif orjson is not None:
+            # json y orjson escriben JSON: cualquiera de los dos lo lee
+            primitivo = orjson.loads(cuerpo)
+        else:
+            primitivo = json.loads(cuerpo)
+        return desde_primitivo(primitivo)
+
+    def estadisticas(self) -> dict:
+        return {
+            "formato": self.formato,
+            "compresion_min_bytes": self.compresion_min_bytes,
+            "codificadas": self.codificadas,
+            "decodificadas": self.decodificadas,
+            "bytes_codificados": self.bytes_codificados,
+            "bytes_decodificados": self.bytes_decodificados,
+            "segundos_codificar": round(self.segundos_codificar, 6),
+            "segundos_decodificar": round(self.segundos_decodificar, 6),
+        }
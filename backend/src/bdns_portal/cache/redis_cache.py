@@ -1,43 +1,466 @@
 # bdns_portal/cache/redis_cache.py
-import json
-from typing import Any, Optional
+import asyncio
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set
+from uuid import uuid4
 import redis.asyncio as redis
-from core.config import settings
+from bdns_core.logging import get_logger
+from ..core.config import get_settings
+from .codec import Codec, CodecError
+
+logger = get_logger(__name__)
+
+# Marca de fallo en L1 (None, [] o 0 son valores cacheables)
+_AUSENTE = object()
+
+# Cerrojo entre procesos de get_or_set; fuera de los prefijos de datos para
+# que clear_pattern("estadisticas:*") no lo borre
+PREFIJO_CERROJO = "cerrojo:"
+
+# Conjunto Redis con las claves de cada etiqueta (anio:2024, organo:<id>),
+# uno por versión de datos: etiqueta:v7:anio:2024. Tras una carga los de
+# versiones anteriores dejan de recibir claves y caducan con la última
+PREFIJO_ETIQUETA = "etiqueta:"
+
+# Valor de etiqueta de las entradas que dependen de toda una dimensión
+# (sin filtro): invalidar_etiquetas(anio:2024) invalida también anio:todos
+TODOS = "todos"
+
+# Claves por SCAN / UNLINK en cada invalidación por lotes
+LOTE_BORRADO = 500
+
+# Contador de versión de datos; se incrementa al terminar cada carga (tras
+# refrescar los rollups) y forma parte del espacio de nombres de las claves
+CLAVE_VERSION_DATOS = "version_datos"
+
+# Contador de invalidaciones puntuales (etiquetas y patrones). Se relee junto
+# con la versión de datos: cuando otro proceso invalida, cada worker vacía su
+# L1 en el siguiente sondeo (hasta CACHE_VERSION_SONDEO_SEGUNDOS de retraso)
+CLAVE_EPOCA_INVALIDACION = "epoca_invalidacion"
+
+# Campos del sobre guardado en cada entrada. fresco_hasta es hora de pared
+# (time.time()) porque la comparten todos los procesos
+SOBRE_VALOR = "valor"
+SOBRE_FRESCO_HASTA = "fresco_hasta"
+
+# Borra el cerrojo solo si sigue siendo nuestro (no uno re-adquirido tras expirar)
+_LIBERAR_CERROJO = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def etiqueta(dimension: str, valor: Any = None) -> str:
+    return f"{dimension}:{TODOS if valor is None else valor}"
+
+
+def con_todos(etiquetas: Iterable[str]) -> list:
+    """Añade dimension:todos a cada etiqueta dimension:valor, sin repetir."""
+    resultado = []
+    for nombre in etiquetas:
+        dimension, _, _ = nombre.partition(":")
+        for propia in (nombre, etiqueta(dimension)):
+            if propia not in resultado:
+                resultado.append(propia)
+    return resultado
+
+
+class CacheLocal:
+    """LRU en proceso acotada por número de entradas y TTL.
+
+    Guarda el objeto tal cual, sin serializar: quien lo lee no debe
+    modificarlo. El TTL corto acota cuánto puede divergir cada worker de
+    Redis tras un set/delete hecho en otro proceso.
+    """
+
+    def __init__(self, max_entradas: int, ttl: int):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @property
+    def activa(self) -> bool:
+        return self.max_entradas > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def get(self, key: str) -> Any:
+        entrada = self._datos.get(key)
+        if entrada is None:
+            return _AUSENTE
+        caduca, valor, _ = entrada
+        if caduca <= time.monotonic():
+            del self._datos[key]
+            return _AUSENTE
+        self._datos.move_to_end(key)
+        return valor
+
+    def set(self, key: str, value: Any, expire: int, etiquetas: Sequence[str] = ()) -> None:
+        if not self.activa:
+            return
+        self._datos[key] = (time.monotonic() + min(expire, self.ttl), value, frozenset(etiquetas))
+        self._datos.move_to_end(key)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._datos.pop(key, None)
+
+    def clear_pattern(self, pattern: str) -> None:
+        for key in [k for k in self._datos if fnmatchcase(k, pattern)]:
+            del self._datos[key]
+
+    def invalidar_etiquetas(self, etiquetas: Iterable[str]) -> None:
+        etiquetas = set(etiquetas)
+        for key in [k for k, (_, _, propias) in self._datos.items() if propias & etiquetas]:
+            del self._datos[key]
+
+    def limpiar(self) -> None:
+        self._datos.clear()
+
 
 class RedisCache:
     def __init__(self):
         self.client = None
-    
+        settings = get_settings()
+        self.local = CacheLocal(settings.CACHE_L1_MAX_ENTRADAS, settings.CACHE_L1_TTL_SEGUNDOS)
+        self.codec = Codec(settings.CACHE_CODEC, settings.CACHE_COMPRESION_MIN_BYTES)
+        self.cerrojo_segundos = settings.CACHE_CERROJO_SEGUNDOS
+        self.sondeo_segundos = settings.CACHE_SONDEO_MS / 1000
+        self.version_sondeo_segundos = settings.CACHE_VERSION_SONDEO_SEGUNDOS
+        self._version = 0
+        self._version_leida_en = None
+        self._oyentes_version: List[Callable[[int], None]] = []
+        self._epoca_invalidacion: Optional[int] = None
+        self._vuelos: Dict[str, asyncio.Future] = {}
+        self._refrescos: Set[asyncio.Task] = set()
+        self.aciertos_l1 = 0
+        self.aciertos_l2 = 0
+        self.fallos = 0
+        self.coalescidas = 0
+        self.esperas_remotas = 0
+        self.obsoletas_servidas = 0
+        self.refrescos = 0
+        self.refrescos_fallidos = 0
+
     async def init(self):
-        self.client = await redis.from_url(
-            settings.REDIS_URL,
-            decode_responses=True,
-            encoding="utf-8"
-        )
-    
+        # Sin decode_responses: las entradas son bytes del codec
+        self.client = await redis.from_url(get_settings().REDIS_URL)
+
+    async def version_datos(self) -> int:
+        """Versión de datos vigente, releída de Redis cada version_sondeo_segundos."""
+        if not self.client:
+            return self._version
+        ahora = time.monotonic()
+        if self._version_leida_en is None or ahora - self._version_leida_en >= self.version_sondeo_segundos:
+            version, epoca = await self.client.mget(CLAVE_VERSION_DATOS, CLAVE_EPOCA_INVALIDACION)
+            self._fijar_version(int(version or 0))
+            self._fijar_epoca_invalidacion(int(epoca or 0))
+            self._version_leida_en = ahora
+        return self._version
+
+    async def incrementar_version_datos(self) -> int:
+        """Invalida de golpe todas las claves versionadas (sin recorrerlas)."""
+        if self.client:
+            self._fijar_version(int(await self.client.incr(CLAVE_VERSION_DATOS)))
+        else:
+            self._fijar_version(self._version + 1)
+        self._version_leida_en = time.monotonic()
+        return self._version
+
+    def al_cambiar_version(self, oyente: Callable[[int], None]) -> None:
+        """Registra oyente(version), llamado al ver una versión de datos nueva.
+
+        Se llama dentro de version_datos, antes de que nadie construya una
+        clave con la versión nueva, así que puede retirar a tiempo lo que
+        dependa de los datos anteriores (el motor en memoria).
+        """
+        self._oyentes_version.append(oyente)
+
+    def _fijar_version(self, version: int) -> None:
+        anterior, self._version = self._version, version
+        if version != anterior:
+            for oyente in self._oyentes_version:
+                oyente(version)
+
+    def _fijar_epoca_invalidacion(self, epoca: int) -> None:
+        """Vacía la L1 si otro proceso ha invalidado desde el último sondeo.
+
+        La L1 no guarda a qué conjunto de Redis pertenece cada clave ni qué
+        se invalidó: se vacía entera, que es barato (pocas entradas, TTL corto).
+        """
+        if self._epoca_invalidacion is not None and epoca != self._epoca_invalidacion:
+            self.local.limpiar()
+        self._epoca_invalidacion = epoca
+
+    async def _publicar_invalidacion(self) -> None:
+        epoca = int(await self.client.incr(CLAVE_EPOCA_INVALIDACION))
+        if self._epoca_invalidacion is not None and epoca != self._epoca_invalidacion + 1:
+            # Además de la nuestra hubo otra de otro proceso sin sondear aún
+            self.local.limpiar()
+        self._epoca_invalidacion = epoca
+
+    async def con_version(self, key: str) -> str:
+        """Inserta la versión de datos tras el espacio de nombres: estadisticas:v7:..."""
+        espacio, _, resto = key.partition(":")
+        return f"{espacio}:v{await self.version_datos()}:{resto}"
+
+    async def _conjunto_etiqueta(self, etiqueta: str) -> str:
+        return f"{PREFIJO_ETIQUETA}v{await self.version_datos()}:{etiqueta}"
+
     async def get(self, key: str) -> Optional[Any]:
+        sobre = await self._leer(key)
+        return sobre[SOBRE_VALOR] if sobre is not None else None
+
+    async def _leer(self, key: str) -> Optional[dict]:
+        """Sobre de la entrada (L1 y después Redis), fresco o no."""
+        sobre = self.local.get(key)
+        if sobre is not _AUSENTE:
+            self.aciertos_l1 += 1
+            return sobre
+
+        sobre = await self._leer_l2(key)
+        if sobre is not None:
+            self.aciertos_l2 += 1
+            return sobre
+        self.fallos += 1
+        return None
+
+    async def _leer_l2(self, key: str) -> Optional[dict]:
         if not self.client:
             return None
         data = await self.client.get(key)
-        if data:
-            return json.loads(data)
+        if data is None:
+            return None
+        try:
+            sobre = self.codec.decodificar(data)
+        except CodecError as e:
+            # Entrada de otra versión del código o de un codec no instalado
+            logger.warning("Entrada de cache ilegible, se recalcula", exc_info=e, extra={"key": key})
+            return None
+        if not (isinstance(sobre, dict) and SOBRE_VALOR in sobre and SOBRE_FRESCO_HASTA in sobre):
+            # Entrada escrita antes de los sobres: se trata como fresca
+            sobre = {SOBRE_VALOR: sobre, SOBRE_FRESCO_HASTA: float("inf")}
+        self.local.set(key, sobre, self.local.ttl)
+        return sobre
+
+    async def get_or_set(
+        self,
+        key: str,
+        calcular: Callable[[], Awaitable[Any]],
+        expire: int = 3600,
+        fresco: Optional[int] = None,
+        recalcular: Optional[Callable[[], Awaitable[Any]]] = None,
+        etiquetas: Sequence[str] = ()
+    ) -> Any:
+        """Lee key o la calcula una sola vez aunque haya fallos concurrentes.
+
+        En el proceso, los fallos simultáneos esperan el mismo futuro. Entre
+        procesos, un cerrojo SET NX en Redis elige quién calcula; el resto
+        sondea la clave hasta que aparece el valor o el cerrojo desaparece.
+
+        Con fresco < expire la entrada pasa a obsoleta a los `fresco`
+        segundos: se sirve tal cual y se recalcula en segundo plano con
+        recalcular (por defecto calcular), que no debe depender de recursos
+        de la petición. Solo pasados `expire` segundos se espera al cálculo.
+        etiquetas se registran al guardar (ver invalidar_etiquetas).
+        """
+        sobre = await self._leer(key)
+        if sobre is not None:
+            if sobre[SOBRE_FRESCO_HASTA] <= time.time():
+                self.obsoletas_servidas += 1
+                self._refrescar_en_segundo_plano(key, recalcular or calcular, expire, fresco, etiquetas)
+            return sobre[SOBRE_VALOR]
+
+        vuelo = self._vuelos.get(key)
+        if vuelo is not None:
+            self.coalescidas += 1
+        else:
+            vuelo = asyncio.ensure_future(self._calcular_una_vez(key, calcular, expire, fresco, etiquetas))
+            self._registrar_vuelo(key, vuelo)
+        # shield: si se cancela una petición, el cálculo sigue para las demás
+        return await asyncio.shield(vuelo)
+
+    def _registrar_vuelo(self, key: str, vuelo: asyncio.Future) -> None:
+        self._vuelos[key] = vuelo
+        vuelo.add_done_callback(
+            lambda f: self._vuelos.pop(key) if self._vuelos.get(key) is f else None
+        )
+
+    async def _tomar_cerrojo(self, key: str) -> Optional[str]:
+        token = uuid4().hex
+        if await self.client.set(f"{PREFIJO_CERROJO}{key}", token, nx=True, ex=self.cerrojo_segundos):
+            return token
         return None
-    
-    async def set(self, key: str, value: Any, expire: int = 3600) -> None:
+
+    async def _soltar_cerrojo(self, key: str, token: str) -> None:
+        await self.client.eval(_LIBERAR_CERROJO, 1, f"{PREFIJO_CERROJO}{key}", token)
+
+    async def _calcular_y_guardar(self, key: str, calcular, expire: int, fresco: Optional[int], etiquetas) -> Any:
+        value = await calcular()
+        await self.set(key, value, expire, fresco, etiquetas)
+        return value
+
+    async def _calcular_una_vez(self, key: str, calcular, expire: int, fresco: Optional[int], etiquetas) -> Any:
+        if not self.client:
+            return await self._calcular_y_guardar(key, calcular, expire, fresco, etiquetas)
+
+        token = await self._tomar_cerrojo(key)
+        if token:
+            try:
+                return await self._calcular_y_guardar(key, calcular, expire, fresco, etiquetas)
+            finally:
+                await self._soltar_cerrojo(key, token)
+
+        # Otro proceso está calculando: esperar su resultado
+        limite = time.monotonic() + self.cerrojo_segundos
+        while time.monotonic() < limite:
+            await asyncio.sleep(self.sondeo_segundos)
+            sobre = await self._leer_l2(key)
+            if sobre is not None:
+                self.esperas_remotas += 1
+                return sobre[SOBRE_VALOR]
+            if not await self.client.exists(f"{PREFIJO_CERROJO}{key}"):
+                break
+
+        # El cálculo remoto falló o expiró su cerrojo: calcular aquí
+        sobre = await self._leer_l2(key)
+        if sobre is not None:
+            self.esperas_remotas += 1
+            return sobre[SOBRE_VALOR]
+        return await self._calcular_y_guardar(key, calcular, expire, fresco, etiquetas)
+
+    def _refrescar_en_segundo_plano(self, key: str, recalcular, expire: int, fresco: Optional[int], etiquetas) -> None:
+        if key in self._vuelos:
+            return
+        tarea = asyncio.create_task(self._refrescar(key, recalcular, expire, fresco, etiquetas))
+        self._registrar_vuelo(key, tarea)
+        # Referencia fuerte hasta que termine
+        self._refrescos.add(tarea)
+        tarea.add_done_callback(self._refrescos.discard)
+
+    async def _refrescar(self, key: str, recalcular, expire: int, fresco: Optional[int], etiquetas) -> None:
+        try:
+            if not self.client:
+                await self._calcular_y_guardar(key, recalcular, expire, fresco, etiquetas)
+            else:
+                token = await self._tomar_cerrojo(key)
+                if not token:
+                    # Otro proceso ya la está refrescando
+                    return
+                try:
+                    await self._calcular_y_guardar(key, recalcular, expire, fresco, etiquetas)
+                finally:
+                    await self._soltar_cerrojo(key, token)
+            self.refrescos += 1
+        except Exception as e:
+            # Se sigue sirviendo la entrada obsoleta hasta expire
+            self.refrescos_fallidos += 1
+            logger.error("Error refrescando cache", exc_info=e, extra={"key": key})
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        expire: int = 3600,
+        fresco: Optional[int] = None,
+        etiquetas: Sequence[str] = ()
+    ) -> None:
+        sobre = {SOBRE_VALOR: value, SOBRE_FRESCO_HASTA: time.time() + (fresco or expire)}
+        self.local.set(key, sobre, expire, etiquetas)
         if not self.client:
             return
-        await self.client.setex(key, expire, json.dumps(value, default=str))
-    
+        conjuntos = [await self._conjunto_etiqueta(etiqueta) for etiqueta in etiquetas]
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.setex(key, expire, self.codec.codificar(sobre))
+            for conjunto in conjuntos:
+                # El conjunto caduca con la última clave registrada en él
+                pipe.sadd(conjunto, key)
+                pipe.expire(conjunto, expire)
+            await pipe.execute()
+
     async def delete(self, key: str) -> None:
+        self.local.delete(key)
         if not self.client:
             return
         await self.client.delete(key)
-    
-    async def clear_pattern(self, pattern: str) -> None:
+
+    async def clear_pattern(self, pattern: str) -> int:
+        """Borra las claves que casan con pattern.
+
+        SCAN por cursor y UNLINK por lotes en lugar de KEYS + DELETE, que
+        bloquean Redis con muchas claves. Devuelve las claves borradas.
+        """
+        self.local.clear_pattern(pattern)
         if not self.client:
-            return
-        keys = await self.client.keys(pattern)
-        if keys:
-            await self.client.delete(*keys)
+            return 0
+        borradas = await self._unlink_por_lotes(self.client.scan_iter(match=pattern, count=LOTE_BORRADO))
+        await self._publicar_invalidacion()
+        return borradas
+
+    async def invalidar_etiquetas(self, etiquetas: Iterable[str]) -> int:
+        """Borra las claves registradas en alguna de las etiquetas, sin SCAN.
+
+        Cada dimension:valor arrastra dimension:todos (las entradas sin
+        filtro de esa dimensión también lo incluyen). Solo las de la versión
+        de datos vigente: las anteriores ya no se leen. Las L1 de los demás
+        procesos se vacían en su siguiente sondeo de versión.
+        """
+        etiquetas = con_todos(etiquetas)
+        self.local.invalidar_etiquetas(etiquetas)
+        if not self.client:
+            return 0
+        borradas = 0
+        for nombre in etiquetas:
+            conjunto = await self._conjunto_etiqueta(nombre)
+            borradas += await self._unlink_por_lotes(self.client.sscan_iter(conjunto, count=LOTE_BORRADO))
+            await self.client.unlink(conjunto)
+        await self._publicar_invalidacion()
+        return borradas
+
+    async def _unlink_por_lotes(self, claves) -> int:
+        borradas = 0
+        lote = []
+        async for key in claves:
+            lote.append(key)
+            if len(lote) >= LOTE_BORRADO:
+                borradas += await self.client.unlink(*lote)
+                lote = []
+        if lote:
+            borradas += await self.client.unlink(*lote)
+        return borradas
+
+    def estadisticas(self) -> dict:
+        """Aciertos por capa. El ratio de L2 es sobre las lecturas que fallan en L1."""
+        lecturas = self.aciertos_l1 + self.aciertos_l2 + self.fallos
+        lecturas_l2 = lecturas - self.aciertos_l1
+        return {
+            "lecturas": lecturas,
+            "l1": {
+                "aciertos": self.aciertos_l1,
+                "ratio": round(self.aciertos_l1 / lecturas, 4) if lecturas else 0.0,
+                "entradas": len(self.local),
+                "max_entradas": self.local.max_entradas,
+                "ttl_segundos": self.local.ttl,
+            },
+            "l2": {
+                "aciertos": self.aciertos_l2,
+                "ratio": round(self.aciertos_l2 / lecturas_l2, 4) if lecturas_l2 else 0.0,
+                "conectado": self.client is not None,
+            },
+            "fallos": self.fallos,
+            "coalescidas": self.coalescidas,
+            "esperas_remotas": self.esperas_remotas,
+            "obsoletas_servidas": self.obsoletas_servidas,
+            "refrescos": self.refrescos,
+            "refrescos_fallidos": self.refrescos_fallidos,
+            "version_datos": self._version,
+            "codec": self.codec.estadisticas(),
+        }
 
-redis_cache = RedisCache()
\ No newline at end of file
+redis_cache = RedisCache()
@@ -21,9 +21,59 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
     REDIS_URL: str = "redis://localhost:6379/0"
+    # Cache L1 en proceso delante de Redis (0 entradas = desactivada)
+    CACHE_L1_MAX_ENTRADAS: int = 1024
+    CACHE_L1_TTL_SEGUNDOS: int = 60
+    # Serializacion de entradas: json, orjson o msgpack (extra `cache`), y
+    # zstd para las de al menos CACHE_COMPRESION_MIN_BYTES (0 = nunca)
+    CACHE_CODEC: str = "json"
+    CACHE_COMPRESION_MIN_BYTES: int = 16384
+    # Cerrojo entre procesos al recalcular una clave (debe superar el
+    # calculo mas lento) y sondeo de los procesos que esperan
+    CACHE_CERROJO_SEGUNDOS: int = 30
+    CACHE_SONDEO_MS: int = 100
+    # Las claves de estadisticas llevan la version de datos, que se relee
+    # de Redis cada CACHE_VERSION_SONDEO_SEGUNDOS (con las invalidaciones
+    # puntuales de otros procesos, que vacian la L1)
+    CACHE_VERSION_SONDEO_SEGUNDOS: int = 5
+    # Estadisticas: pasado el TTL fresco (0 = hasta el maximo) se sirve la
+    # entrada obsoleta y se recalcula en segundo plano; el maximo solo
+    # retira entradas de versiones antiguas
+    CACHE_TTL_FRESCO_SEGUNDOS: int = 0
+    CACHE_TTL_MAXIMO_SEGUNDOS: int = 604800
+    # Calentador: estadisticas de los ultimos N años con datos y sin año,
+    # CACHE_CALENTAR_CAMPOS separados por comas (vacio = todo el catalogo)
+    CACHE_CALENTAR_AL_ARRANCAR: bool = True
+    CACHE_CALENTAR_ANIOS: int = 3
+    CACHE_CALENTAR_CONCURRENCIA: int = 2
+    CACHE_CALENTAR_CAMPOS: str = ""
 
     # GraphQL
     GRAPHQL_URL: str = "http://localhost:8001/graphql"
+    # totalCount de las conexiones: por encima de estas filas estimadas por
+    # el planificador se devuelve la estimacion (0 = siempre exacto)
+    GRAPHQL_CONTEO_ESTIMADO_UMBRAL: int = 100000
+    # Limites por operacion (graphql/coste.py): tamaño de pagina, coste
+    # estimado, profundidad y operaciones pesadas a la vez
+    GRAPHQL_MAX_PAGINA: int = 100
+    GRAPHQL_COSTE_MAXIMO: int = 10000
+    GRAPHQL_COSTE_PESADO: int = 2000
+    GRAPHQL_PESADAS_CONCURRENTES: int = 2
+    GRAPHQL_PROFUNDIDAD_MAXIMA: int = 10
+
+    # Estadisticas: "sql" (rollups en PostgreSQL) o "memoria" (motor NumPy)
+    ESTADISTICAS_MOTOR: str = "sql"
+    # Recarga periodica del motor en memoria; ademas se recarga siempre que
+    # cambia la version de datos de la cache (0 = sin recarga periodica)
+    ESTADISTICAS_MOTOR_RECARGA_SEGUNDOS: int = 0
+    # Subconsultas por año en paralelo para agregados sin filtro de año
+    # (conexiones simultaneas del pool en todo el proceso; 1 = serie)
+    ESTADISTICAS_PARALELO: int = 4
+    # Refresco incremental de rollups: segundos antes de la marca de agua
+    # que se vuelven a recorrer (transacciones de carga que confirman tarde)
+    ROLLUP_SOLAPE_SEGUNDOS: int = 3600
+    # Años como maximo en las series anioDesde..anioHasta
+    ESTADISTICAS_MAX_ANIOS: int = 30
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,41 @@
+"""
+Conexion a base de datos del portal.
+
+Engine y sesiones asincronas para los procesos que se ejecutan fuera de
+una peticion GraphQL (refresco de rollups, tareas de mantenimiento).
+"""
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from .config import get_settings
+
+
+def _async_url(url: str) -> str:
+    """Fuerza el driver asyncpg sobre una URL postgresql:// estandar."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    return url
+
+
+@lru_cache()
+def get_engine() -> AsyncEngine:
+    """Obtiene el engine asincrono compartido."""
+    settings = get_settings()
+    return create_async_engine(
+        _async_url(settings.DATABASE_URL),
+        pool_pre_ping=True,
+        # Las subconsultas paralelas por año ocupan como mucho
+        # ESTADISTICAS_PARALELO conexiones en todo el proceso (semaforo de
+        # resolvers/particiones.py); las otras 5 son para las sesiones de
+        # las peticiones, con el desborde por defecto (10) para los picos
+        pool_size=5 + settings.ESTADISTICAS_PARALELO
+    )
+
+
+@lru_cache()
+def get_sessionmaker() -> async_sessionmaker:
+    """Obtiene la factoria de sesiones asincronas."""
+    return async_sessionmaker(get_engine(), expire_on_commit=False)
@@ -0,0 +1,166 @@
+# bdns_portal/graphql/calentador.py
+"""
+Calentador de la caché de estadísticas.
+
+Ejecuta contra el schema en proceso un catálogo de consultas del dashboard
+(cada campo de estadísticas para los últimos N años con datos y su
+variante sin año), de modo que sus resultados queden en la caché con las
+mismas claves que usan las peticiones. Solo pide __typename: lo que se
+cachea es el resultado completo del resolver.
+
+historialBeneficiario queda fuera: depende de cada beneficiario.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from bdns_core.logging import get_logger
+
+from ..core.config import get_settings
+from ..core.database import get_sessionmaker
+from .resolvers.particiones import anios_con_datos
+from .schema import schema
+
+logger = get_logger(__name__)
+
+# Variantes de cada campo: "filtros" y "anio" se calientan por año y sin
+# año; "anio_obligatorio" y "comparativa" solo por año; "rango" una vez
+# sobre todos los años con datos
+FILTROS = "filtros"
+ANIO = "anio"
+ANIO_OBLIGATORIO = "anio_obligatorio"
+COMPARATIVA = "comparativa"
+RANGO = "rango"
+
+# campo: (variante, declaración de variables, argumentos)
+CATALOGO = {
+    "estadisticas": (FILTROS, "$filtros: FiltroEstadisticas", "dimensiones: [REGION, TIPO_ENTIDAD], filtros: $filtros"),
+    "estadisticasPorTipoEntidad": (FILTROS, "$filtros: FiltroEstadisticas", "filtros: $filtros"),
+    "estadisticasPorOrgano": (FILTROS, "$filtros: FiltroEstadisticas", "filtros: $filtros"),
+    "numeroBeneficiarios": (FILTROS, "$filtros: FiltroEstadisticas", "filtros: $filtros"),
+    "concentracionSubvenciones": (ANIO, "$anio: Int", "anio: $anio"),
+    "estadisticasPorRegimen": (ANIO, "$anio: Int", "anio: $anio"),
+    "estadisticasPorRegion": (ANIO, "$anio: Int", "anio: $anio"),
+    "topConvocatorias": (ANIO, "$anio: Int", "anio: $anio"),
+    "beneficiariosRecurrentes": (ANIO, "$anio: Int", "anio: $anio"),
+    "estadisticasEvolucionMensual": (ANIO_OBLIGATORIO, "$anio: Int!", "anio: $anio"),
+    "comparativaAnual": (COMPARATIVA, "$anio: Int!, $anterior: Int!", "anioBase: $anterior, anioComparar: $anio"),
+    "estadisticasEvolucionMensualAnios": (RANGO, "$desde: Int!, $hasta: Int!", "anioDesde: $desde, anioHasta: $hasta"),
+    "comparativaAnualSerie": (RANGO, "$desde: Int!, $hasta: Int!", "anioDesde: $desde, anioHasta: $hasta"),
+}
+
+
+@dataclass
+class ConsultaCalentar:
+    nombre: str
+    query: str
+    variables: Dict = field(default_factory=dict)
+
+
+def _variables(variante: str, anio: Optional[int], anios: Sequence[int]) -> Optional[dict]:
+    """Variables de una variante para un año (None = sin año); None si no aplica."""
+    if variante == FILTROS:
+        return {"filtros": {"anio": anio} if anio else None}
+    if variante == ANIO:
+        return {"anio": anio}
+    if anio is None:
+        if variante == RANGO:
+            return {"desde": min(anios), "hasta": max(anios)}
+        return None
+    if variante == ANIO_OBLIGATORIO:
+        return {"anio": anio}
+    if variante == COMPARATIVA:
+        return {"anio": anio, "anterior": anio - 1}
+    return None
+
+
+def catalogo(
+    recientes: Sequence[int],
+    anios: Sequence[int],
+    campos: Optional[Sequence[str]] = None
+) -> List[ConsultaCalentar]:
+    """Consultas a calentar: cada campo sin año y para cada año reciente.
+
+    anios son todos los años con datos (para las variantes de rango).
+    """
+    desconocidos = set(campos or ()) - set(CATALOGO)
+    if desconocidos:
+        raise ValueError(f"Campos fuera del catalogo: {', '.join(sorted(desconocidos))}")
+
+    consultas = []
+    for campo, (variante, declaracion, argumentos) in CATALOGO.items():
+        if campos and campo not in campos:
+            continue
+        query = f"query({declaracion}) {{ {campo}({argumentos}) {{ __typename }} }}"
+        for anio in [None, *recientes]:
+            variables = _variables(variante, anio, anios)
+            if variables is not None:
+                consultas.append(ConsultaCalentar(f"{campo}:{anio or 'todos'}", query, variables))
+    return consultas
+
+
+async def calentar_cache(
+    anios_recientes: Optional[int] = None,
+    campos: Optional[Sequence[str]] = None,
+    concurrencia: Optional[int] = None,
+    progreso: Optional[Callable[[int, int, dict], None]] = None
+) -> dict:
+    """Calcula el catálogo en la caché con concurrencia acotada.
+
+    progreso(hechas, total, resultado) se llama al terminar cada consulta;
+    por defecto se registra en el log. Devuelve el resumen con la duración
+    de cada consulta.
+    """
+    settings = get_settings()
+    anios_recientes = anios_recientes if anios_recientes is not None else settings.CACHE_CALENTAR_ANIOS
+    campos = campos or [c.strip() for c in settings.CACHE_CALENTAR_CAMPOS.split(",") if c.strip()]
+
+    async with get_sessionmaker()() as db:
+        anios = await anios_con_datos(db)
+    if not anios:
+        logger.info("Cache sin calentar: no hay años con datos")
+        return {"consultas": 0, "errores": 0, "duracion_s": 0.0, "detalle": []}
+
+    consultas = catalogo(anios[-anios_recientes:] if anios_recientes > 0 else [], anios, campos)
+    semaforo = asyncio.Semaphore(concurrencia or settings.CACHE_CALENTAR_CONCURRENCIA)
+    hechas = 0
+
+    def registrar(hechas: int, total: int, resultado: dict) -> None:
+        if resultado["error"]:
+            logger.warning("Cache calentada con error %s (%d/%d): %s", resultado["consulta"], hechas, total, resultado["error"])
+        else:
+            logger.info("Cache calentada %s (%d/%d) en %.2fs", resultado["consulta"], hechas, total, resultado["segundos"])
+
+    async def ejecutar(consulta: ConsultaCalentar) -> dict:
+        nonlocal hechas
+        async with semaforo:
+            inicio = time.perf_counter()
+            # Cada campo raíz abre su sesión (sesiones.py)
+            respuesta = await schema.execute(
+                consulta.query,
+                variable_values=consulta.variables,
+                context_value={}
+            )
+            resultado = {
+                "consulta": consulta.nombre,
+                "segundos": round(time.perf_counter() - inicio, 3),
+                "error": respuesta.errors[0].message if respuesta.errors else None
+            }
+        hechas += 1
+        (progreso or registrar)(hechas, len(consultas), resultado)
+        return resultado
+
+    inicio = time.perf_counter()
+    detalle = await asyncio.gather(*(ejecutar(c) for c in consultas))
+    resumen = {
+        "consultas": len(detalle),
+        "errores": sum(1 for r in detalle if r["error"]),
+        "duracion_s": round(time.perf_counter() - inicio, 2),
+        "detalle": detalle,
+    }
+    logger.info(
+        "Cache calentada: %d consultas en %.2fs (%d errores)",
+        resumen["consultas"], resumen["duracion_s"], resumen["errores"]
+    )
+    return resumen
@@ -0,0 +1,135 @@
+"""
+DataLoaders por petición para las relaciones de los tipos GraphQL.
+
+Cada petición tiene su registro (info.context["cargadores"]) con un
+DataLoader por modelo destino y columna clave: Concesion.beneficiario y
+un Beneficiario pedido desde otro campo raíz comparten el de
+(Beneficiario, id), y Convocatoria.organo y Organo.padre el de
+(Organo, id). Las claves pedidas en el mismo ciclo del bucle se agrupan
+en un único SELECT ... WHERE clave IN (...) y el resultado queda en la
+caché del DataLoader hasta el final de la petición.
+
+Los campos de relación de los tipos se declaran con campo_relacion: si
+el resolver raíz ya cargó la relación (opciones_carga) se usa esa, y si
+no se pide al DataLoader.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import strawberry
+from sqlalchemy import inspect, select
+from strawberry.dataloader import DataLoader
+
+from ..core.database import get_sessionmaker
+from .seleccion import Carga, opciones_completas
+
+_CARGAS: Dict[type, Carga] = {}
+
+
+def registrar_carga(modelo: type, carga: Carga) -> None:
+    """Carga de los objetos de modelo que trae un DataLoader."""
+    _CARGAS[modelo] = carga
+
+
+class _Relacion(NamedTuple):
+    destino: type
+    # Atributo del objeto origen con el valor de la clave
+    clave_origen: str
+    # Columna del destino (o de la tabla intermedia) que se filtra con IN
+    columna: Any
+    coleccion: bool
+    secundaria: Any
+    orden: Tuple
+
+
+@lru_cache(maxsize=None)
+def _relacion(modelo: type, nombre: str) -> _Relacion:
+    relacion = inspect(modelo).relationships[nombre]
+    if len(relacion.local_remote_pairs) != 1 and relacion.secondary is None:
+        raise ValueError(f"{modelo.__name__}.{nombre}: solo relaciones de una columna")
+
+    if relacion.secondary is not None:
+        # N:M: origen.pk = intermedia.fk_origen, destino.pk = intermedia.fk_destino
+        (local, intermedia), = relacion.synchronize_pairs
+        columna = intermedia
+    else:
+        (local, remota), = relacion.local_remote_pairs
+        columna = remota
+    clave_origen = inspect(modelo).get_property_by_column(local).key
+    return _Relacion(
+        destino=relacion.mapper.class_,
+        clave_origen=clave_origen,
+        columna=columna,
+        coleccion=relacion.uselist,
+        secundaria=relacion if relacion.secondary is not None else None,
+        orden=tuple(relacion.order_by or ())
+    )
+
+
+class Cargadores:
+    """Registro de DataLoaders de una petición."""
+
+    def __init__(self, sessionmaker=None):
+        self._sessionmaker = sessionmaker or get_sessionmaker()
+        self._cargadores: Dict[Tuple, DataLoader] = {}
+
+    def de_relacion(self, modelo: type, nombre: str) -> DataLoader:
+        relacion = _relacion(modelo, nombre)
+        clave = (relacion.destino, relacion.columna, relacion.coleccion)
+        if clave not in self._cargadores:
+            async def cargar(claves: List) -> List:
+                return await self._cargar(relacion, claves)
+            self._cargadores[clave] = DataLoader(load_fn=cargar)
+        return self._cargadores[clave]
+
+    async def _cargar(self, relacion: _Relacion, claves: List) -> List:
+        destino = relacion.destino
+        query = select(relacion.columna, destino).options(
+            *opciones_completas(destino, _CARGAS.get(destino, Carga()))
+        )
+        if relacion.secundaria is not None:
+            (remota, intermedia), = relacion.secundaria.secondary_synchronize_pairs
+            query = query.join(relacion.secundaria.secondary, remota == intermedia)
+        query = query.where(relacion.columna.in_(claves))
+        if relacion.orden:
+            query = query.order_by(*relacion.orden)
+
+        # Sesión propia por lote: los lotes de distintos DataLoaders se
+        # despachan a la vez y una AsyncSession no admite consultas
+        # concurrentes. expire_on_commit=False deja los objetos legibles.
+        async with self._sessionmaker() as sesion:
+            filas = (await sesion.execute(query)).unique().all()
+
+        if relacion.coleccion:
+            grupos = defaultdict(list)
+            for clave, objeto in filas:
+                grupos[clave].append(objeto)
+            return [grupos.get(clave, []) for clave in claves]
+        objetos = {clave: objeto for clave, objeto in filas}
+        return [objetos.get(clave) for clave in claves]
+
+
+def cargadores(info) -> Cargadores:
+    """Registro de la petición; lo crea si el contexto no lo trae (benchmark, calentador)."""
+    if "cargadores" not in info.context:
+        info.context["cargadores"] = Cargadores()
+    return info.context["cargadores"]
+
+
+async def relacion(info, objeto, nombre: str) -> Optional[Any]:
+    """Relación nombre de objeto: la ya cargada o la del DataLoader."""
+    if nombre not in inspect(objeto).unloaded:
+        return getattr(objeto, nombre)
+    datos = _relacion(type(objeto), nombre)
+    clave = getattr(objeto, datos.clave_origen)
+    if clave is None:
+        return [] if datos.coleccion else None
+    return await cargadores(info).de_relacion(type(objeto), nombre).load(clave)
+
+
+def campo_relacion(nombre: str, **kwargs):
+    """Campo Strawberry para una relación, con el tipo de la anotación de clase."""
+    async def resolver(root, info: strawberry.Info):
+        return await relacion(info, root, nombre)
+    return strawberry.field(resolver=resolver, **kwargs)
@@ -0,0 +1,262 @@
+"""
+Análisis de coste de las operaciones GraphQL.
+
+Antes de ejecutar, cada operación se recorre con sus variables:
+
+- cada campo compuesto cuesta su peso (PESOS, 1 por defecto; los
+  escalares no cuestan), multiplicado por los elementos que devuelven
+  los campos que lo contienen;
+- en las conexiones first/last/limit de pagination (o GRAPHQL_MAX_PAGINA
+  si no se indica, que es lo que devuelve paginar) multiplica solo lo
+  pedido bajo edges: totalCount y pageInfo se calculan una vez;
+- los campos con limit/limite multiplican por ese valor, las series
+  anioDesde..anioHasta por sus años (también su peso) y el resto de
+  listas por TAMANO_LISTA;
+- un tamaño de página mayor que GRAPHQL_MAX_PAGINA o una serie de más
+  de ESTADISTICAS_MAX_ANIOS años se rechaza.
+
+Por encima de GRAPHQL_COSTE_MAXIMO la operación se rechaza sin tocar la
+base de datos; a partir de GRAPHQL_COSTE_PESADO espera turno, con como
+mucho GRAPHQL_PESADAS_CONCURRENTES a la vez, para que una consulta
+abusiva no agote el pool de conexiones. El coste calculado se devuelve
+en extensions.coste de la respuesta. La profundidad la limita
+QueryDepthLimiter (GRAPHQL_PROFUNDIDAD_MAXIMA).
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError,
+    GraphQLList, GraphQLNonNull, InlineFragmentNode, OperationDefinitionNode,
+    Undefined, get_named_type, is_leaf_type, value_from_ast
+)
+from graphql.execution import ExecutionResult as GraphQLExecutionResult
+from strawberry.extensions import SchemaExtension
+
+from bdns_core.logging import get_logger
+
+from ..core.config import get_settings
+
+logger = get_logger(__name__)
+
+# Elementos supuestos para las listas sin argumento de tamaño
+TAMANO_LISTA = 10
+
+# Peso por campo ("Tipo.campo" o "*.campo"); el resto de campos
+# compuestos pesa 1. Las estadísticas van cacheadas pero un fallo de cache
+# recorre los rollups; totalCount es un count(*) o un EXPLAIN aparte.
+PESOS = {
+    "Query.estadisticas": 20,
+    "Query.estadisticasPorTipoEntidad": 10,
+    "Query.estadisticasPorOrgano": 10,
+    "Query.concentracionSubvenciones": 10,
+    "Query.estadisticasEvolucionMensual": 10,
+    "Query.estadisticasEvolucionMensualAnios": 10,
+    "Query.estadisticasPorRegimen": 10,
+    "Query.estadisticasPorRegion": 10,
+    "Query.topConvocatorias": 10,
+    "Query.beneficiariosRecurrentes": 10,
+    "Query.historialBeneficiario": 10,
+    "Query.comparativaAnual": 10,
+    "Query.comparativaAnualSerie": 10,
+    "Query.numeroBeneficiarios": 10,
+    "*.totalCount": 10,
+    "Convocatoria.documentos": 5,
+    "Convocatoria.anuncios": 5,
+}
+
+# Argumentos que fijan el tamaño de una lista
+_ARGUMENTOS_TAMANO = ("limit", "limite")
+_CAMPOS_PAGINA = ("first", "last", "limit")
+# Argumentos de las series por años (una fila por año)
+_RANGO_ANIOS = ("anioDesde", "anioHasta")
+
+_pesadas: Optional[asyncio.Semaphore] = None
+
+
+def _semaforo_pesadas() -> asyncio.Semaphore:
+    global _pesadas
+    if _pesadas is None:
+        _pesadas = asyncio.Semaphore(get_settings().GRAPHQL_PESADAS_CONCURRENTES)
+    return _pesadas
+
+
+def _valor(entrada, nombre: str):
+    # Los inputs llegan como dict o como la clase Strawberry
+    if isinstance(entrada, dict):
+        return entrada.get(nombre)
+    return getattr(entrada, nombre, None)
+
+
+def _es_lista(tipo) -> bool:
+    if isinstance(tipo, GraphQLNonNull):
+        tipo = tipo.of_type
+    return isinstance(tipo, GraphQLList)
+
+
+class _Calculo:
+    """Recorrido de una operación: coste total y errores de tamaño."""
+
+    def __init__(self, schema, fragmentos: Dict[str, FragmentDefinitionNode], variables: dict):
+        self.schema = schema
+        self.fragmentos = fragmentos
+        self.variables = variables
+        self.maximo_pagina = get_settings().GRAPHQL_MAX_PAGINA
+        self.maximo_anios = get_settings().ESTADISTICAS_MAX_ANIOS
+        self.errores: List[GraphQLError] = []
+
+    def _argumentos(self, definicion, nodo: FieldNode) -> dict:
+        argumentos = {
+            nombre: argumento.default_value
+            for nombre, argumento in definicion.args.items()
+            if argumento.default_value is not Undefined
+        }
+        for argumento in nodo.arguments or ():
+            tipo = definicion.args.get(argumento.name.value)
+            if tipo is not None:
+                # Undefined si las variables no valen: lo rechaza la ejecución
+                valor = value_from_ast(argumento.value, tipo.type, self.variables)
+                argumentos[argumento.name.value] = None if valor is Undefined else valor
+        return argumentos
+
+    def _tamano(self, ruta: str, definicion, nodo: FieldNode) -> Optional[int]:
+        """Tamaño pedido en los argumentos (o None), validando el máximo."""
+        argumentos = self._argumentos(definicion, nodo)
+        pedidos = {}
+        pagina = argumentos.get("pagination")
+        if pagina is not None:
+            pedidos = {f"pagination.{c}": _valor(pagina, c) for c in _CAMPOS_PAGINA}
+        pedidos.update({a: argumentos.get(a) for a in _ARGUMENTOS_TAMANO})
+        pedidos = {a: v for a, v in pedidos.items() if v is not None}
+
+        for argumento, valor in pedidos.items():
+            if valor > self.maximo_pagina:
+                self.errores.append(GraphQLError(
+                    f"{ruta}: {argumento}={valor} excede el maximo de {self.maximo_pagina} por pagina",
+                    nodo
+                ))
+
+        desde, hasta = (argumentos.get(a) for a in _RANGO_ANIOS)
+        if desde is not None and hasta is not None:
+            anios = hasta - desde + 1
+            if not 1 <= anios <= self.maximo_anios:
+                self.errores.append(GraphQLError(
+                    f"{ruta}: anioDesde..anioHasta abarca {anios} años, "
+                    f"maximo {self.maximo_anios}",
+                    nodo
+                ))
+            pedidos["anios"] = max(anios, 1)
+        return max(pedidos.values()) if pedidos else None
+
+    def coste(self, tipo, selecciones, ruta: str = "", pagina: int = 1) -> float:
+        """Coste de selecciones sobre tipo (pagina: tamaño si es una conexión)."""
+        total = 0.0
+        for seleccion in selecciones.selections:
+            if isinstance(seleccion, FragmentSpreadNode):
+                fragmento = self.fragmentos.get(seleccion.name.value)
+                if fragmento:
+                    condicion = self.schema.get_type(fragmento.type_condition.name.value)
+                    total += self.coste(condicion or tipo, fragmento.selection_set, ruta, pagina)
+                continue
+            if isinstance(seleccion, InlineFragmentNode):
+                condicion = tipo
+                if seleccion.type_condition:
+                    condicion = self.schema.get_type(seleccion.type_condition.name.value) or tipo
+                total += self.coste(condicion, seleccion.selection_set, ruta, pagina)
+                continue
+
+            nombre = seleccion.name.value
+            definicion = getattr(tipo, "fields", {}).get(nombre)
+            if definicion is None:
+                # __typename y similares
+                continue
+            hijo = get_named_type(definicion.type)
+            if is_leaf_type(hijo):
+                total += PESOS.get(f"{tipo.name}.{nombre}", PESOS.get(f"*.{nombre}", 0))
+                continue
+
+            ruta_campo = f"{ruta}.{nombre}" if ruta else nombre
+            tamano = self._tamano(ruta_campo, definicion, seleccion)
+            pagina_hijo = 1
+            if hijo.name.endswith("Connection"):
+                # La conexión se resuelve una vez; su página (sin first/last/limit,
+                # una página máxima como en paginar) multiplica solo edges
+                pagina_hijo = self.maximo_pagina if tamano is None else tamano
+                tamano = 1
+            elif tamano is None:
+                if not _es_lista(definicion.type):
+                    tamano = 1
+                elif tipo.name.endswith("Connection"):
+                    tamano = pagina
+                else:
+                    tamano = TAMANO_LISTA
+
+            peso = PESOS.get(f"{tipo.name}.{nombre}", PESOS.get(f"*.{nombre}", 1))
+            if all(a in definicion.args for a in _RANGO_ANIOS):
+                # Lo que recorre la serie en los rollups crece con sus años
+                peso *= tamano
+            hijos = 0
+            if seleccion.selection_set:
+                hijos = self.coste(hijo, seleccion.selection_set, ruta_campo, pagina_hijo)
+            total += peso + tamano * hijos
+        return total
+
+
+def coste_operacion(schema, documento, operacion: Optional[str], variables: Optional[dict]):
+    """Coste de la operación de documento y errores de tamaño de página."""
+    fragmentos = {}
+    operaciones = []
+    for definicion in documento.definitions:
+        if isinstance(definicion, FragmentDefinitionNode):
+            fragmentos[definicion.name.value] = definicion
+        elif isinstance(definicion, OperationDefinitionNode):
+            operaciones.append(definicion)
+
+    elegida = next(
+        (o for o in operaciones if operacion is None or (o.name and o.name.value == operacion)),
+        None
+    )
+    if elegida is None:
+        return 0, []
+
+    raiz = schema.get_root_type(elegida.operation)
+    calculo = _Calculo(schema, fragmentos, variables or {})
+    return round(calculo.coste(raiz, elegida.selection_set)), calculo.errores
+
+
+class CosteConsulta(SchemaExtension):
+    """Rechaza o pone en cola las operaciones según su coste estimado."""
+
+    def __init__(self, *, execution_context=None):
+        super().__init__(execution_context=execution_context)
+        self.coste = None
+
+    async def on_execute(self):
+        contexto = self.execution_context
+        settings = get_settings()
+        self.coste, errores = coste_operacion(
+            contexto.schema._schema, contexto.graphql_document,
+            contexto.operation_name, contexto.variables
+        )
+
+        if not errores and self.coste > settings.GRAPHQL_COSTE_MAXIMO:
+            errores = [GraphQLError(
+                f"Consulta demasiado costosa: coste {self.coste}, maximo {settings.GRAPHQL_COSTE_MAXIMO}"
+            )]
+        if errores:
+            logger.warning("Consulta rechazada por coste %s: %s", self.coste, errores[0].message)
+            # Con un resultado ya puesto Strawberry no ejecuta la operación
+            contexto.result = GraphQLExecutionResult(data=None, errors=errores)
+            yield
+            return
+
+        if self.coste >= settings.GRAPHQL_COSTE_PESADO:
+            async with _semaforo_pesadas():
+                yield
+        else:
+            yield
+
+    def get_results(self):
+        if self.coste is None:
+            return {}
+        return {"coste": {"total": self.coste, "maximo": get_settings().GRAPHQL_COSTE_MAXIMO}}
@@ -1,7 +1,7 @@
 from . import convocatoria
 from . import beneficiario
 from . import concesion
-from . import catalogos
+from . import catalogs as catalogos
 from . import estadisticas
 
 __all__ = ["convocatoria", "beneficiario", "concesion", "catalogos", "estadisticas"]
@@ -1,15 +1,27 @@
 from typing import Optional, List
 from uuid import UUID
 import strawberry
-from sqlalchemy import select, or_, and_, func, desc, asc
-from sqlalchemy.orm import selectinload, joinedload
-import base64
+from sqlalchemy import select, or_, and_
 
-from ...bdns_core.db.models import Beneficiario as BeneficiarioModel, Pseudonimo as PseudonimoModel
-from ..types.beneficiario import Beneficiario, BeneficiarioConnection, BeneficiarioEdge, PageInfo
+from bdns_core.db.models import Beneficiario as BeneficiarioModel, Pseudonimo as PseudonimoModel
+from ..types.beneficiario import Beneficiario, BeneficiarioConnection, BeneficiarioEdge
 from ..inputs.beneficiario import BeneficiarioFilterInput, BeneficiarioSortInput
 from ..inputs.convocatoria import PaginationInput
-from .convocatoria import cursor_to_offset, offset_to_cursor
+from .paginacion import ClaveOrden, ordenacion, paginar
+from ..cargadores import registrar_carga
+from ..seleccion import Carga, opciones_carga, rutas_bajo, rutas_seleccionadas
+from ..sesiones import sesion
+
+
+CARGA_BENEFICIARIO = Carga(
+    relaciones={"forma_juridica": None, "tipo_beneficiario": None, "pseudonimos": None},
+    calculados={
+        "es_entidad_publica": ("forma_juridica",),
+        "es_persona_fisica": ("forma_juridica",),
+        "es_persona_juridica": ("forma_juridica",)
+    }
+)
+registrar_carga(BeneficiarioModel, CARGA_BENEFICIARIO)
 
 
 def build_filters(filters: Optional[BeneficiarioFilterInput]):
@@ -48,97 +60,51 @@ async def get_beneficiarios(
     info,
     pagination: Optional[PaginationInput] = None,
     filters: Optional[BeneficiarioFilterInput] = None,
-    sort: Optional[List[BeneficiarioSortInput]] = None
+    sort: Optional[List[BeneficiarioSortInput]] = None,
+    exacto: bool = False
 ) -> BeneficiarioConnection:
-    db = info.context["db"]
-    
     query = select(BeneficiarioModel).options(
-        joinedload(BeneficiarioModel.forma_juridica),
-        joinedload(BeneficiarioModel.tipo_beneficiario),
-        selectinload(BeneficiarioModel.pseudonimos)
+        *opciones_carga(BeneficiarioModel, CARGA_BENEFICIARIO, rutas_bajo(rutas_seleccionadas(info), "edges.node"))
     )
     
     conditions = build_filters(filters)
     if conditions:
         query = query.where(and_(*conditions))
     
-    count_query = select(func.count()).select_from(BeneficiarioModel)
-    if conditions:
-        count_query = count_query.where(and_(*conditions))
-    total_count = await db.scalar(count_query)
-    
-    limit = None
-    offset = 0
-    
-    if pagination:
-        if pagination.first:
-            limit = pagination.first
-            if pagination.after:
-                offset = cursor_to_offset(pagination.after) + 1
-        elif pagination.last:
-            limit = pagination.last
-            if pagination.before:
-                offset = max(0, cursor_to_offset(pagination.before) - pagination.last)
-        elif pagination.limit:
-            limit = pagination.limit
-            offset = pagination.offset or 0
-    
-    if sort:
-        for s in sort:
-            col = getattr(BeneficiarioModel, s.field, None)
-            if col:
-                query = query.order_by(asc(col) if s.direction == "asc" else desc(col))
-    else:
-        query = query.order_by(BeneficiarioModel.nombre)
-    
-    if limit:
-        query = query.limit(limit + 1)
-    if offset:
-        query = query.offset(offset)
-    
-    result = await db.execute(query)
-    beneficiarios = result.unique().scalars().all()
-    
-    has_next = False
-    if limit and len(beneficiarios) > limit:
-        has_next = True
-        beneficiarios = beneficiarios[:limit]
+    claves = ordenacion(
+        BeneficiarioModel, sort,
+        por_defecto=[ClaveOrden("nombre", BeneficiarioModel.nombre)]
+    )
     
-    edges = []
-    for idx, b in enumerate(beneficiarios):
-        cursor = offset_to_cursor(offset + idx, b.id)
-        edges.append(BeneficiarioEdge(cursor=cursor, node=b))
+    conteo = select(BeneficiarioModel.id)
+    if conditions:
+        conteo = conteo.where(and_(*conditions))
     
-    page_info = PageInfo(
-        has_next_page=has_next,
-        has_previous_page=offset > 0,
-        start_cursor=edges[0].cursor if edges else None,
-        end_cursor=edges[-1].cursor if edges else None,
-        total_count=total_count
+    return await paginar(
+        info, query, claves, pagination,
+        "beneficiario", BeneficiarioConnection, BeneficiarioEdge, conteo, exacto
     )
-    
-    return BeneficiarioConnection(edges=edges, page_info=page_info, total_count=total_count)
 
 
 async def get_beneficiario_by_id(info, id: UUID) -> Optional[Beneficiario]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(BeneficiarioModel).where(BeneficiarioModel.id == id).options(
-        joinedload(BeneficiarioModel.forma_juridica),
-        joinedload(BeneficiarioModel.tipo_beneficiario),
-        selectinload(BeneficiarioModel.pseudonimos)
+        *opciones_carga(BeneficiarioModel, CARGA_BENEFICIARIO, rutas_seleccionadas(info))
     )
     result = await db.execute(query)
     return result.scalar_one_or_none()
 
 
 async def buscar_beneficiarios(info, query: str, limit: int = 10) -> List[Beneficiario]:
-    db = info.context["db"]
+    db = sesion(info)
     term = f"%{query}%"
     stmt = select(BeneficiarioModel).where(
         or_(
             BeneficiarioModel.nombre.ilike(term),
             BeneficiarioModel.nif.ilike(term)
         )
+    ).options(
+        *opciones_carga(BeneficiarioModel, CARGA_BENEFICIARIO, rutas_seleccionadas(info))
     ).limit(limit)
     result = await db.execute(stmt)
     return list(result.scalars().all())
\ No newline at end of file
@@ -20,10 +20,11 @@ from ..types.catalogos import (
     Objetivo, Organo, Region, SectorActividad, TipoBeneficiario
 )
 from ..inputs.catalogos import CatalogoFilterInput
+from ..sesiones import sesion
 
 
 async def get_finalidades(info, filters: Optional[CatalogoFilterInput] = None) -> List[Finalidad]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(FinalidadModel)
     
     if filters:
@@ -40,7 +41,7 @@ async def get_finalidades(info, filters: Optional[CatalogoFilterInput] = None) -
 
 
 async def get_fondos(info, filters: Optional[CatalogoFilterInput] = None) -> List[Fondo]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(FondoModel)
     
     if filters:
@@ -55,7 +56,7 @@ async def get_fondos(info, filters: Optional[CatalogoFilterInput] = None) -> Lis
 
 
 async def get_formas_juridicas(info, filters: Optional[CatalogoFilterInput] = None) -> List[FormaJuridica]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(FormaJuridicaModel)
     
     if filters:
@@ -72,7 +73,7 @@ async def get_formas_juridicas(info, filters: Optional[CatalogoFilterInput] = No
 
 
 async def get_instrumentos(info, filters: Optional[CatalogoFilterInput] = None) -> List[Instrumento]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(InstrumentoModel)
     
     if filters:
@@ -87,7 +88,7 @@ async def get_instrumentos(info, filters: Optional[CatalogoFilterInput] = None)
 
 
 async def get_objetivos(info, filters: Optional[CatalogoFilterInput] = None) -> List[Objetivo]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(ObjetivoModel)
     
     if filters:
@@ -106,7 +107,7 @@ async def get_organos(
     filters: Optional[CatalogoFilterInput] = None,
     incluir_hijos: bool = False
 ) -> List[Organo]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(OrganoModel)
     
     if incluir_hijos:
@@ -133,7 +134,7 @@ async def get_regiones(
     filters: Optional[CatalogoFilterInput] = None,
     incluir_hijos: bool = False
 ) -> List[Region]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(RegionModel)
     
     if incluir_hijos:
@@ -155,7 +156,7 @@ async def get_sectores_actividad(
     filters: Optional[CatalogoFilterInput] = None,
     incluir_hijos: bool = False
 ) -> List[SectorActividad]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(SectorActividadModel)
     
     if incluir_hijos:
@@ -175,7 +176,7 @@ async def get_sectores_actividad(
 
 
 async def get_tipos_beneficiario(info, filters: Optional[CatalogoFilterInput] = None) -> List[TipoBeneficiario]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(TipoBeneficiarioModel)
     
     if filters:
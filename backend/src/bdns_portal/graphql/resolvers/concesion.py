@@ -1,30 +1,37 @@
 from typing import Optional, List
 from uuid import UUID
 import strawberry
-from sqlalchemy import select, and_, or_, func, desc, asc
-from sqlalchemy.orm import selectinload, joinedload
-import base64
+from sqlalchemy import select, and_, or_, func
 
 from bdns_core.db.models import Concesion as ConcesionModel
 from bdns_core.db.models import Beneficiario, Convocatoria, RegimenAyuda
-from types.concesion import Concesion, ConcesionConnection, ConcesionEdge
-from types.convocatoria import PageInfo
-from inputs.concesion import ConcesionFilterInput, ConcesionSortInput
-from inputs.convocatoria import PaginationInput
+from ..types.concesion import Concesion, ConcesionConnection, ConcesionEdge
+from ..inputs.concesion import ConcesionFilterInput, ConcesionSortInput
+from ..inputs.convocatoria import PaginationInput
+from .filtros_fecha import filtros_fecha_concesion
+from .paginacion import ClaveOrden, ordenacion, paginar
+from ..cargadores import registrar_carga
+from ..seleccion import POR_CARGADOR, Carga, opciones_carga, rutas_bajo, rutas_seleccionadas
+from ..sesiones import sesion
 
 
-def cursor_to_offset(cursor: Optional[str]) -> int:
-    if not cursor:
-        return 0
-    try:
-        decoded = base64.b64decode(cursor).decode()
-        return int(decoded.split(':')[1])
-    except:
-        return 0
-
-
-def offset_to_cursor(offset: int, id: UUID) -> str:
-    return base64.b64encode(f"concesion:{offset}:{id}".encode()).decode()
+# Beneficiario y convocatoria por DataLoader: se comparten entre filas
+# repetidas y con otros campos raíz de la misma petición
+CARGA_CONCESION = Carga(
+    relaciones={
+        "beneficiario": POR_CARGADOR,
+        "convocatoria": POR_CARGADOR,
+        "regimen_ayuda": None
+    },
+    calculados={
+        "importe": ("importe_equivalente", "importe_nominal", "regimen_ayuda"),
+        "importe_formateado": ("importe_equivalente", "importe_nominal", "regimen_ayuda"),
+        "es_ayuda_estado": ("regimen_ayuda",),
+        "es_minimis": ("regimen_ayuda",),
+        "organo_concedente_id": ("convocatoria.organo_id",)
+    }
+)
+registrar_carga(ConcesionModel, CARGA_CONCESION)
 
 
 def build_filters(filters: Optional[ConcesionFilterInput]):
@@ -84,14 +91,14 @@ def build_filters(filters: Optional[ConcesionFilterInput]):
                     )
                 )
     
-    if filters.fecha_desde:
-        conditions.append(ConcesionModel.fecha_concesion >= filters.fecha_desde)
-    if filters.fecha_hasta:
-        conditions.append(ConcesionModel.fecha_concesion <= filters.fecha_hasta)
-    if filters.anio:
-        conditions.append(
-            func.extract('year', ConcesionModel.fecha_concesion) == filters.anio
+    # Rangos semiabiertos sobre fecha_concesion para podar particiones
+    conditions.extend(
+        filtros_fecha_concesion(
+            anio=filters.anio,
+            fecha_desde=filters.fecha_desde,
+            fecha_hasta=filters.fecha_hasta
         )
+    )
     
     if filters.solo_ayudas_estado:
         conditions.append(
@@ -109,93 +116,44 @@ async def get_concesiones(
     info,
     pagination: Optional[PaginationInput] = None,
     where: Optional[ConcesionFilterInput] = None,
-    order_by: Optional[List[ConcesionSortInput]] = None
+    order_by: Optional[List[ConcesionSortInput]] = None,
+    exacto: bool = False
 ) -> ConcesionConnection:
-    db = info.context["db"]
-    
     query = select(ConcesionModel).options(
-        joinedload(ConcesionModel.beneficiario),
-        joinedload(ConcesionModel.convocatoria),
-        joinedload(ConcesionModel.regimen_ayuda)
+        *opciones_carga(ConcesionModel, CARGA_CONCESION, rutas_bajo(rutas_seleccionadas(info), "edges.node"))
     )
     
     conditions = build_filters(where)
     if conditions:
         query = query.where(and_(*conditions))
     
-    count_query = select(func.count()).select_from(ConcesionModel)
-    if conditions:
-        count_query = count_query.where(and_(*conditions))
-    total_count = await db.scalar(count_query)
-    
-    limit = None
-    offset = 0
-    
-    if pagination:
-        if pagination.first:
-            limit = pagination.first
-            if pagination.after:
-                offset = cursor_to_offset(pagination.after) + 1
-        elif pagination.last:
-            limit = pagination.last
-            if pagination.before:
-                offset = max(0, cursor_to_offset(pagination.before) - pagination.last)
-        elif pagination.limit:
-            limit = pagination.limit
-            offset = pagination.offset or 0
-    
-    if order_by:
-        for s in order_by:
-            if s.field == "importe":
-                if where and where.solo_ayudas_estado:
-                    col = ConcesionModel.importe_equivalente
-                elif where and where.solo_minimis:
-                    col = ConcesionModel.importe_nominal
-                else:
-                    col = func.coalesce(ConcesionModel.importe_nominal, ConcesionModel.importe_equivalente, 0)
-            else:
-                col = getattr(ConcesionModel, s.field, None)
-            
-            if col is not None:
-                query = query.order_by(asc(col) if s.direction == "asc" else desc(col))
+    if where and where.solo_ayudas_estado:
+        importe = ConcesionModel.importe_equivalente
+    elif where and where.solo_minimis:
+        importe = ConcesionModel.importe_nominal
     else:
-        query = query.order_by(desc(ConcesionModel.fecha_concesion))
-    
-    if limit:
-        query = query.limit(limit + 1)
-    if offset:
-        query = query.offset(offset)
-    
-    result = await db.execute(query)
-    concesiones = result.unique().scalars().all()
+        importe = func.coalesce(ConcesionModel.importe_nominal, ConcesionModel.importe_equivalente, 0)
     
-    has_next = False
-    if limit and len(concesiones) > limit:
-        has_next = True
-        concesiones = concesiones[:limit]
+    claves = ordenacion(
+        ConcesionModel, order_by,
+        por_defecto=[ClaveOrden("fecha_concesion", ConcesionModel.fecha_concesion, descendente=True)],
+        expresiones={"importe": importe}
+    )
     
-    edges = []
-    for idx, c in enumerate(concesiones):
-        cursor = offset_to_cursor(offset + idx, c.id)
-        edges.append(ConcesionEdge(cursor=cursor, node=c))
+    conteo = select(ConcesionModel.id)
+    if conditions:
+        conteo = conteo.where(and_(*conditions))
     
-    page_info = PageInfo(
-        has_next_page=has_next,
-        has_previous_page=offset > 0,
-        start_cursor=edges[0].cursor if edges else None,
-        end_cursor=edges[-1].cursor if edges else None,
-        total_count=total_count
+    return await paginar(
+        info, query, claves, pagination,
+        "concesion", ConcesionConnection, ConcesionEdge, conteo, exacto
     )
-    
-    return ConcesionConnection(edges=edges, page_info=page_info, total_count=total_count)
 
 
 async def get_concesion_by_id(info, id: UUID) -> Optional[Concesion]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(ConcesionModel).where(ConcesionModel.id == id).options(
-        joinedload(ConcesionModel.beneficiario),
-        joinedload(ConcesionModel.convocatoria),
-        joinedload(ConcesionModel.regimen_ayuda)
+        *opciones_carga(ConcesionModel, CARGA_CONCESION, rutas_seleccionadas(info))
     )
     result = await db.execute(query)
     return result.scalar_one_or_none()
@@ -1,28 +1,33 @@
 from typing import Optional, List
 from uuid import UUID
 import strawberry
-from sqlalchemy import select, and_, or_, func, desc, asc
-from sqlalchemy.orm import selectinload, joinedload
-import base64
-import json
+from sqlalchemy import select, and_, or_
 
 from bdns_core.db.models import Convocatoria, Instrumento, Region
-from ..types import Convocatoria, ConvocatoriaConnection, ConvocatoriaEdge, PageInfo
+from ..types import ConvocatoriaConnection, ConvocatoriaEdge
 from ..inputs import ConvocatoriaFilterInput, ConvocatoriaSortInput, PaginationInput
+from .paginacion import ClaveOrden, ordenacion, paginar
+from ..cargadores import registrar_carga
+from ..seleccion import POR_CARGADOR, Carga, opciones_carga, rutas_bajo, rutas_seleccionadas
+from ..sesiones import sesion
 
 
-def cursor_to_offset(cursor: Optional[str]) -> int:
-    if not cursor:
-        return 0
-    try:
-        decoded = base64.b64decode(cursor).decode()
-        return int(decoded.split(':')[1])
-    except:
-        return 0
-
-
-def offset_to_cursor(offset: int, id: UUID) -> str:
-    return base64.b64encode(f"convocatoria:{offset}:{id}".encode()).decode()
+# Documentos y anuncios (texto largo) solo se leen si se piden; el órgano
+# va por DataLoader, compartido con Organo.padre y otros campos raíz
+CARGA_CONVOCATORIA = Carga(
+    relaciones={
+        "organo": POR_CARGADOR, "reglamento": None, "finalidad": None,
+        "instrumentos": None, "tipos_beneficiarios": None, "sectores_actividad": None,
+        "regiones": None, "fondos": None, "objetivos": None, "sectores_producto": None,
+        "documentos": Carga(), "anuncios": Carga()
+    },
+    calculados={
+        "estado": ("fecha_inicio_solicitud", "fecha_fin_solicitud", "abierto"),
+        "dias_restantes": ("fecha_inicio_solicitud", "fecha_fin_solicitud", "abierto"),
+        "presupuesto_formateado": ("presupuesto_total",)
+    }
+)
+registrar_carga(Convocatoria, CARGA_CONVOCATORIA)
 
 
 def build_filters(filters: Optional[ConvocatoriaFilterInput]):
@@ -92,125 +97,57 @@ def build_filters(filters: Optional[ConvocatoriaFilterInput]):
     return conditions
 
 
-def apply_sorting(query, sort: Optional[List[ConvocatoriaSortInput]]):
-    if not sort:
-        return query.order_by(desc(Convocatoria.fecha_recepcion))
-    
-    for s in sort:
-        col = getattr(Convocatoria, s.field, None)
-        if col:
-            if s.direction == "asc":
-                query = query.order_by(asc(col))
-            else:
-                query = query.order_by(desc(col))
-    return query
+def apply_sorting(sort: Optional[List[ConvocatoriaSortInput]]) -> List[ClaveOrden]:
+    return ordenacion(
+        Convocatoria, sort,
+        por_defecto=[ClaveOrden("fecha_recepcion", Convocatoria.fecha_recepcion, descendente=True)]
+    )
 
 
 async def get_convocatorias(
     info,
     pagination: Optional[PaginationInput] = None,
     filters: Optional[ConvocatoriaFilterInput] = None,
-    sort: Optional[List[ConvocatoriaSortInput]] = None
+    sort: Optional[List[ConvocatoriaSortInput]] = None,
+    exacto: bool = False
 ) -> ConvocatoriaConnection:
-    db = info.context["db"]
-    
     query = select(Convocatoria).options(
-        joinedload(Convocatoria.organo),
-        joinedload(Convocatoria.reglamento),
-        joinedload(Convocatoria.finalidad),
-        selectinload(Convocatoria.instrumentos),
-        selectinload(Convocatoria.tipos_beneficiarios),
-        selectinload(Convocatoria.sectores_actividad),
-        selectinload(Convocatoria.regiones),
-        selectinload(Convocatoria.fondos),
-        selectinload(Convocatoria.objetivos),
-        selectinload(Convocatoria.documentos),
-        selectinload(Convocatoria.anuncios)
+        *opciones_carga(Convocatoria, CARGA_CONVOCATORIA, rutas_bajo(rutas_seleccionadas(info), "edges.node"))
     )
     
     conditions = build_filters(filters)
     if conditions:
         query = query.where(and_(*conditions))
     
-    count_query = select(func.count()).select_from(Convocatoria)
+    conteo = select(Convocatoria.id)
     if conditions:
-        count_query = count_query.where(and_(*conditions))
-    total_count = await db.scalar(count_query)
-    
-    limit = None
-    offset = 0
-    
-    if pagination:
-        if pagination.first:
-            limit = pagination.first
-            if pagination.after:
-                offset = cursor_to_offset(pagination.after) + 1
-        elif pagination.last:
-            limit = pagination.last
-            if pagination.before:
-                offset = max(0, cursor_to_offset(pagination.before) - pagination.last)
-        elif pagination.limit:
-            limit = pagination.limit
-            offset = pagination.offset or 0
-    
-    query = apply_sorting(query, sort)
-    
-    if limit:
-        query = query.limit(limit + 1)
-    if offset:
-        query = query.offset(offset)
+        conteo = conteo.where(and_(*conditions))
     
-    result = await db.execute(query)
-    convocatorias = result.unique().scalars().all()
-    
-    has_next = False
-    if limit and len(convocatorias) > limit:
-        has_next = True
-        convocatorias = convocatorias[:limit]
-    
-    edges = []
-    for idx, c in enumerate(convocatorias):
-        cursor = offset_to_cursor(offset + idx, c.id)
-        edges.append(ConvocatoriaEdge(cursor=cursor, node=c))
-    
-    page_info = PageInfo(
-        has_next_page=has_next,
-        has_previous_page=offset > 0,
-        start_cursor=edges[0].cursor if edges else None,
-        end_cursor=edges[-1].cursor if edges else None,
-        total_count=total_count
+    return await paginar(
+        info, query, apply_sorting(sort), pagination,
+        "convocatoria", ConvocatoriaConnection, ConvocatoriaEdge, conteo, exacto
     )
-    
-    return ConvocatoriaConnection(edges=edges, page_info=page_info, total_count=total_count)
 
 
 async def get_convocatoria_by_id(info, id: UUID) -> Optional[Convocatoria]:
-    db = info.context["db"]
+    db = sesion(info)
     query = select(Convocatoria).where(Convocatoria.id == id).options(
-        joinedload(Convocatoria.organo),
-        joinedload(Convocatoria.reglamento),
-        joinedload(Convocatoria.finalidad),
-        selectinload(Convocatoria.instrumentos),
-        selectinload(Convocatoria.tipos_beneficiarios),
-        selectinload(Convocatoria.sectores_actividad),
-        selectinload(Convocatoria.regiones),
-        selectinload(Convocatoria.fondos),
-        selectinload(Convocatoria.objetivos),
-        selectinload(Convocatoria.documentos),
-        selectinload(Convocatoria.anuncios)
+        *opciones_carga(Convocatoria, CARGA_CONVOCATORIA, rutas_seleccionadas(info))
     )
     result = await db.execute(query)
     return result.scalar_one_or_none()
 
 
 async def buscar_convocatorias(info, query: str, limit: int = 10) -> List[Convocatoria]:
-    db = info.context["db"]
+    db = sesion(info)
     term = f"%{query}%"
     stmt = select(Convocatoria).where(
         or_(
             Convocatoria.titulo.ilike(term),
             Convocatoria.codigo_bdns.ilike(term)
         )
+    ).options(
+        *opciones_carga(Convocatoria, CARGA_CONVOCATORIA, rutas_seleccionadas(info))
     ).limit(limit)
     result = await db.execute(stmt)
     return list(result.scalars().all())
\ No newline at end of file
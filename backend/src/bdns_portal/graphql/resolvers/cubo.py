@@ -0,0 +1,254 @@
+"""
+Consulta OLAP genérica sobre los rollups de estadísticas.
+
+estadisticas(dimensiones, medidas, filtros) se compila aquí en una única
+sentencia GROUP BY / ROLLUP / CUBE / GROUPING SETS sobre
+rollup_concesion_mensual, de modo que el total, los subtotales y el
+desglose de un panel salen de un solo recorrido. GROUPING() marca en
+cada fila qué dimensiones están sumarizadas.
+
+Las filas con valor desconocido (NULL) en una dimensión se conservan,
+para que subtotales y total cuadren con el total sin desglosar: una
+dimensión NULL con GROUPING() = 0 es "desconocido" y con GROUPING() = 1
+es "agregado". Los resolvers específicos, sin subtotales, piden
+descartar_desconocidos.
+"""
+from typing import Optional, Sequence
+
+from sqlalchemy import select, func, tuple_, literal, and_, extract, distinct, Integer
+
+from bdns_core.db.models import Concesion as ConcesionModel
+from bdns_core.db.models import Convocatoria as ConvocatoriaModel
+from bdns_core.db.models import Organo as OrganoModel
+from bdns_core.db.models import Region as RegionModel
+
+from ...rollup import rollup_concesion_mensual, rollup_beneficiarios_hll
+from .filtros_fecha import filtros_fecha_concesion
+from ..types.estadisticas import (
+    AgrupacionEstadistica,
+    DimensionEstadistica,
+    FiltroEstadisticas
+)
+
+# Etiqueta de cada dimensión en las filas del resultado
+ETIQUETAS = {
+    DimensionEstadistica.ANIO: "anio",
+    DimensionEstadistica.MES: "mes",
+    DimensionEstadistica.ORGANO: "organo_id",
+    DimensionEstadistica.TIPO_ENTIDAD: "tipo_entidad",
+    DimensionEstadistica.REGION: "region_id",
+    DimensionEstadistica.REGIMEN: "regimen",
+}
+
+# Los sketches HLL solo existen por (anio, region, organo)
+DIMENSIONES_BENEFICIARIOS = (
+    DimensionEstadistica.ANIO,
+    DimensionEstadistica.ORGANO,
+    DimensionEstadistica.REGION,
+)
+
+
+def etiqueta_agregado(dimension: DimensionEstadistica) -> str:
+    return f"agregado_{dimension.value}"
+
+
+def _columnas(tabla) -> dict:
+    return {
+        dimension: tabla.c[etiqueta]
+        for dimension, etiqueta in ETIQUETAS.items()
+        if etiqueta in tabla.c
+    }
+
+
+def filtros_rollup(filtros: Optional[FiltroEstadisticas], tabla=rollup_concesion_mensual) -> list:
+    """Predicados de FiltroEstadisticas sobre una tabla de rollup."""
+    if not filtros:
+        return []
+
+    c = tabla.c
+    condiciones = []
+    if filtros.anio:
+        condiciones.append(c.anio == filtros.anio)
+    else:
+        if filtros.anio_desde:
+            condiciones.append(c.anio >= filtros.anio_desde)
+        if filtros.anio_hasta:
+            condiciones.append(c.anio <= filtros.anio_hasta)
+
+    for campo, columna in (
+        ("tipo_entidad", "tipo_entidad"),
+        ("organo_id", "organo_id"),
+        ("region_id", "region_id"),
+        ("regimen", "regimen"),
+    ):
+        valor = getattr(filtros, campo)
+        if valor:
+            if columna not in c:
+                raise ValueError(f"El filtro {campo} no aplica a {tabla.name}")
+            condiciones.append(c[columna] == valor)
+    return condiciones
+
+
+def _agrupacion(
+    columnas: dict,
+    dimensiones: Sequence[DimensionEstadistica],
+    agrupacion: AgrupacionEstadistica,
+    conjuntos: Optional[Sequence[Sequence[DimensionEstadistica]]]
+) -> list:
+    """Cláusula GROUP BY. Sin dimensiones no se agrupa (solo el total)."""
+    if not dimensiones:
+        return []
+
+    if conjuntos is not None:
+        return [func.grouping_sets(*[
+            tuple_(*[columnas[d] for d in conjunto]) for conjunto in conjuntos
+        ])]
+
+    cols = [columnas[d] for d in dimensiones]
+    if agrupacion == AgrupacionEstadistica.ROLLUP:
+        return [func.rollup(*cols)]
+    if agrupacion == AgrupacionEstadistica.CUBE:
+        return [func.cube(*cols)]
+    return cols
+
+
+def _agregado(
+    tabla,
+    medidas: list,
+    dimensiones: Sequence[DimensionEstadistica],
+    filtros: Optional[FiltroEstadisticas],
+    agrupacion: AgrupacionEstadistica,
+    conjuntos: Optional[Sequence[Sequence[DimensionEstadistica]]],
+    descartar_desconocidos: bool = False
+):
+    columnas = _columnas(tabla)
+    stmt = select(
+        *[columnas[d].label(ETIQUETAS[d]) for d in dimensiones],
+        # GROUPING(col) = 1 cuando la fila sumariza esa dimensión
+        *[func.grouping(columnas[d]).label(etiqueta_agregado(d)) for d in dimensiones],
+        *medidas
+    ).select_from(tabla)
+
+    condiciones = filtros_rollup(filtros, tabla)
+    if descartar_desconocidos:
+        condiciones += [columnas[d].isnot(None) for d in dimensiones]
+    if condiciones:
+        stmt = stmt.where(*condiciones)
+
+    return stmt.group_by(*_agrupacion(columnas, dimensiones, agrupacion, conjuntos))
+
+
+def _concesiones_beneficiario(filtros: Optional[FiltroEstadisticas]):
+    """(anio, region_id, organo_id, beneficiario_id) por concesión.
+
+    Sustituye a rollup_beneficiarios_hll cuando no hay extensión hll: las
+    mismas columnas de dimensión, para agregarlas con count(DISTINCT).
+    """
+    stmt = (
+        select(
+            extract('year', ConcesionModel.fecha_concesion).cast(Integer).label("anio"),
+            ConcesionModel.region_id.label("region_id"),
+            ConvocatoriaModel.organo_id.label("organo_id"),
+            ConcesionModel.beneficiario_id.label("beneficiario_id")
+        )
+        .select_from(ConcesionModel)
+        .join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
+    )
+    if filtros:
+        # Poda de particiones; filtros_rollup vuelve a filtrar por anio
+        stmt = stmt.where(*filtros_fecha_concesion(
+            anio=filtros.anio, anio_desde=filtros.anio_desde, anio_hasta=filtros.anio_hasta
+        ))
+    return stmt.subquery("concesiones_beneficiario")
+
+
+def cubo_stmt(
+    dimensiones: Sequence[DimensionEstadistica],
+    filtros: Optional[FiltroEstadisticas] = None,
+    agrupacion: AgrupacionEstadistica = AgrupacionEstadistica.GRUPO,
+    conjuntos: Optional[Sequence[Sequence[DimensionEstadistica]]] = None,
+    beneficiarios: bool = False,
+    beneficiarios_exactos: bool = False,
+    descartar_desconocidos: bool = False
+):
+    """Compila una consulta del cubo.
+
+    Cada fila trae las etiquetas de ETIQUETAS de las dimensiones pedidas,
+    agregado_<dimension>, numero_concesiones, importe_total y, si hay
+    órgano o región, organo_nombre / region_nombre. Con beneficiarios=True
+    añade numero_beneficiarios desde los sketches HLL, agrupados con los
+    mismos conjuntos y unidos celda a celda en la misma sentencia; con
+    beneficiarios_exactos=True, con count(DISTINCT) sobre bdns.concesion.
+
+    descartar_desconocidos=True quita las filas con alguna dimensión NULL;
+    solo con GROUP BY simple, porque los subtotales dejarían de cuadrar.
+    """
+    dimensiones = list(dict.fromkeys(dimensiones))
+    if descartar_desconocidos and (agrupacion != AgrupacionEstadistica.GRUPO or conjuntos is not None):
+        raise ValueError("descartar_desconocidos solo admite la agrupacion simple")
+    if conjuntos is not None:
+        conjuntos = [list(dict.fromkeys(conjunto)) for conjunto in conjuntos]
+        usadas = {d for conjunto in conjuntos for d in conjunto}
+        if usadas != set(dimensiones):
+            # Cada dimensión pedida debe aparecer en algún conjunto y viceversa
+            raise ValueError(
+                "Los conjuntos deben usar exactamente las dimensiones pedidas: "
+                + ", ".join(sorted(d.value for d in usadas.symmetric_difference(dimensiones)))
+            )
+
+    rollup = rollup_concesion_mensual.c
+    agregado = _agregado(
+        rollup_concesion_mensual,
+        [
+            func.sum(rollup.numero_concesiones).label("numero_concesiones"),
+            func.sum(rollup.importe_total).label("importe_total")
+        ],
+        dimensiones, filtros, agrupacion, conjuntos, descartar_desconocidos
+    ).subquery("agregado")
+
+    nivel = sum(
+        (agregado.c[etiqueta_agregado(d)] for d in dimensiones),
+        literal(0)
+    ).label("nivel")
+    columnas = [*agregado.c, nivel]
+    stmt_from = agregado
+
+    if DimensionEstadistica.ORGANO in dimensiones:
+        columnas.append(OrganoModel.nombre.label("organo_nombre"))
+        stmt_from = stmt_from.outerjoin(OrganoModel, agregado.c.organo_id == OrganoModel.id)
+    if DimensionEstadistica.REGION in dimensiones:
+        columnas.append(RegionModel.descripcion.label("region_nombre"))
+        stmt_from = stmt_from.outerjoin(RegionModel, agregado.c.region_id == RegionModel.id)
+
+    if beneficiarios:
+        no_soportadas = set(dimensiones) - set(DIMENSIONES_BENEFICIARIOS)
+        if no_soportadas:
+            raise ValueError(
+                "numero_beneficiarios solo admite las dimensiones anio, organo y region"
+            )
+        if beneficiarios_exactos:
+            origen = _concesiones_beneficiario(filtros)
+            medida = func.count(distinct(origen.c.beneficiario_id))
+        else:
+            origen = rollup_beneficiarios_hll
+            medida = func.round(func.hll_cardinality(func.hll_union_agg(origen.c.beneficiarios)))
+        hll = _agregado(
+            origen,
+            [medida.label("numero_beneficiarios")],
+            dimensiones, filtros, agrupacion, conjuntos, descartar_desconocidos
+        ).subquery("beneficiarios")
+
+        # La misma celda: mismos valores y mismas dimensiones sumarizadas
+        condiciones = []
+        for d in dimensiones:
+            etiqueta = ETIQUETAS[d]
+            condiciones.append(agregado.c[etiqueta].is_not_distinct_from(hll.c[etiqueta]))
+            condiciones.append(agregado.c[etiqueta_agregado(d)] == hll.c[etiqueta_agregado(d)])
+        columnas.append(func.coalesce(hll.c.numero_beneficiarios, 0).label("numero_beneficiarios"))
+        stmt_from = stmt_from.outerjoin(hll, and_(*condiciones) if condiciones else literal(True))
+
+    return (
+        select(*columnas)
+        .select_from(stmt_from)
+        .order_by(nivel.desc(), agregado.c.importe_total.desc())
+    )
@@ -1,6 +1,7 @@
-from typing import List, Optional
+from typing import Awaitable, Callable, Iterable, List, Optional, Sequence
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, extract, case
+from sqlalchemy import select, func, extract, case, and_
 from sqlalchemy.sql import text
 from bdns_core.db.models import Concesion as ConcesionModel
 from bdns_core.db.models import Beneficiario as BeneficiarioModel
@@ -9,16 +10,70 @@ from bdns_core.db.models import Organo as OrganoModel
 from bdns_core.db.models import FormaJuridica as FormaJuridicaModel
 from bdns_core.db.models import Region as RegionModel
 from bdns_core.db.models import RegimenAyuda as RegimenAyudaModel
-from types.estadisticas import (
+from ..types.estadisticas import (
     EstadisticasConcesiones, 
     FiltroEstadisticas,
     EvolucionMensual,
+    EvolucionMensualAnio,
     EstadisticasRegimen,
     EstadisticasRegion,
     TopConvocatoria,
-    ComparativaAnual
+    ComparativaAnual,
+    EvolucionAnual,
+    BeneficiariosDistintos,
+    CeldaEstadistica,
+    DimensionEstadistica,
+    MedidaEstadistica,
+    AgrupacionEstadistica
 )
-from cache.redis_cache import redis_cache
+from ...cache.redis_cache import redis_cache, etiqueta
+from ...cache.codec import registrar_tipos
+from ...core.config import get_settings
+from ...core.database import get_sessionmaker
+from ...rollup import (
+    rollup_concesion_mensual, rollup_beneficiarios_hll, rollup_actividad_beneficiario,
+    HLL_ERROR_RELATIVO, hll_disponible, importe_concesion
+)
+from ...analytics import motor_estadisticas
+from ..sesiones import sesion
+from . import estadisticas_motor
+from .filtros_fecha import filtro_anio, filtro_anios, filtro_rango_anios
+from .cubo import cubo_stmt, ETIQUETAS, etiqueta_agregado
+from .particiones import agregar_por_anio, paralelo_activo
+
+# Tipos que se guardan en cache y se reconstruyen al leerla
+registrar_tipos(
+    EstadisticasConcesiones,
+    EvolucionMensual,
+    EvolucionMensualAnio,
+    EstadisticasRegimen,
+    EstadisticasRegion,
+    TopConvocatoria,
+    ComparativaAnual,
+    EvolucionAnual,
+    BeneficiariosDistintos,
+    CeldaEstadistica,
+    DimensionEstadistica
+)
+
+# Los rankings con limite cachean un único top-K canónico por filtros y lo
+# recortan para cualquier limite <= K; por encima de K se consulta en vivo
+# sin caché
+TOP_K_CANONICO = 500
+
+
+def rango_anios(anio_desde: int, anio_hasta: int) -> range:
+    """Años de una serie anioDesde..anioHasta, acotada por ESTADISTICAS_MAX_ANIOS.
+    
+    Las series generan una fila (o 12) y una etiqueta de cache por año, así
+    que un rango sin límite se rechaza antes de consultar nada.
+    """
+    maximo = get_settings().ESTADISTICAS_MAX_ANIOS
+    if anio_hasta < anio_desde:
+        raise ValueError("anioHasta no puede ser anterior a anioDesde")
+    if anio_hasta - anio_desde + 1 > maximo:
+        raise ValueError(f"El rango de años supera el máximo de {maximo}")
+    return range(anio_desde, anio_hasta + 1)
 
 
 # ============================================================================
@@ -29,120 +84,65 @@ async def get_estadisticas_por_tipo_entidad(
     info,
     filtros: Optional[FiltroEstadisticas] = None
 ) -> List[EstadisticasConcesiones]:
-    db = info.context["db"]
-    
     cache_key = f"estadisticas:tipo_entidad:{_build_cache_key_from_filtros(filtros)}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
-    
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
     
-    stmt = (
-        select(
-            FormaJuridicaModel.tipo.label("tipo_entidad"),
-            anio_col.label("anio"),
-            func.count().label("numero_concesiones"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_total")
-        )
-        .join(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
-        .join(FormaJuridicaModel, BeneficiarioModel.forma_juridica_id == FormaJuridicaModel.id)
-        .group_by(FormaJuridicaModel.tipo, anio_col)
-    )
-    
-    if filtros:
-        if filtros.anio:
-            stmt = stmt.where(anio_col == filtros.anio)
-        elif filtros.anio_desde and filtros.anio_hasta:
-            stmt = stmt.where(anio_col >= filtros.anio_desde)
-            stmt = stmt.where(anio_col <= filtros.anio_hasta)
-        if filtros.tipo_entidad:
-            stmt = stmt.where(FormaJuridicaModel.tipo == filtros.tipo_entidad)
-    
-    stmt = stmt.order_by(func.sum(
-        func.coalesce(ConcesionModel.importe_equivalente, 0) +
-        func.coalesce(ConcesionModel.importe_nominal, 0)
-    ).desc())
-    
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    estadisticas = [
-        EstadisticasConcesiones(
-            tipo_entidad=row.tipo_entidad,
-            anio=int(row.anio) if row.anio else None,
-            numero_concesiones=row.numero_concesiones,
-            importe_total=float(row.importe_total) if row.importe_total else 0
-        )
-        for row in rows
-    ]
+    async def calcular(db: AsyncSession) -> List[EstadisticasConcesiones]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.por_tipo_entidad(db, filtros)
+        else:
+            result = await db.execute(cubo_stmt(
+                [DimensionEstadistica.TIPO_ENTIDAD, DimensionEstadistica.ANIO],
+                filtros,
+                descartar_desconocidos=True
+            ))
+            rows = result.all()
+        
+        estadisticas = [
+            EstadisticasConcesiones(
+                tipo_entidad=row.tipo_entidad,
+                anio=int(row.anio) if row.anio else None,
+                numero_concesiones=int(row.numero_concesiones),
+                importe_total=float(row.importe_total) if row.importe_total else 0
+            )
+            for row in rows
+        ]
+        
+        return estadisticas
     
-    await redis_cache.set(cache_key, estadisticas, expire=3600)
-    return estadisticas
+    return await _cacheado(info, cache_key, calcular, _etiquetas(filtros))
 
 
 async def get_estadisticas_por_organo(
     info,
     filtros: Optional[FiltroEstadisticas] = None
 ) -> List[EstadisticasConcesiones]:
-    db = info.context["db"]
-    
     cache_key = f"estadisticas:organo:{_build_cache_key_from_filtros(filtros)}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
     
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
-    
-    stmt = (
-        select(
-            OrganoModel.id.label("organo_id"),
-            OrganoModel.nombre.label("organo_nombre"),
-            anio_col.label("anio"),
-            func.count().label("numero_concesiones"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_total")
-        )
-        .join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
-        .join(OrganoModel, ConvocatoriaModel.organo_id == OrganoModel.id)
-        .group_by(OrganoModel.id, OrganoModel.nombre, anio_col)
-    )
-    
-    if filtros:
-        if filtros.anio:
-            stmt = stmt.where(anio_col == filtros.anio)
-        elif filtros.anio_desde and filtros.anio_hasta:
-            stmt = stmt.where(anio_col >= filtros.anio_desde)
-            stmt = stmt.where(anio_col <= filtros.anio_hasta)
-        if filtros.organo_id:
-            stmt = stmt.where(OrganoModel.id == filtros.organo_id)
-    
-    stmt = stmt.order_by(func.sum(
-        func.coalesce(ConcesionModel.importe_equivalente, 0) +
-        func.coalesce(ConcesionModel.importe_nominal, 0)
-    ).desc())
-    
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    estadisticas = [
-        EstadisticasConcesiones(
-            organo_id=str(row.organo_id),
-            organo_nombre=row.organo_nombre,
-            anio=int(row.anio) if row.anio else None,
-            numero_concesiones=row.numero_concesiones,
-            importe_total=float(row.importe_total) if row.importe_total else 0
-        )
-        for row in rows
-    ]
+    async def calcular(db: AsyncSession) -> List[EstadisticasConcesiones]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.por_organo(db, filtros)
+        else:
+            result = await db.execute(cubo_stmt(
+                [DimensionEstadistica.ORGANO, DimensionEstadistica.ANIO],
+                filtros,
+                descartar_desconocidos=True
+            ))
+            rows = result.all()
+        
+        estadisticas = [
+            EstadisticasConcesiones(
+                organo_id=str(row.organo_id),
+                organo_nombre=row.organo_nombre,
+                anio=int(row.anio) if row.anio else None,
+                numero_concesiones=int(row.numero_concesiones),
+                importe_total=float(row.importe_total) if row.importe_total else 0
+            )
+            for row in rows
+        ]
+        
+        return estadisticas
     
-    await redis_cache.set(cache_key, estadisticas, expire=3600)
-    return estadisticas
+    return await _cacheado(info, cache_key, calcular, _etiquetas(filtros))
 
 
 async def get_concentracion_subvenciones(
@@ -151,64 +151,58 @@ async def get_concentracion_subvenciones(
     tipo_entidad: Optional[str] = None,
     limite: int = 10
 ) -> List[EstadisticasConcesiones]:
-    db = info.context["db"]
-    
-    cache_key = f"estadisticas:concentracion:anio:{anio or 'todos'}:tipo:{tipo_entidad or 'todos'}:limite:{limite}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
-    
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
-    
-    stmt = (
-        select(
-            BeneficiarioModel.id.label("beneficiario_id"),
-            BeneficiarioModel.nombre.label("beneficiario_nombre"),
-            FormaJuridicaModel.tipo.label("tipo_entidad"),
-            anio_col.label("anio"),
-            func.count().label("numero_concesiones"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_total")
-        )
-        .join(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
-        .join(FormaJuridicaModel, BeneficiarioModel.forma_juridica_id == FormaJuridicaModel.id)
-        .group_by(
-            BeneficiarioModel.id,
-            BeneficiarioModel.nombre,
-            FormaJuridicaModel.tipo,
-            anio_col
-        )
-    )
-    
-    if anio:
-        stmt = stmt.where(anio_col == anio)
-    if tipo_entidad:
-        stmt = stmt.where(FormaJuridicaModel.tipo == tipo_entidad)
-    
-    stmt = stmt.order_by(func.sum(
-        func.coalesce(ConcesionModel.importe_equivalente, 0) +
-        func.coalesce(ConcesionModel.importe_nominal, 0)
-    ).desc()).limit(limite)
-    
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    estadisticas = [
-        EstadisticasConcesiones(
-            beneficiario_id=str(row.beneficiario_id),
-            beneficiario_nombre=row.beneficiario_nombre,
-            tipo_entidad=row.tipo_entidad,
-            anio=int(row.anio) if row.anio else None,
-            numero_concesiones=row.numero_concesiones,
-            importe_total=float(row.importe_total) if row.importe_total else 0
-        )
-        for row in rows
-    ]
-    
-    await redis_cache.set(cache_key, estadisticas, expire=3600)
-    return estadisticas
+    canonico = limite <= TOP_K_CANONICO
+    limite_consulta = TOP_K_CANONICO if canonico else limite
+    
+    cache_key = f"estadisticas:concentracion:anio:{anio or 'todos'}:tipo:{tipo_entidad or 'todos'}:top:{TOP_K_CANONICO}"
+    
+    async def calcular(db: AsyncSession) -> List[EstadisticasConcesiones]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.concentracion(db, anio, tipo_entidad, limite_consulta)
+        else:
+            actividad = rollup_actividad_beneficiario.c
+            
+            stmt = (
+                select(
+                    BeneficiarioModel.id.label("beneficiario_id"),
+                    BeneficiarioModel.nombre.label("beneficiario_nombre"),
+                    actividad.tipo_entidad,
+                    actividad.anio,
+                    actividad.numero_concesiones,
+                    actividad.importe_total
+                )
+                .select_from(rollup_actividad_beneficiario)
+                .join(BeneficiarioModel, actividad.beneficiario_id == BeneficiarioModel.id)
+                .where(actividad.tipo_entidad.isnot(None))
+            )
+            
+            if anio:
+                stmt = stmt.where(actividad.anio == anio)
+            if tipo_entidad:
+                stmt = stmt.where(actividad.tipo_entidad == tipo_entidad)
+            
+            stmt = stmt.order_by(actividad.importe_total.desc()).limit(limite_consulta)
+            
+            result = await db.execute(stmt)
+            rows = result.all()
+        
+        estadisticas = [
+            EstadisticasConcesiones(
+                beneficiario_id=str(row.beneficiario_id),
+                beneficiario_nombre=row.beneficiario_nombre,
+                tipo_entidad=row.tipo_entidad,
+                anio=int(row.anio) if row.anio else None,
+                numero_concesiones=row.numero_concesiones,
+                importe_total=float(row.importe_total) if row.importe_total else 0
+            )
+            for row in rows
+        ]
+        
+        return estadisticas
+    
+    if not canonico:
+        return await calcular(sesion(info))
+    return (await _cacheado(info, cache_key, calcular, _etiquetas(anios=[anio] if anio else None)))[:limite]
 
 
 # ============================================================================
@@ -220,57 +214,115 @@ async def get_estadisticas_evolucion_mensual(
     anio: int
 ) -> List[EvolucionMensual]:
     """Evolución mensual de concesiones para un año"""
-    db = info.context["db"]
-    
     cache_key = f"estadisticas:evolucion_mensual:{anio}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
     
-    mes_col = extract('month', ConcesionModel.fecha_concesion)
+    async def calcular(db: AsyncSession) -> List[EvolucionMensual]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.evolucion_mensual(db, anio, anio)
+        else:
+            result = await db.execute(_evolucion_mensual_stmt(anio, anio))
+            rows = result.all()
+        
+        evolucion = [_evolucion_mensual_from_row(row) for row in rows]
+        
+        return evolucion
+    
+    return await _cacheado(info, cache_key, calcular, _etiquetas(anios=[anio]))
+
+
+async def get_estadisticas_evolucion_mensual_anios(
+    info,
+    anio_desde: int,
+    anio_hasta: int
+) -> List[EvolucionMensualAnio]:
+    """Matriz año x mes para un rango de años en una sola consulta"""
+    anios = rango_anios(anio_desde, anio_hasta)
+    cache_key = f"estadisticas:evolucion_mensual_anios:{anio_desde}:{anio_hasta}"
+    
+    async def calcular(db: AsyncSession) -> List[EvolucionMensualAnio]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.evolucion_mensual(db, anio_desde, anio_hasta)
+        else:
+            result = await db.execute(_evolucion_mensual_stmt(anio_desde, anio_hasta))
+            rows = result.all()
+        
+        por_anio = {anio: {} for anio in anios}
+        for row in rows:
+            por_anio[int(row.anio)][int(row.mes)] = _evolucion_mensual_from_row(row)
+        
+        # Completar los meses sin concesiones para que la matriz sea 12 x N
+        matriz = []
+        for anio, meses in por_anio.items():
+            fila = []
+            anterior = None
+            for mes in range(1, 13):
+                actual = meses.get(mes) or EvolucionMensual(
+                    mes=mes,
+                    numero_concesiones=0,
+                    importe_mensual=0,
+                    acumulado_anual=anterior.acumulado_anual if anterior else 0,
+                    porcentaje_total=anterior.porcentaje_total if anterior else 0
+                )
+                fila.append(actual)
+                anterior = actual
+            matriz.append(EvolucionMensualAnio(anio=anio, meses=fila))
+        
+        return matriz
+    
+    return await _cacheado(info, cache_key, calcular, _etiquetas(anios=anios))
+
+
+def _evolucion_mensual_stmt(anio_desde: int, anio_hasta: int):
+    """Totales mensuales con acumulado y porcentaje anual por ventanas.
     
-    # Total anual para calcular acumulado
-    total_anual = await db.scalar(
-        select(func.sum(
-            func.coalesce(ConcesionModel.importe_equivalente, 0) +
-            func.coalesce(ConcesionModel.importe_nominal, 0)
-        )).where(extract('year', ConcesionModel.fecha_concesion) == anio)
-    ) or 0
+    El acumulado y el total de cada año salen de SUM() OVER sobre el
+    agregado mensual, sin consulta aparte para el total anual.
+    """
+    rollup = rollup_concesion_mensual.c
     
-    stmt = (
+    mensual = (
         select(
-            mes_col.label("mes"),
-            func.count().label("numero_concesiones"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_mensual")
+            rollup.anio,
+            rollup.mes,
+            func.sum(rollup.numero_concesiones).label("numero_concesiones"),
+            func.sum(rollup.importe_total).label("importe_mensual")
         )
-        .where(extract('year', ConcesionModel.fecha_concesion) == anio)
-        .group_by(mes_col)
-        .order_by(mes_col)
+        .where(rollup.anio.between(anio_desde, anio_hasta))
+        .group_by(rollup.anio, rollup.mes)
+        .subquery()
     )
     
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    acumulado = 0
-    evolucion = []
+    acumulado = func.sum(mensual.c.importe_mensual).over(
+        partition_by=mensual.c.anio,
+        order_by=mensual.c.mes
+    )
+    total_anual = func.sum(mensual.c.importe_mensual).over(
+        partition_by=mensual.c.anio
+    )
     
-    for row in rows:
-        acumulado += float(row.importe_mensual or 0)
-        evolucion.append(
-            EvolucionMensual(
-                mes=int(row.mes),
-                numero_concesiones=row.numero_concesiones,
-                importe_mensual=float(row.importe_mensual or 0),
-                acumulado_anual=acumulado,
-                porcentaje_total=(acumulado / total_anual * 100) if total_anual > 0 else 0
-            )
+    return (
+        select(
+            mensual.c.anio,
+            mensual.c.mes,
+            mensual.c.numero_concesiones,
+            mensual.c.importe_mensual,
+            acumulado.label("acumulado_anual"),
+            func.coalesce(
+                acumulado * 100 / func.nullif(total_anual, 0), 0
+            ).label("porcentaje_total")
         )
-    
-    await redis_cache.set(cache_key, evolucion, expire=3600)
-    return evolucion
+        .order_by(mensual.c.anio, mensual.c.mes)
+    )
+
+
+def _evolucion_mensual_from_row(row) -> EvolucionMensual:
+    return EvolucionMensual(
+        mes=int(row.mes),
+        numero_concesiones=int(row.numero_concesiones),
+        importe_mensual=float(row.importe_mensual or 0),
+        acumulado_anual=float(row.acumulado_anual or 0),
+        porcentaje_total=float(row.porcentaje_total or 0)
+    )
 
 
 async def get_estadisticas_por_regimen(
@@ -278,113 +330,127 @@ async def get_estadisticas_por_regimen(
     anio: Optional[int] = None
 ) -> List[EstadisticasRegimen]:
     """Estadísticas por tipo de régimen (minimis, ayuda_estado, ordinaria)"""
-    db = info.context["db"]
-    
     cache_key = f"estadisticas:regimen:{anio or 'todos'}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
-    
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
-    
-    stmt = (
-        select(
-            RegimenAyudaModel.descripcion_norm.label("regimen"),
-            anio_col.label("anio"),
-            func.count().label("numero_concesiones"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_total")
-        )
-        .join(RegimenAyudaModel, ConcesionModel.regimen_ayuda_id == RegimenAyudaModel.id)
-        .group_by(RegimenAyudaModel.descripcion_norm, anio_col)
-    )
-    
-    if anio:
-        stmt = stmt.where(anio_col == anio)
     
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    # Calcular total para porcentajes
-    total_importe = sum(row.importe_total or 0 for row in rows)
-    total_concesiones = sum(row.numero_concesiones for row in rows)
-    
-    estadisticas = [
-        EstadisticasRegimen(
-            regimen=row.regimen or "desconocido",
-            anio=int(row.anio) if row.anio else None,
-            numero_concesiones=row.numero_concesiones,
-            importe_total=float(row.importe_total or 0),
-            porcentaje_importe=(float(row.importe_total or 0) / total_importe * 100) if total_importe > 0 else 0,
-            porcentaje_concesiones=(row.numero_concesiones / total_concesiones * 100) if total_concesiones > 0 else 0
-        )
-        for row in rows
-    ]
+    async def calcular(db: AsyncSession) -> List[EstadisticasRegimen]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.por_regimen(db, anio)
+        else:
+            result = await db.execute(cubo_stmt(
+                [DimensionEstadistica.REGIMEN, DimensionEstadistica.ANIO],
+                FiltroEstadisticas(anio=anio),
+                descartar_desconocidos=True
+            ))
+            rows = result.all()
+        
+        # Calcular total para porcentajes
+        total_importe = sum(float(row.importe_total or 0) for row in rows)
+        total_concesiones = sum(int(row.numero_concesiones) for row in rows)
+        
+        estadisticas = [
+            EstadisticasRegimen(
+                regimen=row.regimen or "desconocido",
+                anio=int(row.anio) if row.anio else None,
+                numero_concesiones=int(row.numero_concesiones),
+                importe_total=float(row.importe_total or 0),
+                porcentaje_importe=(float(row.importe_total or 0) / total_importe * 100) if total_importe > 0 else 0,
+                porcentaje_concesiones=(int(row.numero_concesiones) / total_concesiones * 100) if total_concesiones > 0 else 0
+            )
+            for row in rows
+        ]
+        
+        return estadisticas
     
-    await redis_cache.set(cache_key, estadisticas, expire=3600)
-    return estadisticas
+    return await _cacheado(info, cache_key, calcular, _etiquetas(anios=[anio] if anio else None))
 
 
 async def get_estadisticas_por_region(
     info,
     anio: Optional[int] = None,
-    limite: int = 20
+    limite: int = 20,
+    exacto: bool = False
 ) -> List[EstadisticasRegion]:
-    """Estadísticas por comunidad autónoma / provincia"""
-    db = info.context["db"]
-    
-    cache_key = f"estadisticas:region:{anio or 'todos'}:limite:{limite}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
-    
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
-    
-    stmt = (
-        select(
-            RegionModel.id.label("region_id"),
-            RegionModel.descripcion.label("region_nombre"),
-            anio_col.label("anio"),
-            func.count().label("numero_concesiones"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_total"),
-            func.count(BeneficiarioModel.id.distinct()).label("numero_beneficiarios")
-        )
-        .join(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
-        .join(RegionModel, ConcesionModel.region_id == RegionModel.id)
-        .group_by(RegionModel.id, RegionModel.descripcion, anio_col)
-    )
-    
-    if anio:
-        stmt = stmt.where(anio_col == anio)
-    
-    stmt = stmt.order_by(func.sum(
-        func.coalesce(ConcesionModel.importe_equivalente, 0) +
-        func.coalesce(ConcesionModel.importe_nominal, 0)
-    ).desc()).limit(limite)
-    
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    estadisticas = [
-        EstadisticasRegion(
-            region_id=str(row.region_id),
-            region_nombre=row.region_nombre,
-            anio=int(row.anio) if row.anio else None,
-            numero_concesiones=row.numero_concesiones,
-            importe_total=float(row.importe_total or 0),
-            numero_beneficiarios=row.numero_beneficiarios,
-            importe_medio=float(row.importe_total or 0) / row.numero_concesiones if row.numero_concesiones > 0 else 0
-        )
-        for row in rows
-    ]
-    
-    await redis_cache.set(cache_key, estadisticas, expire=3600)
-    return estadisticas
+    """Estadísticas por comunidad autónoma / provincia
+    
+    numero_beneficiarios sale de los sketches HLL (error ~0.81%) salvo
+    con exacto=True, que cuenta sobre bdns.concesion.
+    """
+    canonico = limite <= TOP_K_CANONICO
+    limite_consulta = TOP_K_CANONICO if canonico else limite
+    
+    cache_key = f"estadisticas:region:{anio or 'todos'}:top:{TOP_K_CANONICO}:exacto:{exacto}"
+    
+    async def calcular(db: AsyncSession) -> List[EstadisticasRegion]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.por_region(db, anio, limite_consulta)
+        else:
+            rollup = rollup_concesion_mensual.c
+            
+            agregado = (
+                select(
+                    rollup.region_id,
+                    rollup.anio,
+                    func.sum(rollup.numero_concesiones).label("numero_concesiones"),
+                    func.sum(rollup.importe_total).label("importe_total")
+                )
+                .where(rollup.region_id.isnot(None))
+                .group_by(rollup.region_id, rollup.anio)
+            )
+            
+            if anio:
+                agregado = agregado.where(rollup.anio == anio)
+            
+            agregado = agregado.subquery()
+            beneficiarios = _beneficiarios_stmt(
+                exacto or not await hll_disponible(db),
+                agrupar=("anio", "region_id"),
+                anio_desde=anio,
+                anio_hasta=anio
+            ).subquery()
+            
+            stmt = (
+                select(
+                    RegionModel.id.label("region_id"),
+                    RegionModel.descripcion.label("region_nombre"),
+                    agregado.c.anio,
+                    agregado.c.numero_concesiones,
+                    agregado.c.importe_total,
+                    func.coalesce(beneficiarios.c.numero_beneficiarios, 0).label("numero_beneficiarios")
+                )
+                .select_from(agregado)
+                .join(RegionModel, agregado.c.region_id == RegionModel.id)
+                .outerjoin(
+                    beneficiarios,
+                    and_(
+                        beneficiarios.c.anio == agregado.c.anio,
+                        beneficiarios.c.region_id == agregado.c.region_id
+                    )
+                )
+                .order_by(agregado.c.importe_total.desc())
+                .limit(limite_consulta)
+            )
+            
+            result = await db.execute(stmt)
+            rows = result.all()
+        
+        estadisticas = [
+            EstadisticasRegion(
+                region_id=str(row.region_id),
+                region_nombre=row.region_nombre,
+                anio=int(row.anio) if row.anio else None,
+                numero_concesiones=int(row.numero_concesiones),
+                importe_total=float(row.importe_total or 0),
+                numero_beneficiarios=int(row.numero_beneficiarios),
+                importe_medio=float(row.importe_total or 0) / int(row.numero_concesiones) if row.numero_concesiones > 0 else 0
+            )
+            for row in rows
+        ]
+        
+        return estadisticas
+    
+    if not canonico:
+        return await calcular(sesion(info))
+    return (await _cacheado(info, cache_key, calcular, _etiquetas(anios=[anio] if anio else None)))[:limite]
 
 
 async def get_top_convocatorias(
@@ -393,65 +459,64 @@ async def get_top_convocatorias(
     limite: int = 10
 ) -> List[TopConvocatoria]:
     """Convocatorias con más presupuesto concedido"""
-    db = info.context["db"]
-    
-    cache_key = f"estadisticas:top_convocatorias:{anio or 'todos'}:limite:{limite}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
-    
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
-    
-    stmt = (
-        select(
-            ConvocatoriaModel.id.label("convocatoria_id"),
-            ConvocatoriaModel.codigo_bdns,
-            ConvocatoriaModel.titulo,
-            ConvocatoriaModel.presupuesto_total,
-            anio_col.label("anio"),
-            func.count(ConcesionModel.id).label("numero_beneficiarios"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_concedido")
-        )
-        .join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
-        .group_by(
-            ConvocatoriaModel.id,
-            ConvocatoriaModel.codigo_bdns,
-            ConvocatoriaModel.titulo,
-            ConvocatoriaModel.presupuesto_total,
-            anio_col
-        )
-    )
-    
-    if anio:
-        stmt = stmt.where(anio_col == anio)
-    
-    stmt = stmt.order_by(func.sum(
-        func.coalesce(ConcesionModel.importe_equivalente, 0) +
-        func.coalesce(ConcesionModel.importe_nominal, 0)
-    ).desc()).limit(limite)
-    
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    top = [
-        TopConvocatoria(
-            convocatoria_id=str(row.convocatoria_id),
-            codigo_bdns=row.codigo_bdns,
-            titulo=row.titulo,
-            anio=int(row.anio) if row.anio else None,
-            importe_concedido=float(row.importe_concedido or 0),
-            presupuesto_total=float(row.presupuesto_total or 0),
-            porcentaje_ejecutado=(float(row.importe_concedido or 0) / float(row.presupuesto_total or 1) * 100) if row.presupuesto_total else 0,
-            numero_beneficiarios=row.numero_beneficiarios
+    canonico = limite <= TOP_K_CANONICO
+    limite_consulta = TOP_K_CANONICO if canonico else limite
+    
+    cache_key = f"estadisticas:top_convocatorias:{anio or 'todos'}:top:{TOP_K_CANONICO}"
+    
+    async def calcular(db: AsyncSession) -> List[TopConvocatoria]:
+        anio_col = extract('year', ConcesionModel.fecha_concesion)
+        
+        stmt = (
+            select(
+                ConvocatoriaModel.id.label("convocatoria_id"),
+                ConvocatoriaModel.codigo_bdns,
+                ConvocatoriaModel.titulo,
+                ConvocatoriaModel.presupuesto_total,
+                anio_col.label("anio"),
+                func.count(ConcesionModel.id).label("numero_beneficiarios"),
+                func.sum(importe_concesion()).label("importe_concedido")
+            )
+            .join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
+            .group_by(
+                ConvocatoriaModel.id,
+                ConvocatoriaModel.codigo_bdns,
+                ConvocatoriaModel.titulo,
+                ConvocatoriaModel.presupuesto_total,
+                anio_col
+            )
         )
-        for row in rows
-    ]
-    
-    await redis_cache.set(cache_key, top, expire=3600)
-    return top
+        
+        if anio:
+            stmt = stmt.where(*filtro_anio(anio))
+        
+        stmt = stmt.order_by(func.sum(importe_concesion()).desc()).limit(limite_consulta)
+        
+        if anio is None and paralelo_activo():
+            rows = await agregar_por_anio(db, stmt, clave=lambda row: row.importe_concedido or 0, limite=limite_consulta)
+        else:
+            result = await db.execute(stmt)
+            rows = result.all()
+        
+        top = [
+            TopConvocatoria(
+                convocatoria_id=str(row.convocatoria_id),
+                codigo_bdns=row.codigo_bdns,
+                titulo=row.titulo,
+                anio=int(row.anio) if row.anio else None,
+                importe_concedido=float(row.importe_concedido or 0),
+                presupuesto_total=float(row.presupuesto_total or 0),
+                porcentaje_ejecutado=(float(row.importe_concedido or 0) / float(row.presupuesto_total or 1) * 100) if row.presupuesto_total else 0,
+                numero_beneficiarios=row.numero_beneficiarios
+            )
+            for row in rows
+        ]
+        
+        return top
+    
+    if not canonico:
+        return await calcular(sesion(info))
+    return (await _cacheado(info, cache_key, calcular, _etiquetas(anios=[anio] if anio else None)))[:limite]
 
 
 async def get_beneficiarios_recurrentes(
@@ -461,144 +526,514 @@ async def get_beneficiarios_recurrentes(
     limite: int = 20
 ) -> List[EstadisticasConcesiones]:
     """Beneficiarios con más de N concesiones en un año"""
-    db = info.context["db"]
-    
-    cache_key = f"estadisticas:recurrentes:{anio or 'todos'}:min:{minimo_concesiones}:limite:{limite}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
+    canonico = limite <= TOP_K_CANONICO
+    limite_consulta = TOP_K_CANONICO if canonico else limite
+    
+    cache_key = f"estadisticas:recurrentes:{anio or 'todos'}:min:{minimo_concesiones}:top:{TOP_K_CANONICO}"
+    
+    async def calcular(db: AsyncSession) -> List[EstadisticasConcesiones]:
+        if motor_estadisticas.activo:
+            rows = await estadisticas_motor.recurrentes(db, anio, minimo_concesiones, limite_consulta)
+        else:
+            actividad = rollup_actividad_beneficiario.c
+            
+            stmt = (
+                select(
+                    BeneficiarioModel.id.label("beneficiario_id"),
+                    BeneficiarioModel.nombre.label("beneficiario_nombre"),
+                    actividad.tipo_entidad,
+                    actividad.anio,
+                    actividad.numero_concesiones,
+                    actividad.importe_total,
+                    actividad.primera_concesion,
+                    actividad.ultima_concesion
+                )
+                .select_from(rollup_actividad_beneficiario)
+                .join(BeneficiarioModel, actividad.beneficiario_id == BeneficiarioModel.id)
+                .where(actividad.tipo_entidad.isnot(None))
+                .where(actividad.numero_concesiones >= minimo_concesiones)
+            )
+            
+            if anio:
+                stmt = stmt.where(actividad.anio == anio)
+            
+            stmt = stmt.order_by(actividad.numero_concesiones.desc()).limit(limite_consulta)
+            
+            result = await db.execute(stmt)
+            rows = result.all()
+        
+        estadisticas = [
+            EstadisticasConcesiones(
+                beneficiario_id=str(row.beneficiario_id),
+                beneficiario_nombre=row.beneficiario_nombre,
+                tipo_entidad=row.tipo_entidad,
+                anio=int(row.anio) if row.anio else None,
+                numero_concesiones=row.numero_concesiones,
+                importe_total=float(row.importe_total or 0),
+                primera_concesion=row.primera_concesion,
+                ultima_concesion=row.ultima_concesion
+            )
+            for row in rows
+        ]
+        
+        return estadisticas
+    
+    if not canonico:
+        return await calcular(sesion(info))
+    return (await _cacheado(info, cache_key, calcular, _etiquetas(anios=[anio] if anio else None)))[:limite]
+
+
+async def get_historial_beneficiario(
+    info,
+    beneficiario_id: UUID
+) -> List[EstadisticasConcesiones]:
+    """Concesiones e importe por año de un beneficiario"""
+    cache_key = f"estadisticas:historial_beneficiario:{beneficiario_id}"
+    
+    async def calcular(db: AsyncSession) -> List[EstadisticasConcesiones]:
+        actividad = rollup_actividad_beneficiario.c
+        
+        stmt = (
+            select(rollup_actividad_beneficiario)
+            .where(actividad.beneficiario_id == beneficiario_id)
+            .order_by(actividad.anio)
+        )
+        
+        result = await db.execute(stmt)
+        rows = result.all()
+        
+        historial = [
+            EstadisticasConcesiones(
+                beneficiario_id=str(row.beneficiario_id),
+                tipo_entidad=row.tipo_entidad,
+                anio=int(row.anio),
+                numero_concesiones=int(row.numero_concesiones),
+                importe_total=float(row.importe_total or 0),
+                importe_medio=float(row.importe_total or 0) / int(row.numero_concesiones) if row.numero_concesiones > 0 else 0,
+                primera_concesion=row.primera_concesion,
+                ultima_concesion=row.ultima_concesion
+            )
+            for row in rows
+        ]
+        
+        return historial
     
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
+    return await _cacheado(info, cache_key, calcular, _etiquetas())
+
+
+async def get_comparativa_anual(
+    info,
+    anio_base: int,
+    anio_comparar: int,
+    exacto: bool = False
+) -> ComparativaAnual:
+    """Comparativa interanual de métricas clave"""
+    cache_key = f"estadisticas:comparativa:{anio_base}:{anio_comparar}:exacto:{exacto}"
+    
+    async def calcular(db: AsyncSession) -> ComparativaAnual:
+        metricas = await _metricas_anuales(db, [anio_base, anio_comparar], exacto)
+        
+        # Métricas para año base
+        base_importe, base_concesiones, base_beneficiarios = metricas[anio_base]
+        base_importe_medio = base_importe / base_concesiones if base_concesiones > 0 else 0
+        
+        # Métricas para año comparar
+        comp_importe, comp_concesiones, comp_beneficiarios = metricas[anio_comparar]
+        comp_importe_medio = comp_importe / comp_concesiones if comp_concesiones > 0 else 0
+        
+        comparativa = ComparativaAnual(
+            anio_base=anio_base,
+            anio_comparar=anio_comparar,
+            total_concedido_base=float(base_importe),
+            total_concedido_comparar=float(comp_importe),
+            variacion_importe=float(comp_importe - base_importe),
+            variacion_importe_porcentual=((comp_importe - base_importe) / base_importe * 100) if base_importe > 0 else 0,
+            numero_concesiones_base=base_concesiones,
+            numero_concesiones_comparar=comp_concesiones,
+            variacion_concesiones=comp_concesiones - base_concesiones,
+            variacion_concesiones_porcentual=((comp_concesiones - base_concesiones) / base_concesiones * 100) if base_concesiones > 0 else 0,
+            importe_medio_base=float(base_importe_medio),
+            importe_medio_comparar=float(comp_importe_medio),
+            variacion_importe_medio=float(comp_importe_medio - base_importe_medio),
+            variacion_importe_medio_porcentual=((comp_importe_medio - base_importe_medio) / base_importe_medio * 100) if base_importe_medio > 0 else 0,
+            numero_beneficiarios_base=base_beneficiarios,
+            numero_beneficiarios_comparar=comp_beneficiarios,
+            variacion_beneficiarios=comp_beneficiarios - base_beneficiarios,
+            variacion_beneficiarios_porcentual=((comp_beneficiarios - base_beneficiarios) / base_beneficiarios * 100) if base_beneficiarios > 0 else 0
+        )
+        
+        return comparativa
     
-    stmt = (
-        select(
-            BeneficiarioModel.id.label("beneficiario_id"),
-            BeneficiarioModel.nombre.label("beneficiario_nombre"),
-            FormaJuridicaModel.tipo.label("tipo_entidad"),
-            anio_col.label("anio"),
-            func.count().label("numero_concesiones"),
-            func.sum(
-                func.coalesce(ConcesionModel.importe_equivalente, 0) +
-                func.coalesce(ConcesionModel.importe_nominal, 0)
-            ).label("importe_total"),
-            func.min(ConcesionModel.fecha_concesion).label("primera_concesion"),
-            func.max(ConcesionModel.fecha_concesion).label("ultima_concesion")
+    return await _cacheado(info, cache_key, calcular, _etiquetas(anios=[anio_base, anio_comparar]))
+
+
+async def get_comparativa_anual_serie(
+    info,
+    anio_desde: int,
+    anio_hasta: int,
+    exacto: bool = False
+) -> List[EvolucionAnual]:
+    """Serie de métricas anuales con variación respecto al año anterior"""
+    anios = rango_anios(anio_desde, anio_hasta)
+    cache_key = f"estadisticas:comparativa_serie:{anio_desde}:{anio_hasta}:exacto:{exacto}"
+    
+    async def calcular(db: AsyncSession) -> List[EvolucionAnual]:
+        metricas = await _metricas_anuales(db, list(anios), exacto)
+        
+        serie = []
+        anterior = None
+        for anio in anios:
+            importe, concesiones, beneficiarios = metricas[anio]
+            importe_medio = importe / concesiones if concesiones > 0 else 0
+        
+            actual = EvolucionAnual(
+                anio=anio,
+                total_concedido=importe,
+                numero_concesiones=concesiones,
+                importe_medio=importe_medio,
+                numero_beneficiarios=beneficiarios
+            )
+            if anterior:
+                actual.variacion_importe = importe - anterior.total_concedido
+                actual.variacion_importe_porcentual = _variacion_porcentual(importe, anterior.total_concedido)
+                actual.variacion_concesiones = concesiones - anterior.numero_concesiones
+                actual.variacion_concesiones_porcentual = _variacion_porcentual(concesiones, anterior.numero_concesiones)
+                actual.variacion_importe_medio = importe_medio - anterior.importe_medio
+                actual.variacion_importe_medio_porcentual = _variacion_porcentual(importe_medio, anterior.importe_medio)
+                actual.variacion_beneficiarios = beneficiarios - anterior.numero_beneficiarios
+                actual.variacion_beneficiarios_porcentual = _variacion_porcentual(beneficiarios, anterior.numero_beneficiarios)
+        
+            serie.append(actual)
+            anterior = actual
+        
+        return serie
+    
+    return await _cacheado(info, cache_key, calcular, _etiquetas(anios=anios))
+
+
+async def get_numero_beneficiarios(
+    info,
+    filtros: Optional[FiltroEstadisticas] = None,
+    exacto: bool = False
+) -> BeneficiariosDistintos:
+    """Beneficiarios distintos para cualquier combinación de filtros
+    
+    Combina los sketches HLL de las celdas (anio, region, organo) que
+    cumplen los filtros. Los filtros por tipo de entidad o régimen no
+    están en el grano de los sketches y fuerzan el recuento exacto.
+    """
+    if filtros and (filtros.tipo_entidad or filtros.regimen):
+        exacto = True
+    
+    cache_key = f"estadisticas:beneficiarios:{_build_cache_key_from_filtros(filtros)}:exacto:{exacto}"
+    
+    async def calcular(db: AsyncSession) -> BeneficiariosDistintos:
+        anio_desde = anio_hasta = None
+        if filtros:
+            if filtros.anio:
+                anio_desde = anio_hasta = filtros.anio
+            else:
+                anio_desde, anio_hasta = filtros.anio_desde, filtros.anio_hasta
+        
+        if motor_estadisticas.activo:
+            # El motor en memoria siempre cuenta exacto, con cualquier filtro
+            es_exacto = True
+            numero = estadisticas_motor.numero_beneficiarios(filtros)
+        else:
+            es_exacto = exacto or not await hll_disponible(db)
+            numero = await db.scalar(_beneficiarios_stmt(
+                es_exacto,
+                anio_desde=anio_desde,
+                anio_hasta=anio_hasta,
+                region_id=filtros.region_id if filtros else None,
+                organo_id=filtros.organo_id if filtros else None,
+                tipo_entidad=filtros.tipo_entidad if filtros else None,
+                regimen=filtros.regimen if filtros else None
+            ))
+        
+        resultado = BeneficiariosDistintos(
+            numero_beneficiarios=int(numero or 0),
+            exacto=es_exacto,
+            error_relativo=0 if es_exacto else HLL_ERROR_RELATIVO
         )
-        .join(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
-        .join(FormaJuridicaModel, BeneficiarioModel.forma_juridica_id == FormaJuridicaModel.id)
-        .group_by(
-            BeneficiarioModel.id,
-            BeneficiarioModel.nombre,
-            FormaJuridicaModel.tipo,
-            anio_col
+        
+        return resultado
+    
+    return await _cacheado(info, cache_key, calcular, _etiquetas(filtros))
+
+
+# ============================================================================
+# CUBO OLAP
+# ============================================================================
+
+async def get_estadisticas_cubo(
+    info,
+    dimensiones: List[DimensionEstadistica],
+    medidas: Optional[List[MedidaEstadistica]] = None,
+    filtros: Optional[FiltroEstadisticas] = None,
+    agrupacion: AgrupacionEstadistica = AgrupacionEstadistica.ROLLUP,
+    conjuntos: Optional[List[List[DimensionEstadistica]]] = None
+) -> List[CeldaEstadistica]:
+    """Desglose genérico por cualquier combinación de dimensiones.
+    
+    Una sola consulta ROLLUP / CUBE / GROUPING SETS devuelve detalle,
+    subtotales y total; dimensiones_agregadas indica qué nivel es cada fila.
+    numero_beneficiarios es la estimación HLL (solo anio, organo, region),
+    o el recuento exacto si no hay extensión hll.
+    """
+    medidas = medidas or [MedidaEstadistica.NUMERO_CONCESIONES, MedidaEstadistica.IMPORTE_TOTAL]
+    
+    cache_key = (
+        f"estadisticas:cubo:{','.join(d.value for d in dimensiones) or 'total'}"
+        f":medidas:{','.join(sorted(m.value for m in medidas))}"
+        f":agrupacion:{agrupacion.value}"
+        f":conjuntos:{'|'.join(','.join(d.value for d in c) for c in conjuntos) if conjuntos is not None else 'no'}"
+        f":{_build_cache_key_from_filtros(filtros)}"
+    )
+    
+    async def calcular(db: AsyncSession) -> List[CeldaEstadistica]:
+        beneficiarios = MedidaEstadistica.NUMERO_BENEFICIARIOS in medidas
+        stmt = cubo_stmt(
+            dimensiones,
+            filtros,
+            agrupacion,
+            conjuntos,
+            beneficiarios=beneficiarios,
+            beneficiarios_exactos=beneficiarios and not await hll_disponible(db)
         )
-        .having(func.count() >= minimo_concesiones)
+        result = await db.execute(stmt)
+        rows = result.all()
+        
+        celdas = [_celda_from_row(row, dimensiones, medidas) for row in rows]
+        
+        return celdas
+    
+    return await _cacheado(info, cache_key, calcular, _etiquetas(filtros))
+
+
+def _celda_from_row(
+    row,
+    dimensiones: List[DimensionEstadistica],
+    medidas: List[MedidaEstadistica]
+) -> CeldaEstadistica:
+    agregadas = [d for d in dimensiones if getattr(row, etiqueta_agregado(d))]
+    valores = {
+        ETIQUETAS[d]: getattr(row, ETIQUETAS[d])
+        for d in dimensiones if d not in agregadas
+    }
+    numero = int(row.numero_concesiones or 0)
+    importe = float(row.importe_total or 0)
+    
+    celda = CeldaEstadistica(
+        anio=int(valores["anio"]) if "anio" in valores else None,
+        mes=int(valores["mes"]) if "mes" in valores else None,
+        organo_id=_texto(valores.get("organo_id")),
+        organo_nombre=row.organo_nombre if "organo_id" in valores else None,
+        tipo_entidad=valores.get("tipo_entidad"),
+        region_id=_texto(valores.get("region_id")),
+        region_nombre=row.region_nombre if "region_id" in valores else None,
+        regimen=valores.get("regimen"),
+        dimensiones_agregadas=agregadas
     )
+    if MedidaEstadistica.NUMERO_CONCESIONES in medidas:
+        celda.numero_concesiones = numero
+    if MedidaEstadistica.IMPORTE_TOTAL in medidas:
+        celda.importe_total = importe
+    if MedidaEstadistica.IMPORTE_MEDIO in medidas:
+        celda.importe_medio = importe / numero if numero > 0 else 0
+    if MedidaEstadistica.NUMERO_BENEFICIARIOS in medidas:
+        celda.numero_beneficiarios = int(row.numero_beneficiarios)
+    return celda
+
+
+def _texto(valor) -> Optional[str]:
+    return str(valor) if valor is not None else None
+
+
+def _beneficiarios_stmt(
+    exacto: bool,
+    agrupar: tuple = (),
+    anio_desde: Optional[int] = None,
+    anio_hasta: Optional[int] = None,
+    region_id=None,
+    organo_id=None,
+    tipo_entidad: Optional[str] = None,
+    regimen: Optional[str] = None,
+    anios: Optional[Sequence[int]] = None
+):
+    """Beneficiarios distintos agrupados por `agrupar` (anio, region_id, organo_id).
+    
+    Por defecto combina los sketches HLL con hll_union_agg; con
+    exacto=True hace count(DISTINCT) sobre bdns.concesion. tipo_entidad
+    y regimen solo se admiten en modo exacto. anios restringe a esos años
+    sueltos (además del rango, si lo hay).
+    """
+    if exacto:
+        columnas = {
+            "anio": extract('year', ConcesionModel.fecha_concesion),
+            "region_id": ConcesionModel.region_id,
+            "organo_id": ConvocatoriaModel.organo_id,
+        }
+        valor = func.count(ConcesionModel.beneficiario_id.distinct())
+        stmt = (
+            select(
+                *[columnas[d].label(d) for d in agrupar],
+                valor.label("numero_beneficiarios")
+            )
+            .select_from(ConcesionModel)
+            .where(*filtro_rango_anios(anio_desde, anio_hasta))
+        )
+        if anios:
+            stmt = stmt.where(*filtro_anios(anios))
+        if "organo_id" in agrupar or organo_id:
+            stmt = stmt.join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
+        if tipo_entidad:
+            stmt = (
+                stmt.join(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
+                .join(FormaJuridicaModel, BeneficiarioModel.forma_juridica_id == FormaJuridicaModel.id)
+                .where(FormaJuridicaModel.tipo == tipo_entidad)
+            )
+        if regimen:
+            stmt = (
+                stmt.join(RegimenAyudaModel, ConcesionModel.regimen_ayuda_id == RegimenAyudaModel.id)
+                .where(RegimenAyudaModel.descripcion_norm == regimen)
+            )
+    else:
+        sketch = rollup_beneficiarios_hll.c
+        columnas = {
+            "anio": sketch.anio,
+            "region_id": sketch.region_id,
+            "organo_id": sketch.organo_id,
+        }
+        valor = func.round(func.hll_cardinality(func.hll_union_agg(sketch.beneficiarios)))
+        stmt = select(
+            *[columnas[d].label(d) for d in agrupar],
+            valor.label("numero_beneficiarios")
+        )
+        if anio_desde is not None:
+            stmt = stmt.where(sketch.anio >= anio_desde)
+        if anio_hasta is not None:
+            stmt = stmt.where(sketch.anio <= anio_hasta)
+        if anios:
+            stmt = stmt.where(sketch.anio.in_(anios))
+    
+    if region_id:
+        stmt = stmt.where(columnas["region_id"] == region_id)
+    if organo_id:
+        stmt = stmt.where(columnas["organo_id"] == organo_id)
+    
+    if agrupar:
+        stmt = stmt.group_by(*[columnas[d] for d in agrupar])
+    return stmt
+
+
+async def _metricas_anuales(db: AsyncSession, anios: List[int], exacto: bool = False) -> dict:
+    """Importe, concesiones y beneficiarios de varios años en una consulta.
     
-    if anio:
-        stmt = stmt.where(anio_col == anio)
+    Devuelve {anio: (importe_total, numero_concesiones, numero_beneficiarios)}
+    con ceros para los años sin datos.
+    """
+    if motor_estadisticas.activo:
+        return estadisticas_motor.metricas_anuales(anios)
     
-    stmt = stmt.order_by(func.count().desc()).limit(limite)
+    rollup = rollup_concesion_mensual.c
     
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    estadisticas = [
-        EstadisticasConcesiones(
-            beneficiario_id=str(row.beneficiario_id),
-            beneficiario_nombre=row.beneficiario_nombre,
-            tipo_entidad=row.tipo_entidad,
-            anio=int(row.anio) if row.anio else None,
-            numero_concesiones=row.numero_concesiones,
-            importe_total=float(row.importe_total or 0),
-            primera_concesion=row.primera_concesion,
-            ultima_concesion=row.ultima_concesion
+    totales = (
+        select(
+            rollup.anio,
+            func.sum(rollup.numero_concesiones).label("numero_concesiones"),
+            func.sum(rollup.importe_total).label("importe_total")
+        )
+        .where(rollup.anio.in_(anios))
+        .group_by(rollup.anio)
+        .subquery()
+    )
+    beneficiarios = _beneficiarios_stmt(
+        exacto or not await hll_disponible(db),
+        agrupar=("anio",),
+        anios=anios
+    ).subquery()
+    
+    stmt = (
+        select(
+            totales.c.anio,
+            totales.c.numero_concesiones,
+            totales.c.importe_total,
+            func.coalesce(beneficiarios.c.numero_beneficiarios, 0).label("numero_beneficiarios")
         )
-        for row in rows
-    ]
+        .select_from(totales)
+        .outerjoin(beneficiarios, beneficiarios.c.anio == totales.c.anio)
+    )
     
-    await redis_cache.set(cache_key, estadisticas, expire=3600)
-    return estadisticas
+    result = await db.execute(stmt)
+    metricas = {anio: (0.0, 0, 0) for anio in anios}
+    for row in result.all():
+        metricas[int(row.anio)] = (
+            float(row.importe_total or 0),
+            int(row.numero_concesiones or 0),
+            int(row.numero_beneficiarios or 0)
+        )
+    return metricas
 
 
-async def get_comparativa_anual(
+def _variacion_porcentual(actual: float, anterior: float) -> float:
+    return ((actual - anterior) / anterior * 100) if anterior > 0 else 0
+
+
+async def _cacheado(
     info,
-    anio_base: int,
-    anio_comparar: int
-) -> ComparativaAnual:
-    """Comparativa interanual de métricas clave"""
-    db = info.context["db"]
-    
-    cache_key = f"estadisticas:comparativa:{anio_base}:{anio_comparar}"
-    cached = await redis_cache.get(cache_key)
-    if cached:
-        return cached
-    
-    anio_col = extract('year', ConcesionModel.fecha_concesion)
-    
-    # Métricas para año base
-    base_importe = await db.scalar(
-        select(func.sum(
-            func.coalesce(ConcesionModel.importe_equivalente, 0) +
-            func.coalesce(ConcesionModel.importe_nominal, 0)
-        )).where(anio_col == anio_base)
-    ) or 0
-    
-    base_concesiones = await db.scalar(
-        select(func.count()).where(anio_col == anio_base)
-    ) or 0
-    
-    base_beneficiarios = await db.scalar(
-        select(func.count(BeneficiarioModel.id.distinct()))
-        .join(ConcesionModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
-        .where(anio_col == anio_base)
-    ) or 0
-    
-    base_importe_medio = base_importe / base_concesiones if base_concesiones > 0 else 0
-    
-    # Métricas para año comparar
-    comp_importe = await db.scalar(
-        select(func.sum(
-            func.coalesce(ConcesionModel.importe_equivalente, 0) +
-            func.coalesce(ConcesionModel.importe_nominal, 0)
-        )).where(anio_col == anio_comparar)
-    ) or 0
-    
-    comp_concesiones = await db.scalar(
-        select(func.count()).where(anio_col == anio_comparar)
-    ) or 0
-    
-    comp_beneficiarios = await db.scalar(
-        select(func.count(BeneficiarioModel.id.distinct()))
-        .join(ConcesionModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
-        .where(anio_col == anio_comparar)
-    ) or 0
-    
-    comp_importe_medio = comp_importe / comp_concesiones if comp_concesiones > 0 else 0
-    
-    comparativa = ComparativaAnual(
-        anio_base=anio_base,
-        anio_comparar=anio_comparar,
-        total_concedido_base=float(base_importe),
-        total_concedido_comparar=float(comp_importe),
-        variacion_importe=float(comp_importe - base_importe),
-        variacion_importe_porcentual=((comp_importe - base_importe) / base_importe * 100) if base_importe > 0 else 0,
-        numero_concesiones_base=base_concesiones,
-        numero_concesiones_comparar=comp_concesiones,
-        variacion_concesiones=comp_concesiones - base_concesiones,
-        variacion_concesiones_porcentual=((comp_concesiones - base_concesiones) / base_concesiones * 100) if base_concesiones > 0 else 0,
-        importe_medio_base=float(base_importe_medio),
-        importe_medio_comparar=float(comp_importe_medio),
-        variacion_importe_medio=float(comp_importe_medio - base_importe_medio),
-        variacion_importe_medio_porcentual=((comp_importe_medio - base_importe_medio) / base_importe_medio * 100) if base_importe_medio > 0 else 0,
-        numero_beneficiarios_base=base_beneficiarios,
-        numero_beneficiarios_comparar=comp_beneficiarios,
-        variacion_beneficiarios=comp_beneficiarios - base_beneficiarios,
-        variacion_beneficiarios_porcentual=((comp_beneficiarios - base_beneficiarios) / base_beneficiarios * 100) if base_beneficiarios > 0 else 0
+    cache_key: str,
+    calcular: Callable[[AsyncSession], Awaitable],
+    etiquetas: Sequence[str] = ()
+):
+    """Resultado cacheado de calcular(db); los fallos concurrentes calculan una sola vez.
+    
+    La clave lleva la versión de datos: una carga nueva la invalida sin
+    esperar a ningún TTL. Pasado el TTL fresco (si lo hay) se sirve la
+    entrada obsoleta y se recalcula en segundo plano.
+    
+    calcular recibe su propia sesión, nunca la de la petición: el cálculo
+    lo comparten todas las peticiones que fallan a la vez (y el refresco
+    en segundo plano), y sigue aunque la primera termine o se cancele.
+    """
+    settings = get_settings()
+    cache_key = await redis_cache.con_version(cache_key)
+    
+    async def con_sesion_propia():
+        async with get_sessionmaker()() as propia:
+            return await calcular(propia)
+    
+    return await redis_cache.get_or_set(
+        cache_key,
+        con_sesion_propia,
+        expire=settings.CACHE_TTL_MAXIMO_SEGUNDOS,
+        fresco=settings.CACHE_TTL_FRESCO_SEGUNDOS or None,
+        etiquetas=etiquetas
     )
-    
-    await redis_cache.set(cache_key, comparativa, expire=3600)
-    return comparativa
+
+
+def _etiquetas(
+    filtros: Optional[FiltroEstadisticas] = None,
+    anios: Optional[Iterable[int]] = None
+) -> List[str]:
+    """Años y órgano de los que depende una entrada, para invalidarla por etiqueta.
+    
+    Sin filtro de año (o de órgano) depende de todos: anio:todos / organo:todos.
+    Un rango abierto o más largo que ESTADISTICAS_MAX_ANIOS cuenta como
+    todos los años.
+    """
+    if anios is None and filtros:
+        if filtros.anio:
+            anios = [filtros.anio]
+        elif (
+            filtros.anio_desde and filtros.anio_hasta
+            and filtros.anio_hasta - filtros.anio_desde < get_settings().ESTADISTICAS_MAX_ANIOS
+        ):
+            anios = range(filtros.anio_desde, filtros.anio_hasta + 1)
+    
+    etiquetas = [etiqueta("anio", anio) for anio in anios] if anios else [etiqueta("anio")]
+    etiquetas.append(etiqueta("organo", filtros.organo_id if filtros else None))
+    return etiquetas
 
 
 def _build_cache_key_from_filtros(filtros: Optional[FiltroEstadisticas]) -> str:
@@ -616,5 +1051,9 @@ def _build_cache_key_from_filtros(filtros: Optional[FiltroEstadisticas]) -> str:
         parts.append(f"tipo_entidad:{filtros.tipo_entidad}")
     if filtros.organo_id:
         parts.append(f"organo_id:{filtros.organo_id}")
+    if filtros.region_id:
+        parts.append(f"region_id:{filtros.region_id}")
+    if filtros.regimen:
+        parts.append(f"regimen:{filtros.regimen}")
     
     return "_".join(parts) if parts else "sin_filtros"
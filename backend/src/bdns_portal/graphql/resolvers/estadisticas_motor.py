@@ -0,0 +1,164 @@
+"""
+Estadísticas resueltas con el motor en memoria.
+
+Cada función devuelve filas con los mismos atributos que la consulta SQL
+equivalente de estadisticas.py, de modo que el resolver construye los
+tipos GraphQL igual con un motor u otro. Solo los nombres de órganos,
+regiones y beneficiarios del resultado se leen de PostgreSQL.
+"""
+from types import SimpleNamespace
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from bdns_core.db.models import Beneficiario as BeneficiarioModel
+from bdns_core.db.models import Organo as OrganoModel
+from bdns_core.db.models import Region as RegionModel
+
+from ...analytics import motor_estadisticas as motor
+from ...analytics.motor import np, seleccionar
+from ..types.estadisticas import FiltroEstadisticas
+
+
+def _mascara_filtros(filtros: Optional[FiltroEstadisticas]):
+    """Filas que cumplen todos los campos del filtro, con la misma semántica
+    que cubo.filtros_rollup: anio manda sobre el rango y cada extremo del
+    rango se aplica por separado."""
+    if not filtros:
+        return motor.mascara()
+    if filtros.anio:
+        anios = {"anio": filtros.anio}
+    else:
+        anios = {"anio_desde": filtros.anio_desde or None, "anio_hasta": filtros.anio_hasta or None}
+    return motor.mascara(
+        **anios,
+        tipo_entidad=filtros.tipo_entidad or None,
+        organo=filtros.organo_id or None,
+        region=filtros.region_id or None,
+        regimen=filtros.regimen or None
+    )
+
+
+async def _nombres(db, modelo, columna, ids) -> dict:
+    if not ids:
+        return {}
+    result = await db.execute(select(modelo.id, columna).where(modelo.id.in_(ids)))
+    return {row[0]: row[1] for row in result.all()}
+
+
+async def por_tipo_entidad(db, filtros: Optional[FiltroEstadisticas]) -> List[SimpleNamespace]:
+    grupos = motor.agrupar(("tipo_entidad", "anio"), _mascara_filtros(filtros))
+    return [SimpleNamespace(**fila) for fila in seleccionar(grupos, grupos.orden())]
+
+
+async def por_organo(db, filtros: Optional[FiltroEstadisticas]) -> List[SimpleNamespace]:
+    grupos = motor.agrupar(("organo", "anio"), _mascara_filtros(filtros))
+    filas = seleccionar(grupos, grupos.orden())
+    nombres = await _nombres(db, OrganoModel, OrganoModel.nombre, {f["organo"] for f in filas})
+    return [
+        SimpleNamespace(organo_id=f["organo"], organo_nombre=nombres.get(f["organo"]), **f)
+        for f in filas if f["organo"] in nombres
+    ]
+
+
+async def concentracion(db, anio: Optional[int], tipo_entidad: Optional[str], limite: int) -> List[SimpleNamespace]:
+    grupos = motor.agrupar(
+        ("beneficiario", "tipo_entidad", "anio"),
+        motor.mascara(anio=anio, tipo_entidad=tipo_entidad)
+    )
+    filas = seleccionar(grupos, grupos.orden(limite=limite))
+    nombres = await _nombres(db, BeneficiarioModel, BeneficiarioModel.nombre, {f["beneficiario"] for f in filas})
+    return [
+        SimpleNamespace(beneficiario_id=f["beneficiario"], beneficiario_nombre=nombres.get(f["beneficiario"]), **f)
+        for f in filas
+    ]
+
+
+async def evolucion_mensual(db, anio_desde: int, anio_hasta: int) -> List[SimpleNamespace]:
+    grupos = motor.agrupar(("anio", "mes"), motor.mascara(anio_desde=anio_desde, anio_hasta=anio_hasta))
+    anios = np.array(grupos.valores("anio"), dtype=np.int64)
+    meses = np.array(grupos.valores("mes"), dtype=np.int64)
+    orden = np.lexsort((meses, anios))
+
+    importe = grupos.importe[orden]
+    anios, meses, numero = anios[orden], meses[orden], grupos.numero[orden]
+    
+    # Acumulado por año: cumsum global menos lo acumulado antes de cada año
+    inicio_anio = np.r_[True, anios[1:] != anios[:-1]] if len(anios) else np.empty(0, dtype=bool)
+    posicion_anio = np.cumsum(inicio_anio) - 1
+    acumulado_global = np.cumsum(importe)
+    acumulado = acumulado_global - (acumulado_global - importe)[inicio_anio][posicion_anio]
+    total_anio = np.bincount(posicion_anio, weights=importe)[posicion_anio] if len(anios) else importe
+    porcentaje = np.divide(acumulado * 100, total_anio, out=np.zeros_like(acumulado), where=total_anio > 0)
+    
+    filas = [
+        SimpleNamespace(
+            anio=int(anios[i]),
+            mes=int(meses[i]),
+            numero_concesiones=int(numero[i]),
+            importe_mensual=float(importe[i]),
+            acumulado_anual=float(acumulado[i]),
+            porcentaje_total=float(porcentaje[i])
+        )
+        for i in range(len(anios))
+    ]
+    return filas
+
+
+async def por_regimen(db, anio: Optional[int]) -> List[SimpleNamespace]:
+    grupos = motor.agrupar(("regimen", "anio"), motor.mascara(anio=anio))
+    return [SimpleNamespace(**fila) for fila in seleccionar(grupos, grupos.orden())]
+
+
+async def por_region(db, anio: Optional[int], limite: int) -> List[SimpleNamespace]:
+    grupos = motor.agrupar(("region", "anio"), motor.mascara(anio=anio))
+    indices = grupos.orden(limite=limite)
+    beneficiarios = grupos.beneficiarios_distintos()
+    filas = seleccionar(grupos, indices)
+    nombres = await _nombres(db, RegionModel, RegionModel.descripcion, {f["region"] for f in filas})
+    return [
+        SimpleNamespace(
+            region_id=f["region"],
+            region_nombre=nombres.get(f["region"]),
+            numero_beneficiarios=int(beneficiarios[i]),
+            **f
+        )
+        for i, f in zip(indices, filas) if f["region"] in nombres
+    ]
+
+
+async def recurrentes(db, anio: Optional[int], minimo_concesiones: int, limite: int) -> List[SimpleNamespace]:
+    grupos = motor.agrupar(("beneficiario", "tipo_entidad", "anio"), motor.mascara(anio=anio))
+    candidatos = np.flatnonzero(grupos.numero >= minimo_concesiones)
+    if len(candidatos) > limite:
+        candidatos = candidatos[np.argpartition(-grupos.numero[candidatos], limite - 1)[:limite]]
+    indices = candidatos[np.argsort(-grupos.numero[candidatos], kind="stable")]
+
+    primera, ultima = grupos.fecha_min(), grupos.fecha_max()
+    filas = seleccionar(grupos, indices)
+    nombres = await _nombres(db, BeneficiarioModel, BeneficiarioModel.nombre, {f["beneficiario"] for f in filas})
+    return [
+        SimpleNamespace(
+            beneficiario_id=f["beneficiario"],
+            beneficiario_nombre=nombres.get(f["beneficiario"]),
+            primera_concesion=primera[i].item(),
+            ultima_concesion=ultima[i].item(),
+            **f
+        )
+        for i, f in zip(indices, filas)
+    ]
+
+
+def metricas_anuales(anios: List[int]) -> dict:
+    """Mismo formato que estadisticas._metricas_anuales (beneficiarios exactos)."""
+    grupos = motor.agrupar(("anio",), motor.mascara(anio_desde=min(anios), anio_hasta=max(anios)))
+    beneficiarios = grupos.beneficiarios_distintos()
+    metricas = {anio: (0.0, 0, 0) for anio in anios}
+    for i, anio in enumerate(grupos.valores("anio")):
+        if anio in metricas:
+            metricas[anio] = (float(grupos.importe[i]), int(grupos.numero[i]), int(beneficiarios[i]))
+    return metricas
+
+
+def numero_beneficiarios(filtros: Optional[FiltroEstadisticas]) -> int:
+    return int(len(np.unique(motor.columnas["beneficiario"][_mascara_filtros(filtros)])))
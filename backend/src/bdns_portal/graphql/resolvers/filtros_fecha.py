@@ -0,0 +1,94 @@
+"""
+Predicados de fecha sobre bdns.concesion.
+
+bdns.concesion está particionada con RANGE (fecha_concesion). Un filtro
+como extract('year', fecha_concesion) == 2024 impide tanto la poda de
+particiones como el uso de índices, así que los años y rangos se
+traducen aquí a intervalos semiabiertos [desde, hasta) sobre la columna.
+"""
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, or_
+
+from bdns_core.db.models import Concesion as ConcesionModel
+
+
+def inicio_anio(anio: int) -> date:
+    return date(anio, 1, 1)
+
+
+def filtro_rango(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    columna=ConcesionModel.fecha_concesion
+) -> list:
+    """Intervalo semiabierto: desde <= columna < hasta."""
+    condiciones = []
+    if desde is not None:
+        condiciones.append(columna >= desde)
+    if hasta is not None:
+        condiciones.append(columna < hasta)
+    return condiciones
+
+
+def filtro_anio(anio: int, columna=ConcesionModel.fecha_concesion) -> list:
+    return filtro_rango(inicio_anio(anio), inicio_anio(anio + 1), columna)
+
+
+def filtro_rango_anios(
+    anio_desde: Optional[int] = None,
+    anio_hasta: Optional[int] = None,
+    columna=ConcesionModel.fecha_concesion
+) -> list:
+    """Años inclusivos [anio_desde, anio_hasta]."""
+    return filtro_rango(
+        inicio_anio(anio_desde) if anio_desde is not None else None,
+        inicio_anio(anio_hasta + 1) if anio_hasta is not None else None,
+        columna
+    )
+
+
+def filtro_anios(anios: Iterable[int], columna=ConcesionModel.fecha_concesion) -> list:
+    """Años sueltos: OR de intervalos semiabiertos por tramo de años consecutivos."""
+    tramos = []
+    for anio in sorted(set(anios)):
+        if tramos and tramos[-1][1] == anio - 1:
+            tramos[-1][1] = anio
+        else:
+            tramos.append([anio, anio])
+    if not tramos:
+        return []
+    return [or_(*(and_(*filtro_rango_anios(desde, hasta, columna)) for desde, hasta in tramos))]
+
+
+def filtro_fechas(
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    columna=ConcesionModel.fecha_concesion
+) -> list:
+    """Fechas inclusivas [fecha_desde, fecha_hasta]."""
+    return filtro_rango(
+        fecha_desde,
+        fecha_hasta + timedelta(days=1) if fecha_hasta is not None else None,
+        columna
+    )
+
+
+def filtros_fecha_concesion(
+    anio: Optional[int] = None,
+    anio_desde: Optional[int] = None,
+    anio_hasta: Optional[int] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    columna=ConcesionModel.fecha_concesion
+) -> List:
+    """Combina todos los filtros temporales en predicados podables."""
+    condiciones = []
+    if anio is not None:
+        condiciones += filtro_anio(anio, columna)
+    if anio_desde is not None or anio_hasta is not None:
+        condiciones += filtro_rango_anios(anio_desde, anio_hasta, columna)
+    if fecha_desde is not None or fecha_hasta is not None:
+        condiciones += filtro_fechas(fecha_desde, fecha_hasta, columna)
+    return condiciones
@@ -0,0 +1,276 @@
+"""
+Paginación keyset de las conexiones Relay.
+
+El cursor de cada arista guarda los valores de las claves de orden de su
+fila (por ejemplo fecha_concesion e id), no su posición. La página
+siguiente se pide con WHERE (claves) > (cursor) ORDER BY claves LIMIT n,
+que el índice resuelve en el mismo tiempo a cualquier profundidad, en
+lugar de un OFFSET que recorre y descarta todas las filas anteriores.
+
+Los cursores son opacos (JSON en base64) y llevan el tipo de conexión y
+la ordenación con la que se generaron: un cursor de otra ordenación se
+rechaza. limit/offset de PaginationInput se mantiene para los clientes
+existentes, con el coste de siempre.
+
+totalCount solo se calcula si la consulta lo selecciona, en otra sesión y a
+la vez que la página. Por encima de GRAPHQL_CONTEO_ESTIMADO_UMBRAL filas
+estimadas por el planificador (EXPLAIN, que parte de pg_class.reltuples)
+se devuelve la estimación, salvo que se pida exacto.
+"""
+import asyncio
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from decimal import InvalidOperation
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, asc, desc, func, inspect, or_, select, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from ...cache.codec import a_primitivo, desde_primitivo
+from ...core.config import get_settings
+from ...core.database import get_sessionmaker
+from ..inputs import PaginationInput
+from ..types import PageInfo
+from ..seleccion import rutas_seleccionadas
+from ..sesiones import sesion
+
+# Campos de la conexión que necesitan el total
+_RUTAS_TOTAL = {"totalCount", "pageInfo.totalCount", "pageInfo.totalCountEstimado"}
+
+
+@dataclass
+class ClaveOrden:
+    nombre: str
+    columna: Any
+    descendente: bool = False
+
+    @property
+    def admite_nulos(self) -> bool:
+        # Expresiones sin metadatos (coalesce...): se asume que sí
+        return getattr(getattr(self.columna, "expression", self.columna), "nullable", True)
+
+    def invertida(self) -> "ClaveOrden":
+        return ClaveOrden(self.nombre, self.columna, not self.descendente)
+
+
+def ordenacion(
+    modelo,
+    sort: Optional[Sequence],
+    por_defecto: List[ClaveOrden],
+    expresiones: Optional[dict] = None
+) -> List[ClaveOrden]:
+    """Claves de orden de una lista de SortInput (field, direction).
+
+    Los campos que no son columnas del modelo se ignoran; expresiones
+    permite ordenar por campos calculados (p. ej. importe). Se añade el
+    id como desempate para que el orden sea total.
+    """
+    columnas = inspect(modelo).columns
+    claves = []
+    for s in sort or []:
+        columna = (expresiones or {}).get(s.field)
+        if columna is None:
+            columna = columnas.get(s.field)
+        if columna is not None:
+            claves.append(ClaveOrden(s.field, columna, s.direction != "asc"))
+    claves = claves or list(por_defecto)
+
+    if not any(c.nombre == "id" for c in claves):
+        claves.append(ClaveOrden("id", modelo.id, claves[-1].descendente))
+    return claves
+
+
+def _firma(claves: List[ClaveOrden]) -> str:
+    return ",".join(f"{c.nombre}:{'desc' if c.descendente else 'asc'}" for c in claves)
+
+
+def codificar_cursor(tipo: str, claves: List[ClaveOrden], valores: Sequence) -> str:
+    datos = {"t": tipo, "o": _firma(claves), "k": a_primitivo(list(valores))}
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(",", ":")).encode()).decode()
+
+
+def decodificar_cursor(cursor: str, tipo: str, claves: List[ClaveOrden]) -> list:
+    """Valores de las claves de un cursor. ValueError si no es de esta conexión."""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        valores = desde_primitivo(datos["k"])
+        if not isinstance(valores, list):
+            raise ValueError
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError, InvalidOperation, RecursionError):
+        # Cualquier cursor manipulado es un error del cliente, no un 500
+        raise ValueError("Cursor no valido")
+    if datos.get("t") != tipo or datos.get("o") != _firma(claves) or len(valores) != len(claves):
+        raise ValueError(f"Cursor no valido para esta ordenacion de {tipo}")
+    return valores
+
+
+def _expresion_orden(clave: ClaveOrden):
+    return desc(clave.columna) if clave.descendente else asc(clave.columna)
+
+
+def _despues_de(claves: List[ClaveOrden], valores: list):
+    """Filas estrictamente posteriores al cursor en el orden de claves.
+
+    Lleva además la cota c1 >= v1 (c1 <= v1 en DESC) sobre la primera
+    clave: no cambia el resultado, pero ni la comparación de tuplas ni el
+    OR expandido podan particiones, y un rango sobre fecha_concesion sí.
+    En ASC con NULL posibles no se añade (los NULL van detrás del cursor).
+    """
+    condicion = _posteriores(claves, valores)
+    primera, valor = claves[0], valores[0]
+    if valor is None or (primera.admite_nulos and not primera.descendente):
+        return condicion
+    cota = primera.columna <= valor if primera.descendente else primera.columna >= valor
+    return and_(cota, condicion)
+
+
+def _posteriores(claves: List[ClaveOrden], valores: list):
+    """Comparación exacta con el cursor.
+
+    PostgreSQL ordena los NULL al final en ASC y al principio en DESC.
+    Con todas las claves en la misma dirección, sin NULL en el cursor y sin
+    NULL posibles por detrás (o en DESC, donde ya quedaron atrás), basta la
+    comparación de tuplas, que recorre el índice. Si no, se expande a
+    c1 > v1 OR (c1 = v1 AND c2 > v2) ... tratando los NULL explícitamente.
+    """
+    misma_direccion = len({c.descendente for c in claves}) == 1
+    if misma_direccion and None not in valores and (
+        claves[0].descendente or not any(c.admite_nulos for c in claves)
+    ):
+        columnas = tuple_(*[c.columna for c in claves])
+        objetivo = tuple_(*valores)
+        return columnas < objetivo if claves[0].descendente else columnas > objetivo
+
+    alternativas = []
+    iguales = []
+    for clave, valor in zip(claves, valores):
+        if valor is None:
+            # NULL va el último en ASC y el primero en DESC
+            posterior = clave.columna.is_not(None) if clave.descendente else None
+            igual = clave.columna.is_(None)
+        elif clave.descendente:
+            posterior = clave.columna < valor
+            igual = clave.columna == valor
+        else:
+            posterior = clave.columna > valor
+            if clave.admite_nulos:
+                posterior = or_(posterior, clave.columna.is_(None))
+            igual = clave.columna == valor
+        if posterior is not None:
+            alternativas.append(and_(*iguales, posterior))
+        iguales.append(igual)
+    return or_(*alternativas)
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) de una consulta, con sus parámetros."""
+    inherit_cache = False
+
+    def __init__(self, consulta):
+        self.consulta = consulta
+
+
+@compiles(_Explain, "postgresql")
+def _compilar_explain(elemento, compiler, **kw):
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(elemento.consulta, **kw)}"
+
+
+async def _total(conteo, exacto: bool) -> Tuple[int, bool]:
+    """Filas de conteo y si el número es una estimación."""
+    umbral = get_settings().GRAPHQL_CONTEO_ESTIMADO_UMBRAL
+    # Sesión propia: la de la petición está ocupada con la página
+    async with get_sessionmaker()() as propia:
+        if umbral and not exacto:
+            plan = await propia.scalar(_Explain(conteo))
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimadas = int(plan[0]["Plan"]["Plan Rows"])
+            if estimadas >= umbral:
+                return estimadas, True
+        total = await propia.scalar(select(func.count()).select_from(conteo.subquery()))
+        return total, False
+
+
+async def _sin_total() -> Tuple[int, bool]:
+    # totalCount no seleccionado: el valor no llega a serializarse
+    return 0, False
+
+
+async def paginar(
+    info,
+    query,
+    claves: List[ClaveOrden],
+    pagination: Optional[PaginationInput],
+    tipo: str,
+    conexion,
+    arista,
+    conteo,
+    exacto: bool = False
+):
+    """Aplica la paginación a query (sin ORDER BY) y construye la conexión.
+
+    first/after avanza desde el cursor; last/before recorre el orden
+    invertido y devuelve la página en el orden original. conteo es la
+    consulta de filas (sin orden ni límite) sobre la que se calcula
+    totalCount.
+    """
+    db = sesion(info)
+    limite = None
+    cursor = None
+    desplazamiento = 0
+    hacia_atras = False
+
+    if pagination:
+        # first: 0 es una página vacía válida, no "sin tamaño"
+        if pagination.first is not None:
+            limite = pagination.first
+            cursor = pagination.after
+        elif pagination.last is not None:
+            limite = pagination.last
+            cursor = pagination.before
+            hacia_atras = True
+        elif pagination.limit is not None:
+            limite = pagination.limit
+            desplazamiento = pagination.offset or 0
+
+    if (limite is not None and limite < 0) or desplazamiento < 0:
+        raise ValueError("first, last, limit y offset no pueden ser negativos")
+
+    # Sin tamaño, una página máxima (coste.py rechaza las mayores)
+    maximo = get_settings().GRAPHQL_MAX_PAGINA
+    limite = maximo if limite is None else min(limite, maximo)
+
+    orden = [c.invertida() for c in claves] if hacia_atras else claves
+    if cursor:
+        query = query.where(_despues_de(orden, decodificar_cursor(cursor, tipo, claves)))
+
+    # Las claves se leen junto a cada fila para generar su cursor
+    query = query.add_columns(*[c.columna for c in claves]).order_by(*[_expresion_orden(c) for c in orden])
+    query = query.limit(limite + 1)
+    if desplazamiento:
+        query = query.offset(desplazamiento)
+
+    contar = _total(conteo, exacto) if _RUTAS_TOTAL & rutas_seleccionadas(info) else _sin_total()
+    result, (total_count, estimado) = await asyncio.gather(db.execute(query), contar)
+    filas = result.unique().all()
+
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if hacia_atras:
+        filas.reverse()
+
+    edges = [arista(cursor=codificar_cursor(tipo, claves, fila[1:]), node=fila[0]) for fila in filas]
+
+    page_info = PageInfo(
+        has_next_page=bool(cursor) if hacia_atras else hay_mas,
+        has_previous_page=hay_mas if hacia_atras else bool(cursor) or desplazamiento > 0,
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        total_count=total_count,
+        total_count_estimado=estimado
+    )
+
+    return conexion(edges=edges, page_info=page_info, total_count=total_count)
@@ -2,6 +2,11 @@
 from typing import Optional, List
 from uuid import UUID
 import strawberry
+from strawberry.extensions import QueryDepthLimiter
+
+from ..core.config import get_settings
+from .coste import CosteConsulta
+from .sesiones import campo_raiz
 
 # Types existentes
 from .types.convocatoria import (
@@ -22,10 +27,17 @@ from .types.catalogos import (
 from .types.estadisticas import (
     EstadisticasConcesiones,
     EvolucionMensual,
+    EvolucionMensualAnio,
     EstadisticasRegimen,
     EstadisticasRegion,
     TopConvocatoria,
     ComparativaAnual,
+    EvolucionAnual,
+    BeneficiariosDistintos,
+    CeldaEstadistica,
+    DimensionEstadistica,
+    MedidaEstadistica,
+    AgrupacionEstadistica,
     FiltroEstadisticas
 )
 
@@ -55,28 +67,34 @@ from .resolvers.estadisticas import (
     get_estadisticas_por_organo,
     get_concentracion_subvenciones,
     get_estadisticas_evolucion_mensual,
+    get_estadisticas_evolucion_mensual_anios,
     get_estadisticas_por_regimen,
     get_estadisticas_por_region,
     get_top_convocatorias,
     get_beneficiarios_recurrentes,
-    get_comparativa_anual
+    get_comparativa_anual,
+    get_comparativa_anual_serie,
+    get_numero_beneficiarios,
+    get_estadisticas_cubo,
+    get_historial_beneficiario
 )
 
 
 @strawberry.type
 class Query:
     # ============ CONVOCATORIAS ============
-    @strawberry.field
+    @campo_raiz
     async def convocatorias(
         self,
         info: strawberry.Info,
         pagination: Optional[PaginationInput] = None,
         where: Optional[ConvocatoriaFilterInput] = None,
-        order_by: Optional[List[ConvocatoriaSortInput]] = None
+        order_by: Optional[List[ConvocatoriaSortInput]] = None,
+        exacto: bool = False
     ) -> ConvocatoriaConnection:
-        return await conv_resolvers.get_convocatorias(info, pagination, where, order_by)
+        return await conv_resolvers.get_convocatorias(info, pagination, where, order_by, exacto)
     
-    @strawberry.field
+    @campo_raiz
     async def convocatoria(
         self,
         info: strawberry.Info,
@@ -84,7 +102,7 @@ class Query:
     ) -> Optional[Convocatoria]:
         return await conv_resolvers.get_convocatoria_by_id(info, id)
     
-    @strawberry.field
+    @campo_raiz
     async def buscar_convocatorias(
         self,
         info: strawberry.Info,
@@ -94,17 +112,18 @@ class Query:
         return await conv_resolvers.buscar_convocatorias(info, q, limit)
     
     # ============ BENEFICIARIOS ============
-    @strawberry.field
+    @campo_raiz
     async def beneficiarios(
         self,
         info: strawberry.Info,
         pagination: Optional[PaginationInput] = None,
         where: Optional[BeneficiarioFilterInput] = None,
-        order_by: Optional[List[BeneficiarioSortInput]] = None
+        order_by: Optional[List[BeneficiarioSortInput]] = None,
+        exacto: bool = False
     ) -> BeneficiarioConnection:
-        return await ben_resolvers.get_beneficiarios(info, pagination, where, order_by)
+        return await ben_resolvers.get_beneficiarios(info, pagination, where, order_by, exacto)
     
-    @strawberry.field
+    @campo_raiz
     async def beneficiario(
         self,
         info: strawberry.Info,
@@ -112,7 +131,7 @@ class Query:
     ) -> Optional[Beneficiario]:
         return await ben_resolvers.get_beneficiario_by_id(info, id)
     
-    @strawberry.field
+    @campo_raiz
     async def buscar_beneficiarios(
         self,
         info: strawberry.Info,
@@ -122,17 +141,18 @@ class Query:
         return await ben_resolvers.buscar_beneficiarios(info, q, limit)
     
     # ============ CONCESIONES ============
-    @strawberry.field
+    @campo_raiz
     async def concesiones(
         self,
         info: strawberry.Info,
         pagination: Optional[PaginationInput] = None,
         where: Optional[ConcesionFilterInput] = None,
-        order_by: Optional[List[ConcesionSortInput]] = None
+        order_by: Optional[List[ConcesionSortInput]] = None,
+        exacto: bool = False
     ) -> ConcesionConnection:
-        return await conc_resolvers.get_concesiones(info, pagination, where, order_by)
+        return await conc_resolvers.get_concesiones(info, pagination, where, order_by, exacto)
     
-    @strawberry.field
+    @campo_raiz
     async def concesion(
         self,
         info: strawberry.Info,
@@ -140,7 +160,7 @@ class Query:
     ) -> Optional[Concesion]:
         return await conc_resolvers.get_concesion_by_id(info, id)
     
-    @strawberry.field
+    @campo_raiz
     async def concesiones_por_beneficiario(
         self,
         info: strawberry.Info,
@@ -152,7 +172,7 @@ class Query:
             info, beneficiario_id, anio, pagination
         )
     
-    @strawberry.field
+    @campo_raiz
     async def concesiones_por_convocatoria(
         self,
         info: strawberry.Info,
@@ -164,7 +184,7 @@ class Query:
         )
     
     # ============ CATÁLOGOS ============
-    @strawberry.field
+    @campo_raiz
     async def finalidades(
         self,
         info: strawberry.Info,
@@ -172,7 +192,7 @@ class Query:
     ) -> List[Finalidad]:
         return await cat_resolvers.get_finalidades(info, where)
     
-    @strawberry.field
+    @campo_raiz
     async def fondos(
         self,
         info: strawberry.Info,
@@ -180,7 +200,7 @@ class Query:
     ) -> List[Fondo]:
         return await cat_resolvers.get_fondos(info, where)
     
-    @strawberry.field
+    @campo_raiz
     async def formas_juridicas(
         self,
         info: strawberry.Info,
@@ -188,7 +208,7 @@ class Query:
     ) -> List[FormaJuridica]:
         return await cat_resolvers.get_formas_juridicas(info, where)
     
-    @strawberry.field
+    @campo_raiz
     async def instrumentos(
         self,
         info: strawberry.Info,
@@ -196,7 +216,7 @@ class Query:
     ) -> List[Instrumento]:
         return await cat_resolvers.get_instrumentos(info, where)
     
-    @strawberry.field
+    @campo_raiz
     async def objetivos(
         self,
         info: strawberry.Info,
@@ -204,7 +224,7 @@ class Query:
     ) -> List[Objetivo]:
         return await cat_resolvers.get_objetivos(info, where)
     
-    @strawberry.field
+    @campo_raiz
     async def organos(
         self,
         info: strawberry.Info,
@@ -213,7 +233,7 @@ class Query:
     ) -> List[Organo]:
         return await cat_resolvers.get_organos(info, where, incluir_hijos)
     
-    @strawberry.field
+    @campo_raiz
     async def regiones(
         self,
         info: strawberry.Info,
@@ -222,7 +242,7 @@ class Query:
     ) -> List[Region]:
         return await cat_resolvers.get_regiones(info, where, incluir_hijos)
     
-    @strawberry.field
+    @campo_raiz
     async def sectores_actividad(
         self,
         info: strawberry.Info,
@@ -231,7 +251,7 @@ class Query:
     ) -> List[SectorActividad]:
         return await cat_resolvers.get_sectores_actividad(info, where, incluir_hijos)
     
-    @strawberry.field
+    @campo_raiz
     async def tipos_beneficiario(
         self,
         info: strawberry.Info,
@@ -240,7 +260,19 @@ class Query:
         return await cat_resolvers.get_tipos_beneficiario(info, where)
     
     # ============ ESTADÍSTICAS ============
-    @strawberry.field
+    @campo_raiz
+    async def estadisticas(
+        self,
+        info: strawberry.Info,
+        dimensiones: List[DimensionEstadistica],
+        medidas: Optional[List[MedidaEstadistica]] = None,
+        filtros: Optional[FiltroEstadisticas] = None,
+        agrupacion: AgrupacionEstadistica = AgrupacionEstadistica.ROLLUP,
+        conjuntos: Optional[List[List[DimensionEstadistica]]] = None
+    ) -> List[CeldaEstadistica]:
+        return await get_estadisticas_cubo(info, dimensiones, medidas, filtros, agrupacion, conjuntos)
+    
+    @campo_raiz
     async def estadisticas_por_tipo_entidad(
         self,
         info: strawberry.Info,
@@ -248,7 +280,7 @@ class Query:
     ) -> List[EstadisticasConcesiones]:
         return await get_estadisticas_por_tipo_entidad(info, filtros)
     
-    @strawberry.field
+    @campo_raiz
     async def estadisticas_por_organo(
         self,
         info: strawberry.Info,
@@ -256,7 +288,7 @@ class Query:
     ) -> List[EstadisticasConcesiones]:
         return await get_estadisticas_por_organo(info, filtros)
     
-    @strawberry.field
+    @campo_raiz
     async def concentracion_subvenciones(
         self,
         info: strawberry.Info,
@@ -266,7 +298,7 @@ class Query:
     ) -> List[EstadisticasConcesiones]:
         return await get_concentracion_subvenciones(info, anio, tipo_entidad, limite)
     
-    @strawberry.field
+    @campo_raiz
     async def estadisticas_evolucion_mensual(
         self,
         info: strawberry.Info,
@@ -274,7 +306,16 @@ class Query:
     ) -> List[EvolucionMensual]:
         return await get_estadisticas_evolucion_mensual(info, anio)
     
-    @strawberry.field
+    @campo_raiz
+    async def estadisticas_evolucion_mensual_anios(
+        self,
+        info: strawberry.Info,
+        anio_desde: int,
+        anio_hasta: int
+    ) -> List[EvolucionMensualAnio]:
+        return await get_estadisticas_evolucion_mensual_anios(info, anio_desde, anio_hasta)
+    
+    @campo_raiz
     async def estadisticas_por_regimen(
         self,
         info: strawberry.Info,
@@ -282,16 +323,17 @@ class Query:
     ) -> List[EstadisticasRegimen]:
         return await get_estadisticas_por_regimen(info, anio)
     
-    @strawberry.field
+    @campo_raiz
     async def estadisticas_por_region(
         self,
         info: strawberry.Info,
         anio: Optional[int] = None,
-        limite: int = 20
+        limite: int = 20,
+        exacto: bool = False
     ) -> List[EstadisticasRegion]:
-        return await get_estadisticas_por_region(info, anio, limite)
+        return await get_estadisticas_por_region(info, anio, limite, exacto)
     
-    @strawberry.field
+    @campo_raiz
     async def top_convocatorias(
         self,
         info: strawberry.Info,
@@ -300,7 +342,7 @@ class Query:
     ) -> List[TopConvocatoria]:
         return await get_top_convocatorias(info, anio, limite)
     
-    @strawberry.field
+    @campo_raiz
     async def beneficiarios_recurrentes(
         self,
         info: strawberry.Info,
@@ -310,14 +352,49 @@ class Query:
     ) -> List[EstadisticasConcesiones]:
         return await get_beneficiarios_recurrentes(info, anio, minimo_concesiones, limite)
     
-    @strawberry.field
+    @campo_raiz
+    async def historial_beneficiario(
+        self,
+        info: strawberry.Info,
+        beneficiario_id: UUID
+    ) -> List[EstadisticasConcesiones]:
+        return await get_historial_beneficiario(info, beneficiario_id)
+    
+    @campo_raiz
     async def comparativa_anual(
         self,
         info: strawberry.Info,
         anio_base: int,
-        anio_comparar: int
+        anio_comparar: int,
+        exacto: bool = False
     ) -> ComparativaAnual:
-        return await get_comparativa_anual(info, anio_base, anio_comparar)
+        return await get_comparativa_anual(info, anio_base, anio_comparar, exacto)
+    
+    @campo_raiz
+    async def comparativa_anual_serie(
+        self,
+        info: strawberry.Info,
+        anio_desde: int,
+        anio_hasta: int,
+        exacto: bool = False
+    ) -> List[EvolucionAnual]:
+        return await get_comparativa_anual_serie(info, anio_desde, anio_hasta, exacto)
+    
+    @campo_raiz
+    async def numero_beneficiarios(
+        self,
+        info: strawberry.Info,
+        filtros: Optional[FiltroEstadisticas] = None,
+        exacto: bool = False
+    ) -> BeneficiariosDistintos:
+        return await get_numero_beneficiarios(info, filtros, exacto)
 
 
-schema = strawberry.Schema(query=Query)
\ No newline at end of file
+schema = strawberry.Schema(
+    query=Query,
+    extensions=[
+        # Factoría: Strawberry construye una extensión nueva por petición
+        lambda: QueryDepthLimiter(max_depth=get_settings().GRAPHQL_PROFUNDIDAD_MAXIMA),
+        CosteConsulta
+    ]
+)
\ No newline at end of file
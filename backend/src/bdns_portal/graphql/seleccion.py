@@ -0,0 +1,144 @@
+"""
+Lookahead sobre la selección GraphQL del campo que se resuelve.
+
+Permite a los resolvers hacer solo el trabajo que la consulta pide: no
+contar filas si nadie selecciona totalCount, y cargar solo las columnas y
+relaciones que se van a serializar (opciones_carga). Las relaciones
+marcadas POR_CARGADOR no se cargan aquí: las resuelve el DataLoader de la
+petición (cargadores.py) y solo hace falta su clave ajena.
+"""
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from sqlalchemy.orm.exc import UnmappedColumnError
+from strawberry.types.nodes import FragmentSpread, InlineFragment
+
+
+def rutas_seleccionadas(info) -> Set[str]:
+    """Rutas pedidas bajo el campo actual, con nombres GraphQL y puntos.
+
+    { edges { node { titulo } } totalCount } da edges, edges.node,
+    edges.node.titulo y totalCount. Los fragmentos se aplanan.
+    """
+    rutas = set()
+
+    def recorrer(selecciones, prefijo: str) -> None:
+        for seleccion in selecciones:
+            if isinstance(seleccion, (FragmentSpread, InlineFragment)):
+                recorrer(seleccion.selections, prefijo)
+                continue
+            ruta = f"{prefijo}{seleccion.name}"
+            rutas.add(ruta)
+            recorrer(seleccion.selections, f"{ruta}.")
+
+    for campo in info.selected_fields:
+        recorrer(campo.selections, "")
+    return rutas
+
+
+def rutas_bajo(rutas: Set[str], prefijo: str) -> Set[str]:
+    """Rutas relativas a prefijo: rutas_bajo(rutas, "edges.node")."""
+    prefijo = f"{prefijo}."
+    return {r[len(prefijo):] for r in rutas if r.startswith(prefijo)}
+
+
+# Relación resuelta por DataLoader (valor en Carga.relaciones)
+POR_CARGADOR = "cargador"
+
+
+@dataclass
+class Carga:
+    """Cómo cargar un modelo para los campos de su tipo GraphQL.
+
+    relaciones: relación -> Carga del modelo relacionado (None = el objeto
+    entero, sin sus propias relaciones; POR_CARGADOR = por DataLoader).
+    calculados: campo calculado del tipo -> atributos que lee, con puntos
+    para los de una relación.
+    """
+    relaciones: Dict[str, Optional["Carga"]] = field(default_factory=dict)
+    calculados: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+
+def _atributo(nombre: str) -> str:
+    """Nombre GraphQL (camelCase) al atributo Python (snake_case)."""
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", nombre).lower()
+
+
+def _claves(mapper, columnas: Iterable) -> Set[str]:
+    """Atributos del mapper para columnas de su tabla (el resto se ignoran)."""
+    claves = set()
+    for columna in columnas:
+        try:
+            claves.add(mapper.get_property_by_column(columna).key)
+        except UnmappedColumnError:
+            pass
+    return claves
+
+
+def opciones_carga(modelo, carga: Carga, rutas: Set[str], incluir: Iterable[str] = ()) -> list:
+    """load_only y joinedload/selectinload para las rutas pedidas del modelo.
+
+    Las rutas son relativas al objeto (titulo, organo.nombre...). Solo se
+    leen las columnas pedidas más la clave primaria y las claves ajenas
+    que necesitan las relaciones; las relaciones a uno van por JOIN y las
+    colecciones en un SELECT ... IN aparte, y solo si se piden.
+    """
+    mapper = inspect(modelo)
+
+    rutas = set(rutas)
+    # Lo que leen los campos calculados se carga aunque sea POR_CARGADOR:
+    # el campo lo lee del objeto, sin pasar por el DataLoader
+    leidas = set()
+    for ruta in list(rutas):
+        leidas.update(carga.calculados.get(_atributo(ruta.split(".", 1)[0]), ()))
+    rutas |= leidas
+    leidas = {_atributo(r.split(".", 1)[0]) for r in leidas}
+
+    hijos = defaultdict(set)
+    for ruta in rutas:
+        cabeza, _, resto = ruta.partition(".")
+        hijos[_atributo(cabeza)]
+        if resto:
+            hijos[_atributo(cabeza)].add(resto)
+
+    columnas = {c.key for c in mapper.column_attrs if c.columns[0].primary_key}
+    columnas.update(incluir)
+    opciones = []
+    for nombre, subrutas in hijos.items():
+        if nombre in mapper.column_attrs:
+            columnas.add(nombre)
+            continue
+        relacion = mapper.relationships.get(nombre)
+        if relacion is None:
+            continue
+
+        columnas.update(_claves(mapper, relacion.local_columns))
+        subcarga = carga.relaciones.get(nombre)
+        if subcarga == POR_CARGADOR:
+            if nombre not in leidas:
+                continue
+            subcarga = Carga()
+        opcion = (selectinload if relacion.uselist else joinedload)(getattr(modelo, nombre))
+        if subcarga is not None:
+            opcion = opcion.options(*opciones_carga(
+                relacion.mapper.class_, subcarga, subrutas,
+                # La clave ajena del hijo enlaza cada fila de la colección
+                incluir=_claves(relacion.mapper, relacion.remote_side)
+            ))
+        opciones.append(opcion)
+
+    return [load_only(*[getattr(modelo, c) for c in sorted(columnas)]), *opciones]
+
+
+def opciones_completas(modelo, carga: Carga) -> list:
+    """Todas las columnas más lo que leen los campos calculados.
+
+    Para los objetos que carga un DataLoader, que no conoce la selección:
+    el resto de sus relaciones se resuelven con otros DataLoaders.
+    """
+    rutas = {c.key for c in inspect(modelo).column_attrs} | set(carga.calculados)
+    return opciones_carga(modelo, carga, rutas)
@@ -0,0 +1,65 @@
+"""
+Sesión de base de datos propia para cada campo raíz.
+
+Strawberry resuelve a la vez los campos raíz de una operación
+({ estadisticasPorRegion ... estadisticasPorOrgano ... }) y una
+AsyncSession no admite operaciones concurrentes. Los campos de Query se
+declaran con campo_raiz, que reserva en el contexto compartido de la
+petición una entrada por campo raíz (su clave de respuesta, alias
+incluido); los resolvers piden la sesión con sesion(info), que la abre
+en el primer uso, y la extensión la cierra al terminar el campo. Los
+campos anidados no usan esa sesión: las relaciones van por los
+DataLoaders de cargadores.py, que abren las suyas.
+"""
+import strawberry
+from sqlalchemy.ext.asyncio import AsyncSession
+from strawberry.extensions import FieldExtension
+
+from ..core.database import get_sessionmaker
+from .cargadores import cargadores
+
+# Entrada del contexto: clave de respuesta del campo raíz -> sesión (None
+# hasta el primer uso)
+SESIONES = "sesiones"
+
+
+def _campo_raiz(info) -> str:
+    ruta = info.path
+    while ruta.prev is not None:
+        ruta = ruta.prev
+    return ruta.key
+
+
+def sesion(info) -> AsyncSession:
+    """Sesión del campo raíz que se está resolviendo.
+
+    Fuera de un campo_raiz (scripts, pruebas que llaman al resolver
+    directamente) es la de info.context["db"].
+    """
+    abiertas = info.context.get(SESIONES)
+    clave = _campo_raiz(info) if abiertas is not None else None
+    if clave not in (abiertas or {}):
+        return info.context["db"]
+    if abiertas[clave] is None:
+        abiertas[clave] = get_sessionmaker()()
+    return abiertas[clave]
+
+
+class SesionPropia(FieldExtension):
+    async def resolve_async(self, next_, source, info: strawberry.Info, **kwargs):
+        # El registro de DataLoaders lo comparten todos los campos raíz
+        cargadores(info)
+        abiertas = info.context.setdefault(SESIONES, {})
+        clave = _campo_raiz(info)
+        abiertas[clave] = None
+        try:
+            return await next_(source, info, **kwargs)
+        finally:
+            db = abiertas.pop(clave, None)
+            if db is not None:
+                await db.close()
+
+
+def campo_raiz(resolver):
+    """strawberry.field de Query con su propia sesión de base de datos."""
+    return strawberry.field(resolver, extensions=[SesionPropia()])
@@ -3,6 +3,7 @@ from uuid import UUID
 from datetime import datetime
 import strawberry
 
+from ..cargadores import campo_relacion
 from .catalogos import FormaJuridica, TipoBeneficiario
 from .convocatoria import PageInfo
 
@@ -25,9 +26,9 @@ class Beneficiario:
     created_by: Optional[str]
     updated_by: Optional[str]
     
-    forma_juridica: Optional[FormaJuridica]
-    tipo_beneficiario: Optional[TipoBeneficiario]
-    pseudonimos: List[Pseudonimo]
+    forma_juridica: Optional[FormaJuridica] = campo_relacion("forma_juridica")
+    tipo_beneficiario: Optional[TipoBeneficiario] = campo_relacion("tipo_beneficiario")
+    pseudonimos: List[Pseudonimo] = campo_relacion("pseudonimos")
     
     @strawberry.field
     def es_entidad_publica(self) -> bool:
@@ -2,6 +2,8 @@ from typing import Optional, List
 from uuid import UUID
 import strawberry
 
+from ..cargadores import campo_relacion
+
 
 @strawberry.type
 class Finalidad:
@@ -55,8 +57,8 @@ class Organo:
     nivel2: Optional[str]
     nivel3: Optional[str]
     tipo: str
-    padre: Optional['Organo']
-    hijos: List['Organo']
+    padre: Optional['Organo'] = campo_relacion("padre")
+    hijos: List['Organo'] = campo_relacion("hijos")
 
 
 @strawberry.type
@@ -75,8 +77,8 @@ class Region:
     api_id: Optional[int]
     descripcion: str
     descripcion_norm: str
-    padre: Optional['Region']
-    hijos: List['Region']
+    padre: Optional['Region'] = campo_relacion("padre")
+    hijos: List['Region'] = campo_relacion("hijos")
 
 
 @strawberry.type
@@ -92,8 +94,8 @@ class SectorActividad:
     codigo: str
     descripcion: str
     descripcion_norm: str
-    padre: Optional['SectorActividad']
-    hijos: List['SectorActividad']
+    padre: Optional['SectorActividad'] = campo_relacion("padre")
+    hijos: List['SectorActividad'] = campo_relacion("hijos")
 
 
 @strawberry.type
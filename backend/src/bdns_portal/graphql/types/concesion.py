@@ -3,6 +3,7 @@ from uuid import UUID
 from datetime import date, datetime
 import strawberry
 
+from ..cargadores import campo_relacion
 from .beneficiario import Beneficiario
 from .convocatoria import Convocatoria, PageInfo
 from .catalogos import RegimenAyuda
@@ -24,9 +25,9 @@ class Concesion:
     convocatoria_id: UUID
     regimen_ayuda_id: Optional[UUID]
     
-    beneficiario: Optional[Beneficiario]
-    convocatoria: Optional[Convocatoria]
-    regimen_ayuda: Optional[RegimenAyuda]
+    beneficiario: Optional[Beneficiario] = campo_relacion("beneficiario")
+    convocatoria: Optional[Convocatoria] = campo_relacion("convocatoria")
+    regimen_ayuda: Optional[RegimenAyuda] = campo_relacion("regimen_ayuda")
     
     @strawberry.field
     def importe(self) -> int:
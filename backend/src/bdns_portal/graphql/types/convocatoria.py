@@ -5,6 +5,7 @@ import strawberry
 import base64
 import json
 
+from ..cargadores import campo_relacion
 from .catalogos import (
     Organo, Reglamento, Finalidad, Instrumento,
     TipoBeneficiario, SectorActividad, Region,
@@ -20,6 +21,8 @@ class PageInfo:
     start_cursor: Optional[str]
     end_cursor: Optional[str]
     total_count: int
+    # total_count sale de las estadisticas del planificador (exacto: false)
+    total_count_estimado: bool = False
 
 
 @strawberry.type
@@ -90,18 +93,18 @@ class Convocatoria:
     updated_by: Optional[str]
     
     # Relaciones
-    organo: Optional[Organo]
-    reglamento: Optional[Reglamento]
-    finalidad: Optional[Finalidad]
-    instrumentos: List[Instrumento]
-    tipos_beneficiarios: List[TipoBeneficiario]
-    sectores_actividad: List[SectorActividad]
-    regiones: List[Region]
-    fondos: List[Fondo]
-    objetivos: List[Objetivo]
-    sectores_producto: List[SectorProducto]
-    documentos: List[DocumentoConvocatoria]
-    anuncios: List[AnuncioConvocatoria]
+    organo: Optional[Organo] = campo_relacion("organo")
+    reglamento: Optional[Reglamento] = campo_relacion("reglamento")
+    finalidad: Optional[Finalidad] = campo_relacion("finalidad")
+    instrumentos: List[Instrumento] = campo_relacion("instrumentos")
+    tipos_beneficiarios: List[TipoBeneficiario] = campo_relacion("tipos_beneficiarios")
+    sectores_actividad: List[SectorActividad] = campo_relacion("sectores_actividad")
+    regiones: List[Region] = campo_relacion("regiones")
+    fondos: List[Fondo] = campo_relacion("fondos")
+    objetivos: List[Objetivo] = campo_relacion("objetivos")
+    sectores_producto: List[SectorProducto] = campo_relacion("sectores_producto")
+    documentos: List[DocumentoConvocatoria] = campo_relacion("documentos")
+    anuncios: List[AnuncioConvocatoria] = campo_relacion("anuncios")
     
     @strawberry.field
     def estado(self) -> str:
@@ -2,9 +2,35 @@
 from typing import Optional, List
 from uuid import UUID
 from datetime import date
+from enum import Enum
 import strawberry
 
 
+@strawberry.enum
+class DimensionEstadistica(Enum):
+    ANIO = "anio"
+    MES = "mes"
+    ORGANO = "organo"
+    TIPO_ENTIDAD = "tipo_entidad"
+    REGION = "region"
+    REGIMEN = "regimen"
+
+
+@strawberry.enum
+class MedidaEstadistica(Enum):
+    NUMERO_CONCESIONES = "numero_concesiones"
+    IMPORTE_TOTAL = "importe_total"
+    IMPORTE_MEDIO = "importe_medio"
+    NUMERO_BENEFICIARIOS = "numero_beneficiarios"
+
+
+@strawberry.enum
+class AgrupacionEstadistica(Enum):
+    GRUPO = "grupo"        # GROUP BY simple: solo el detalle
+    ROLLUP = "rollup"      # subtotales jerárquicos en el orden de las dimensiones
+    CUBE = "cube"          # todas las combinaciones de subtotales
+
+
 @strawberry.type
 class EstadisticasConcesiones:
     # Dimensiones
@@ -37,6 +63,12 @@ class EvolucionMensual:
     porcentaje_total: float
 
 
+@strawberry.type
+class EvolucionMensualAnio:
+    anio: int
+    meses: List[EvolucionMensual]
+
+
 @strawberry.type
 class EstadisticasRegimen:
     regimen: str
@@ -100,6 +132,56 @@ class ComparativaAnual:
     variacion_beneficiarios_porcentual: float
 
 
+@strawberry.type
+class EvolucionAnual:
+    anio: int
+    total_concedido: float
+    numero_concesiones: int
+    importe_medio: float
+    numero_beneficiarios: int
+    
+    # Variación respecto al año anterior de la serie (None en el primero)
+    variacion_importe: Optional[float] = None
+    variacion_importe_porcentual: Optional[float] = None
+    variacion_concesiones: Optional[int] = None
+    variacion_concesiones_porcentual: Optional[float] = None
+    variacion_importe_medio: Optional[float] = None
+    variacion_importe_medio_porcentual: Optional[float] = None
+    variacion_beneficiarios: Optional[int] = None
+    variacion_beneficiarios_porcentual: Optional[float] = None
+
+
+@strawberry.type
+class BeneficiariosDistintos:
+    numero_beneficiarios: int
+    exacto: bool
+    # Error estándar relativo de la estimación HLL (0 si es exacto)
+    error_relativo: float
+
+
+@strawberry.type
+class CeldaEstadistica:
+    # Dimensiones (None si no se pidió, si la fila la agrega o si el valor
+    # es desconocido; dimensiones_agregadas distingue los dos últimos)
+    anio: Optional[int] = None
+    mes: Optional[int] = None
+    organo_id: Optional[str] = None
+    organo_nombre: Optional[str] = None
+    tipo_entidad: Optional[str] = None
+    region_id: Optional[str] = None
+    region_nombre: Optional[str] = None
+    regimen: Optional[str] = None
+    
+    # Dimensiones sumarizadas en esta fila: [] es el detalle, todas el total
+    dimensiones_agregadas: List[DimensionEstadistica] = strawberry.field(default_factory=list)
+    
+    # Medidas (solo las pedidas)
+    numero_concesiones: Optional[int] = None
+    importe_total: Optional[float] = None
+    importe_medio: Optional[float] = None
+    numero_beneficiarios: Optional[int] = None
+
+
 @strawberry.input
 class FiltroEstadisticas:
     anio: Optional[int] = None
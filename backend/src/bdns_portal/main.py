@@ -6,6 +6,7 @@ Base de Datos Nacional de Subvenciones (BDNS).
 
 Usa configuración centralizada de bdns_core.
 """
+import asyncio
 import logging
 import time
 from contextlib import asynccontextmanager
@@ -15,7 +16,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from strawberry.fastapi import GraphQLRouter
 
 from bdns_portal.graphql import graphql_schema as schema
+from bdns_portal.graphql.calentador import calentar_cache
+from bdns_portal.graphql.cargadores import Cargadores
 from bdns_portal.cache.redis_cache import redis_cache
+from bdns_portal.analytics import motor_estadisticas
+from bdns_portal.core.config import get_settings as get_local_settings
+from bdns_portal.core.database import get_sessionmaker
 from bdns_core.config import get_portal_settings
 from bdns_core.logging import get_logger
 
@@ -27,6 +33,57 @@ settings = get_portal_settings()
 logger = get_logger(__name__)
 
 
+async def cargar_motor_estadisticas() -> None:
+    """Carga el motor de estadisticas en memoria desde PostgreSQL."""
+    # La version se lee antes de cargar: si cambia durante la carga el
+    # motor queda obsoleto y el oyente vuelve a recargarlo
+    version = await redis_cache.version_datos()
+    async with get_sessionmaker()() as db:
+        await motor_estadisticas.cargar(db, version=version)
+
+
+_recarga_por_version = None
+
+
+async def recargar_motor_por_version() -> None:
+    """Recarga el motor hasta alcanzar la version de datos vigente."""
+    while not motor_estadisticas.actualizado:
+        try:
+            await cargar_motor_estadisticas()
+            logger.info("Motor de estadisticas recargado", extra={"version": motor_estadisticas.version})
+        except Exception as e:
+            # Mientras tanto los resolvers usan los rollups SQL
+            logger.error("Error recargando motor de estadisticas", exc_info=e)
+            return
+
+
+def al_cambiar_version_datos(version: int) -> None:
+    """Oyente de redis_cache: un refresco de rollups deja el motor obsoleto."""
+    global _recarga_por_version
+    if not motor_estadisticas.notificar_version(version):
+        return
+    if _recarga_por_version is None or _recarga_por_version.done():
+        _recarga_por_version = asyncio.create_task(recargar_motor_por_version())
+
+
+async def recargar_motor_periodicamente(intervalo: int) -> None:
+    """Recarga el motor cada `intervalo` segundos para recoger cargas ETL."""
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await cargar_motor_estadisticas()
+        except Exception as e:
+            logger.error("Error recargando motor de estadisticas", exc_info=e)
+
+
+async def calentar_cache_arranque() -> None:
+    """Calienta la cache de estadisticas sin bloquear el arranque."""
+    try:
+        await calentar_cache()
+    except Exception as e:
+        logger.error("Error calentando la cache de estadisticas", exc_info=e)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -46,6 +103,27 @@ async def lifespan(app: FastAPI):
         # No fallamos el startup, Redis puede no estar disponible
         pass
     
+    # Motor de estadisticas en memoria (opcional, por despliegue)
+    local_settings = get_local_settings()
+    tarea_recarga = None
+    if local_settings.ESTADISTICAS_MOTOR == "memoria":
+        redis_cache.al_cambiar_version(al_cambiar_version_datos)
+        try:
+            await cargar_motor_estadisticas()
+            logger.info("Motor de estadisticas en memoria cargado", extra=motor_estadisticas.memoria())
+        except Exception as e:
+            # Sin motor cargado los resolvers usan los rollups SQL
+            logger.error("Error cargando motor de estadisticas", exc_info=e)
+        if local_settings.ESTADISTICAS_MOTOR_RECARGA_SEGUNDOS > 0:
+            tarea_recarga = asyncio.create_task(
+                recargar_motor_periodicamente(local_settings.ESTADISTICAS_MOTOR_RECARGA_SEGUNDOS)
+            )
+    
+    # Calentar la cache (despues del motor, para usarlo si esta activo)
+    tarea_calentar = None
+    if local_settings.CACHE_CALENTAR_AL_ARRANCAR:
+        tarea_calentar = asyncio.create_task(calentar_cache_arranque())
+    
     logger.info("Entorno: %s", settings.ENVIRONMENT)
     logger.info("GraphQL Playground: %s", "activado" if settings.GRAPHQL_PLAYGROUND else "desactivado")
     logger.info("BDNS Portal API listo")
@@ -55,6 +133,13 @@ async def lifespan(app: FastAPI):
     # ----- SHUTDOWN -----
     logger.info("Cerrando BDNS Portal API...")
     
+    if tarea_recarga:
+        tarea_recarga.cancel()
+    if _recarga_por_version:
+        _recarga_por_version.cancel()
+    if tarea_calentar:
+        tarea_calentar.cancel()
+    
     # Cerrar Redis
     if redis_cache.client:
         try:
@@ -88,9 +173,19 @@ app.add_middleware(
 )
 
 # GraphQL
+async def get_context():
+    """Contexto por peticion: DataLoaders de relaciones.
+
+    La sesion de BD la abre cada campo raiz (graphql/sesiones.py): se
+    resuelven a la vez y una AsyncSession no admite consultas concurrentes.
+    """
+    return {"cargadores": Cargadores()}
+
+
 graphql_app = GraphQLRouter(
     schema,
     graphiql=settings.GRAPHQL_PLAYGROUND,
+    context_getter=get_context,
 )
 app.include_router(graphql_app, prefix="/graphql")
 
@@ -160,6 +255,36 @@ async def health_redis():
         }
 
 
+@app.get("/health/cache")
+async def health_cache():
+    """Aciertos por capa de cache (L1 en proceso, L2 Redis)."""
+    return {"status": "ok", **redis_cache.estadisticas()}
+
+
+@app.get("/health/estadisticas")
+async def health_estadisticas():
+    """Estado del motor de estadisticas y su huella de memoria."""
+    motor = get_local_settings().ESTADISTICAS_MOTOR
+    if motor != "memoria":
+        return {"status": "ok", "motor": motor}
+    
+    if not motor_estadisticas.activo:
+        logger.warning("Health check estadisticas: motor en memoria no cargado")
+        return {
+            "status": "error",
+            "motor": motor,
+            "message": "Motor en memoria no cargado, usando rollups SQL"
+        }
+    
+    return {
+        "status": "ok",
+        "motor": motor,
+        "cargado_en": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(motor_estadisticas.cargado_en)),
+        "duracion_carga_s": round(motor_estadisticas.duracion_carga, 2),
+        "memoria": motor_estadisticas.memoria()
+    }
+
+
 @app.get("/info")
 async def info():
     """Información detallada del servicio."""
@@ -0,0 +1,12 @@
+# bdns_portal/rollup/__init__.py
+from .tables import (
+    rollup_concesion_mensual, rollup_beneficiarios_hll, rollup_actividad_beneficiario,
+    rollup_refresco, HLL_ERROR_RELATIVO, hll_disponible
+)
+from .refresh import refresh_rollups, refresh_rollups_incremental, importe_concesion
+
+__all__ = [
+    "rollup_concesion_mensual", "rollup_beneficiarios_hll", "rollup_actividad_beneficiario",
+    "rollup_refresco", "HLL_ERROR_RELATIVO", "hll_disponible",
+    "refresh_rollups", "refresh_rollups_incremental", "importe_concesion"
+]
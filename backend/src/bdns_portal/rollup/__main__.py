@@ -0,0 +1,61 @@
+# bdns_portal/rollup/__main__.py
+"""
+Reconstruye los rollups de estadisticas.
+
+Uso:
+    python -m bdns_portal.rollup              # incremental
+    python -m bdns_portal.rollup --completo   # reconstruccion completa
+
+Si alguna tabla de rollup ha cambiado incrementa la version de datos en
+Redis, lo que invalida la cache de estadisticas de la API. Una pasada sin
+datos nuevos no la toca, aunque reescriba las celdas del solape.
+"""
+import argparse
+import asyncio
+import sys
+
+from bdns_portal.cache.redis_cache import redis_cache
+from bdns_portal.core.database import get_sessionmaker
+from .refresh import refresh_rollups, refresh_rollups_incremental
+
+
+async def _publicar_version() -> None:
+    try:
+        await redis_cache.init()
+        version = await redis_cache.incrementar_version_datos()
+        print(f"Version de datos: {version}")
+    except Exception as e:
+        # Sin Redis la API no tiene cache que invalidar mas alla de la L1
+        print(f"No se pudo incrementar la version de datos: {e}", file=sys.stderr)
+    finally:
+        if redis_cache.client:
+            await redis_cache.client.close()
+
+
+async def _run(completo: bool) -> None:
+    async with get_sessionmaker()() as db:
+        if completo:
+            filas = await refresh_rollups(db)
+        else:
+            filas = await refresh_rollups_incremental(db)
+    if not filas:
+        print("Rollups al dia, nada que refrescar")
+        return
+    for tabla, n in filas.items():
+        print(f"{tabla}: {n} filas")
+    await _publicar_version()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Refresca los rollups de estadisticas")
+    parser.add_argument(
+        "--completo",
+        action="store_true",
+        help="Reconstruye todo el historico en lugar de usar la marca de agua"
+    )
+    args = parser.parse_args()
+    asyncio.run(_run(args.completo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# bdns_portal/rollup/refresh.py
+"""
+Reconstruccion de las tablas de rollup.
+
+Se ejecuta tras cada carga de bdns_etl:
+
+    python -m bdns_portal.rollup              # incremental
+    python -m bdns_portal.rollup --completo   # reconstruccion completa
+
+El refresco incremental compara created_at / updated_at de bdns.concesion
+con la marca de agua del ultimo refresco (bdns.rollup_refresco) y solo
+recalcula los meses, anios y beneficiarios afectados. Cada pasada vuelve
+a mirar ROLLUP_SOLAPE_SEGUNDOS antes de la marca de agua: created_at /
+updated_at se fijan al empezar la transaccion de la carga, asi que una
+transaccion larga que confirma despues del refresco deja filas con marcas
+anteriores a la suya. Las concesiones
+borradas o cuya fecha_concesion cambia de mes no dejan rastro en esas
+columnas: para recogerlas hay que lanzar de vez en cuando --completo.
+
+Por ese solape cada pasada reescribe al menos las celdas de la ultima
+carga. Solo cuentan como refrescadas las tablas cuyas celdas reescritas
+han cambiado de verdad (huella antes y despues), para no invalidar la
+cache de la API en cada ejecucion del cron sin datos nuevos.
+"""
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, func, extract, insert, delete, distinct, tuple_, and_, or_, cast, literal_column, Date, Text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bdns_core.db.models import Concesion as ConcesionModel
+from bdns_core.db.models import Beneficiario as BeneficiarioModel
+from bdns_core.db.models import Convocatoria as ConvocatoriaModel
+from bdns_core.db.models import FormaJuridica as FormaJuridicaModel
+from bdns_core.db.models import RegimenAyuda as RegimenAyudaModel
+from bdns_core.logging import get_logger
+
+from ..core.config import get_settings
+from .tables import (
+    rollup_concesion_mensual, rollup_beneficiarios_hll, rollup_actividad_beneficiario,
+    rollup_refresco, HLL_LOG2M, HLL_REGWIDTH, hll_disponible
+)
+
+logger = get_logger(__name__)
+
+
+def importe_concesion():
+    """Importe de una concesión: equivalente + nominal (nulos como 0)."""
+    return (
+        func.coalesce(ConcesionModel.importe_equivalente, 0) +
+        func.coalesce(ConcesionModel.importe_nominal, 0)
+    )
+
+
+def select_mensual():
+    """SELECT que produce las filas de rollup_concesion_mensual."""
+    anio_col = extract('year', ConcesionModel.fecha_concesion)
+    mes_col = extract('month', ConcesionModel.fecha_concesion)
+
+    return (
+        select(
+            anio_col.label("anio"),
+            mes_col.label("mes"),
+            ConvocatoriaModel.organo_id.label("organo_id"),
+            FormaJuridicaModel.tipo.label("tipo_entidad"),
+            ConcesionModel.region_id.label("region_id"),
+            RegimenAyudaModel.descripcion_norm.label("regimen"),
+            func.count().label("numero_concesiones"),
+            func.sum(importe_concesion()).label("importe_total")
+        )
+        .select_from(ConcesionModel)
+        .join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
+        .outerjoin(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
+        .outerjoin(FormaJuridicaModel, BeneficiarioModel.forma_juridica_id == FormaJuridicaModel.id)
+        .outerjoin(RegimenAyudaModel, ConcesionModel.regimen_ayuda_id == RegimenAyudaModel.id)
+        .group_by(
+            anio_col,
+            mes_col,
+            ConvocatoriaModel.organo_id,
+            FormaJuridicaModel.tipo,
+            ConcesionModel.region_id,
+            RegimenAyudaModel.descripcion_norm
+        )
+    )
+
+
+def select_beneficiarios_hll():
+    """SELECT que produce los sketches de rollup_beneficiarios_hll."""
+    anio_col = extract('year', ConcesionModel.fecha_concesion)
+
+    return (
+        select(
+            anio_col.label("anio"),
+            ConcesionModel.region_id.label("region_id"),
+            ConvocatoriaModel.organo_id.label("organo_id"),
+            func.hll_add_agg(
+                func.hll_hash_bytea(func.uuid_send(ConcesionModel.beneficiario_id)),
+                HLL_LOG2M,
+                HLL_REGWIDTH
+            ).label("beneficiarios")
+        )
+        .select_from(ConcesionModel)
+        .join(ConvocatoriaModel, ConcesionModel.convocatoria_id == ConvocatoriaModel.id)
+        .group_by(anio_col, ConcesionModel.region_id, ConvocatoriaModel.organo_id)
+    )
+
+
+def select_actividad_beneficiario():
+    """SELECT que produce las filas de rollup_actividad_beneficiario."""
+    anio_col = extract('year', ConcesionModel.fecha_concesion)
+
+    return (
+        select(
+            ConcesionModel.beneficiario_id.label("beneficiario_id"),
+            anio_col.label("anio"),
+            FormaJuridicaModel.tipo.label("tipo_entidad"),
+            func.count().label("numero_concesiones"),
+            func.sum(importe_concesion()).label("importe_total"),
+            func.min(ConcesionModel.fecha_concesion).label("primera_concesion"),
+            func.max(ConcesionModel.fecha_concesion).label("ultima_concesion")
+        )
+        .select_from(ConcesionModel)
+        .join(BeneficiarioModel, ConcesionModel.beneficiario_id == BeneficiarioModel.id)
+        .outerjoin(FormaJuridicaModel, BeneficiarioModel.forma_juridica_id == FormaJuridicaModel.id)
+        .group_by(ConcesionModel.beneficiario_id, anio_col, FormaJuridicaModel.tipo)
+    )
+
+
+async def _huella(db: AsyncSession, tabla, filtro=None) -> tuple:
+    """(filas, suma de hashes de cada fila) de tabla, o de las que cumplen filtro.
+
+    No depende del orden de las filas y cambia con cualquier valor.
+    """
+    fila = cast(literal_column(tabla.name), Text)
+    stmt = select(func.count(), func.sum(func.hashtextextended(fila, 0))).select_from(tabla)
+    if filtro is not None:
+        stmt = stmt.where(filtro)
+    return tuple((await db.execute(stmt)).one())
+
+
+async def _reemplazar(db: AsyncSession, tabla, origen, borrar=None) -> Optional[int]:
+    """Borra las filas de tabla (todas o las que cumplen borrar) e inserta origen.
+
+    Devuelve las filas insertadas, o None si las celdas reemplazadas
+    quedan exactamente como estaban.
+    """
+    antes = await _huella(db, tabla, borrar)
+    stmt = delete(tabla)
+    if borrar is not None:
+        stmt = stmt.where(borrar)
+    await db.execute(stmt)
+    result = await db.execute(
+        insert(tabla).from_select([c.name for c in tabla.columns], origen)
+    )
+    if await _huella(db, tabla, borrar) == antes:
+        return None
+    return result.rowcount
+
+
+async def _reemplazar_en(filas: dict, db: AsyncSession, tabla, origen, borrar=None) -> None:
+    """_reemplazar anotando en filas solo las tablas que han cambiado."""
+    escritas = await _reemplazar(db, tabla, origen, borrar)
+    if escritas is not None:
+        filas[tabla.name] = escritas
+
+
+async def _marca_agua_actual(db: AsyncSession) -> Optional[datetime]:
+    """Mayor created_at / updated_at de bdns.concesion (max por indice)."""
+    result = await db.execute(
+        select(func.greatest(
+            select(func.max(ConcesionModel.created_at)).scalar_subquery(),
+            select(func.max(ConcesionModel.updated_at)).scalar_subquery()
+        ))
+    )
+    return result.scalar()
+
+
+async def _ultima_marca_agua(db: AsyncSession) -> Optional[datetime]:
+    result = await db.execute(
+        select(rollup_refresco.c.marca_agua)
+        .order_by(rollup_refresco.c.id.desc())
+        .limit(1)
+    )
+    return result.scalar()
+
+
+async def _registrar(
+    db: AsyncSession,
+    tipo: str,
+    marca_agua: Optional[datetime],
+    inicio: float,
+    filas: dict,
+    concesiones: Optional[int] = None
+) -> None:
+    duracion = time.monotonic() - inicio
+    await db.execute(
+        insert(rollup_refresco).values(
+            tipo=tipo,
+            marca_agua=marca_agua,
+            duracion_s=duracion,
+            concesiones=concesiones,
+            filas=filas
+        )
+    )
+    await db.commit()
+
+    logger.info(
+        "Rollups refrescados",
+        extra={
+            "tipo": tipo,
+            "filas": filas,
+            "concesiones": concesiones,
+            "marca_agua": str(marca_agua),
+            "duracion_s": round(duracion, 2)
+        }
+    )
+
+
+async def refresh_rollups(db: AsyncSession) -> dict:
+    """Reconstruye todas las tablas de rollup en una transaccion.
+
+    Devuelve el numero de filas escritas por tabla, solo de las tablas
+    cuyo contenido ha cambiado ({} si ya estaban al dia).
+    """
+    inicio = time.monotonic()
+    marca_agua = await _marca_agua_actual(db)
+
+    tablas = [(rollup_concesion_mensual, select_mensual())]
+    if await hll_disponible(db):
+        tablas.append((rollup_beneficiarios_hll, select_beneficiarios_hll()))
+    tablas.append((rollup_actividad_beneficiario, select_actividad_beneficiario()))
+
+    filas = {}
+    for tabla, origen in tablas:
+        await _reemplazar_en(filas, db, tabla, origen)
+
+    await _registrar(db, "completo", marca_agua, inicio, filas)
+    return filas
+
+
+def _siguiente_mes(inicio: date) -> date:
+    return date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+
+
+def _rangos_fecha(inicios: List[date], siguiente) -> list:
+    """Une periodos consecutivos en intervalos [desde, hasta) podables."""
+    rangos = []
+    for inicio in sorted(inicios):
+        fin = siguiente(inicio)
+        if rangos and rangos[-1][1] == inicio:
+            rangos[-1][1] = fin
+        else:
+            rangos.append([inicio, fin])
+    fecha = ConcesionModel.fecha_concesion
+    return or_(*[and_(fecha >= desde, fecha < hasta) for desde, hasta in rangos])
+
+
+async def refresh_rollups_incremental(db: AsyncSession) -> dict:
+    """Recalcula solo las celdas afectadas desde la ultima marca de agua.
+
+    - rollup_concesion_mensual: los (anio, mes) con concesiones nuevas o
+      modificadas, con todas sus dimensiones.
+    - rollup_beneficiarios_hll: los anios afectados (los sketches no
+      admiten restar, se rehacen por anio), si existe la tabla.
+    - rollup_actividad_beneficiario: los beneficiarios afectados en esos
+      anios.
+
+    Sin marca de agua previa hace la reconstruccion completa. Como
+    refresh_rollups, devuelve solo las tablas que han cambiado.
+    """
+    inicio = time.monotonic()
+
+    desde = await _ultima_marca_agua(db)
+    if desde is None:
+        logger.info("Sin marca de agua previa, reconstruccion completa de rollups")
+        return await refresh_rollups(db)
+
+    # Aunque la marca no avance puede haber filas confirmadas tarde
+    hasta = max(await _marca_agua_actual(db) or desde, desde)
+    solape = desde - timedelta(seconds=get_settings().ROLLUP_SOLAPE_SEGUNDOS)
+
+    modificadas = or_(
+        and_(ConcesionModel.created_at > solape, ConcesionModel.created_at <= hasta),
+        and_(ConcesionModel.updated_at > solape, ConcesionModel.updated_at <= hasta)
+    )
+
+    # date_trunc sobre date devuelve timestamptz en la zona de la sesion:
+    # se vuelve a date en la misma zona, sin pasar por UTC
+    mes_col = cast(func.date_trunc('month', ConcesionModel.fecha_concesion), Date)
+    result = await db.execute(
+        select(mes_col.label("mes"), func.count().label("concesiones"))
+        .where(modificadas)
+        .group_by(mes_col)
+    )
+    afectados = result.all()
+    meses = [row.mes for row in afectados]
+    anios = sorted({mes.year for mes in meses})
+    concesiones = sum(row.concesiones for row in afectados)
+
+    filas = {}
+    if meses:
+        mensual = rollup_concesion_mensual.c
+        await _reemplazar_en(
+            filas,
+            db,
+            rollup_concesion_mensual,
+            select_mensual().where(_rangos_fecha(meses, _siguiente_mes)),
+            borrar=tuple_(mensual.anio, mensual.mes).in_([(m.year, m.month) for m in meses])
+        )
+
+        rango_anios = _rangos_fecha([date(anio, 1, 1) for anio in anios], lambda d: date(d.year + 1, 1, 1))
+        if await hll_disponible(db):
+            await _reemplazar_en(
+                filas,
+                db,
+                rollup_beneficiarios_hll,
+                select_beneficiarios_hll().where(rango_anios),
+                borrar=rollup_beneficiarios_hll.c.anio.in_(anios)
+            )
+
+        beneficiarios = select(distinct(ConcesionModel.beneficiario_id)).where(modificadas)
+        actividad = rollup_actividad_beneficiario.c
+        await _reemplazar_en(
+            filas,
+            db,
+            rollup_actividad_beneficiario,
+            select_actividad_beneficiario()
+            .where(rango_anios)
+            .where(ConcesionModel.beneficiario_id.in_(beneficiarios)),
+            borrar=and_(actividad.anio.in_(anios), actividad.beneficiario_id.in_(beneficiarios))
+        )
+
+    await _registrar(db, "incremental", hasta, inicio, filas, concesiones=concesiones)
+    return filas
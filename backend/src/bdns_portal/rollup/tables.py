@@ -0,0 +1,108 @@
+# bdns_portal/rollup/tables.py
+"""
+Tablas de rollup de concesiones.
+
+Agregados precalculados a partir de bdns.concesion para que los resolvers
+de estadisticas no tengan que recorrer la tabla particionada completa.
+Las tablas se crean en la migracion 004_rollup y se rellenan con
+bdns_portal.rollup.refresh.
+"""
+import math
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import UserDefinedType
+
+metadata = sa.MetaData(schema="bdns")
+
+
+# Grano (anio, mes, organo, forma_juridica.tipo, region, regimen)
+rollup_concesion_mensual = sa.Table(
+    "rollup_concesion_mensual",
+    metadata,
+    sa.Column("anio", sa.SmallInteger(), nullable=False),
+    sa.Column("mes", sa.SmallInteger(), nullable=False),
+    sa.Column("organo_id", sa.Uuid(), nullable=True),
+    sa.Column("tipo_entidad", sa.String(), nullable=True),
+    sa.Column("region_id", sa.Uuid(), nullable=True),
+    sa.Column("regimen", sa.String(), nullable=True),
+    sa.Column("numero_concesiones", sa.BigInteger(), nullable=False),
+    sa.Column("importe_total", sa.Numeric(), nullable=False),
+)
+
+
+class HLL(UserDefinedType):
+    """Tipo hll de la extension postgresql-hll."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "hll"
+
+
+# Parametros de los sketches: 2^14 registros de 5 bits (~10 KB por celda).
+# Error estandar relativo de la cardinalidad: 1.04 / sqrt(2^14) ~ 0.81%
+HLL_LOG2M = 14
+HLL_REGWIDTH = 5
+HLL_ERROR_RELATIVO = 1.04 / math.sqrt(2 ** HLL_LOG2M)
+
+
+# Sketch HyperLogLog de beneficiarios distintos por (anio, region, organo).
+# Los sketches se combinan con hll_union_agg para cualquier combinacion
+# de filtros sobre esas dimensiones.
+rollup_beneficiarios_hll = sa.Table(
+    "rollup_beneficiarios_hll",
+    metadata,
+    sa.Column("anio", sa.SmallInteger(), nullable=False),
+    sa.Column("region_id", sa.Uuid(), nullable=True),
+    sa.Column("organo_id", sa.Uuid(), nullable=True),
+    sa.Column("beneficiarios", HLL(), nullable=False),
+)
+
+# La migracion 005 solo crea rollup_beneficiarios_hll si el servidor tiene
+# la extension hll; sin ella los beneficiarios se cuentan siempre exactos
+_hll_disponible: Optional[bool] = None
+
+
+async def hll_disponible(db: AsyncSession) -> bool:
+    """Si existe rollup_beneficiarios_hll (se comprueba una vez por proceso)."""
+    global _hll_disponible
+    if _hll_disponible is None:
+        _hll_disponible = await db.scalar(
+            sa.select(sa.func.to_regclass("bdns.rollup_beneficiarios_hll").isnot(None))
+        )
+    return _hll_disponible
+
+
+# Actividad de cada beneficiario por año (grano beneficiario, anio).
+# Sirve recurrentes, concentracion e historial por beneficiario con
+# recorridos de indice en lugar de agregar bdns.concesion completa.
+# tipo_entidad se desnormaliza para filtrar sin JOIN.
+rollup_actividad_beneficiario = sa.Table(
+    "rollup_actividad_beneficiario",
+    metadata,
+    sa.Column("beneficiario_id", sa.Uuid(), primary_key=True),
+    sa.Column("anio", sa.SmallInteger(), primary_key=True),
+    sa.Column("tipo_entidad", sa.String(), nullable=True),
+    sa.Column("numero_concesiones", sa.BigInteger(), nullable=False),
+    sa.Column("importe_total", sa.Numeric(), nullable=False),
+    sa.Column("primera_concesion", sa.Date(), nullable=False),
+    sa.Column("ultima_concesion", sa.Date(), nullable=False),
+)
+
+
+# Historial de refrescos. marca_agua es el mayor created_at / updated_at
+# de bdns.concesion ya incorporado a los rollups: el siguiente refresco
+# incremental solo recalcula las celdas de concesiones posteriores.
+rollup_refresco = sa.Table(
+    "rollup_refresco",
+    metadata,
+    sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+    sa.Column("tipo", sa.String(), nullable=False),
+    sa.Column("marca_agua", sa.DateTime(), nullable=True),
+    sa.Column("ejecutado_en", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column("duracion_s", sa.Float(), nullable=False),
+    sa.Column("concesiones", sa.BigInteger(), nullable=True),
+    sa.Column("filas", postgresql.JSONB(), nullable=False),
+)
@@ -0,0 +1,4 @@
+# bdns_portal/sintetico/__init__.py
+from .generador import ParametrosGeneracion, generar
+
+__all__ = ["ParametrosGeneracion", "generar"]
@@ -0,0 +1,67 @@
+# bdns_portal/sintetico/__main__.py
+"""
+Genera un dataset BDNS sintetico en la base de datos local.
+
+Uso:
+    python -m bdns_portal.sintetico --concesiones 10000000 --beneficiarios 1000000
+    python -m bdns_portal.sintetico --concesiones 100000 --truncar
+
+Despues conviene reconstruir los rollups:
+    python -m bdns_portal.rollup --completo
+"""
+import argparse
+import asyncio
+
+from bdns_portal.core.database import get_engine
+from .generador import ParametrosGeneracion, generar
+
+
+async def _run(parametros: ParametrosGeneracion, truncar: bool) -> None:
+    async with get_engine().connect() as conn:
+        filas = await generar(conn, parametros, truncar=truncar)
+    for tabla, n in filas.items():
+        print(f"{tabla}: {n} filas")
+
+
+def main() -> None:
+    defecto = ParametrosGeneracion()
+    parser = argparse.ArgumentParser(description="Genera un dataset BDNS sintetico reproducible")
+    parser.add_argument("--concesiones", type=int, default=defecto.concesiones)
+    parser.add_argument("--beneficiarios", type=int, default=defecto.beneficiarios)
+    parser.add_argument("--convocatorias", type=int, default=defecto.convocatorias)
+    parser.add_argument("--organos", type=int, default=defecto.organos)
+    parser.add_argument("--anio-desde", type=int, default=defecto.anio_desde)
+    parser.add_argument("--anio-hasta", type=int, default=defecto.anio_hasta)
+    parser.add_argument("--semilla", type=int, default=defecto.semilla)
+    parser.add_argument(
+        "--sesgo",
+        type=float,
+        default=defecto.sesgo,
+        help="Exponente de la cola pesada de beneficiarios y convocatorias (1 = uniforme)"
+    )
+    parser.add_argument("--fraccion-publica", type=float, default=defecto.fraccion_publica)
+    parser.add_argument("--lote", type=int, default=defecto.lote, help="Concesiones por transaccion")
+    parser.add_argument(
+        "--truncar",
+        action="store_true",
+        help="Vacia las tablas antes de generar"
+    )
+    args = parser.parse_args()
+
+    parametros = ParametrosGeneracion(
+        concesiones=args.concesiones,
+        beneficiarios=args.beneficiarios,
+        convocatorias=args.convocatorias,
+        organos=args.organos,
+        anio_desde=args.anio_desde,
+        anio_hasta=args.anio_hasta,
+        semilla=args.semilla,
+        sesgo=args.sesgo,
+        fraccion_publica=args.fraccion_publica,
+        lote=args.lote
+    )
+    asyncio.run(_run(parametros, args.truncar))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# bdns_portal/sintetico/generador.py
+"""
+Generador de un dataset BDNS sintetico para pruebas de rendimiento.
+
+Rellena las tablas de 001_initial_schema (catalogos, organo, convocatoria,
+beneficiario y concesion particionada) a la escala pedida. Todo se genera
+en PostgreSQL con generate_series: cada valor aleatorio sale de
+md5(semilla, clave, fila), asi que el resultado es identico para la misma
+semilla con independencia del tamaño de lote o del paralelismo.
+
+Forma de los datos:
+- Beneficiarios y convocatorias con cola pesada: el indice se elige como
+  n * u^sesgo, y los primeros indices de beneficiario son entidades
+  publicas (ayuntamientos, universidades...), que acaparan concesiones.
+- fecha_concesion estacional (pico en diciembre) y creciente por año.
+- Mezcla de regimen_tipo repartida en subparticiones LIST de cada año.
+- Importes log-normales.
+
+Las columnas que no estan en 001 pero que usa el portal (region_id,
+forma_juridica.tipo, convocatoria.codigo_bdns...) se rellenan solo si
+existen en la base de datos.
+"""
+import time
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Dict, List, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from bdns_core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# (regimen_tipo, descripcion, peso)
+REGIMENES = [
+    ("minimis", "Ayuda de minimis", 35),
+    ("ayuda_estado", "Ayuda de Estado", 20),
+    ("ordinaria", "Subvención ordinaria", 44),
+    ("partidos_politicos", "Subvención a partidos políticos", 1),
+]
+
+# (descripcion, tipo). La primera es la de los beneficiarios publicos.
+FORMAS_JURIDICAS = [
+    ("Entidad pública", "publica"),
+    ("Sociedad limitada", "empresa"),
+    ("Sociedad anónima", "empresa"),
+    ("Persona física", "persona_fisica"),
+    ("Asociación", "sin_animo_lucro"),
+    ("Fundación", "sin_animo_lucro"),
+    ("Cooperativa", "empresa"),
+]
+
+REGIONES = [
+    "Andalucía", "Aragón", "Asturias", "Illes Balears", "Canarias", "Cantabria",
+    "Castilla y León", "Castilla-La Mancha", "Cataluña", "Comunitat Valenciana",
+    "Extremadura", "Galicia", "Comunidad de Madrid", "Región de Murcia",
+    "Navarra", "País Vasco", "La Rioja", "Ceuta", "Melilla",
+]
+
+TIPOS_ORGANO = [("ESTATAL", 20), ("AUTONOMICA", 35), ("LOCAL", 40), ("OTROS", 5)]
+
+# Peso relativo de cada mes en fecha_concesion (cierre de ejercicio en diciembre)
+PESOS_MES = [5, 6, 7, 7, 8, 8, 7, 4, 7, 9, 12, 20]
+
+TABLAS = [
+    "concesion", "beneficiario", "convocatoria", "organo",
+    "forma_juridica", "regimen_ayuda", "region",
+]
+
+
+@dataclass
+class ParametrosGeneracion:
+    concesiones: int = 10_000_000
+    beneficiarios: int = 1_000_000
+    convocatorias: int = 50_000
+    organos: int = 2_000
+    anio_desde: int = 2016
+    anio_hasta: int = 2025
+    semilla: int = 42
+    # Exponente de la cola pesada (1 = uniforme)
+    sesgo: float = 3.0
+    # Fraccion de beneficiarios que son entidades publicas
+    fraccion_publica: float = 0.02
+    lote: int = 500_000
+
+
+def _umbrales(pesos: List[float]) -> str:
+    """Limites acumulados para width_bucket: devuelve un indice 0..n-1."""
+    total = sum(pesos)
+    acumulados = list(accumulate(pesos))[:-1]
+    return "ARRAY[" + ",".join(f"{a / total:.6f}" for a in acumulados) + "]::float8[]"
+
+
+def _valores(lista: List[str]) -> str:
+    return "ARRAY[" + ",".join("'" + v.replace("'", "''") + "'" for v in lista) + "]"
+
+
+async def _columnas(conn: AsyncConnection) -> Dict[str, Set[str]]:
+    result = await conn.execute(text(
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = 'bdns' AND table_name = ANY(:tablas)"
+    ), {"tablas": TABLAS})
+    columnas: Dict[str, Set[str]] = {}
+    for tabla, columna in result.all():
+        columnas.setdefault(tabla, set()).add(columna)
+    return columnas
+
+
+async def _funciones(conn: AsyncConnection) -> None:
+    """Funciones deterministas de la sesion: uniforme [0, 1) y uuid."""
+    await conn.execute(text("""
+        CREATE OR REPLACE FUNCTION pg_temp.azar(semilla int, clave text, i bigint)
+        RETURNS double precision LANGUAGE sql IMMUTABLE AS $$
+            SELECT ('x' || substr(md5(semilla || ':' || clave || ':' || i), 1, 12))::bit(48)::bigint
+                   / 281474976710656.0
+        $$
+    """))
+    await conn.execute(text("""
+        CREATE OR REPLACE FUNCTION pg_temp.uuid_det(semilla int, clave text, i bigint)
+        RETURNS uuid LANGUAGE sql IMMUTABLE AS $$
+            SELECT md5(semilla || ':' || clave || ':' || i)::uuid
+        $$
+    """))
+
+
+def _insert(tabla: str, columnas: Dict[str, str], existentes: Set[str], origen: str) -> str:
+    """INSERT ... SELECT con solo las columnas que existen en la tabla."""
+    usadas = {c: expr for c, expr in columnas.items() if c in existentes}
+    return (
+        f"INSERT INTO bdns.{tabla} ({', '.join(usadas)}) "
+        f"SELECT {', '.join(usadas.values())} {origen} ON CONFLICT DO NOTHING"
+    )
+
+
+async def _particiones(conn: AsyncConnection, p: ParametrosGeneracion) -> None:
+    """Particion RANGE por año subparticionada LIST por regimen_tipo."""
+    for anio in range(p.anio_desde, p.anio_hasta + 1):
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS bdns.concesion_{anio} PARTITION OF bdns.concesion "
+            f"FOR VALUES FROM ('{anio}-01-01') TO ('{anio + 1}-01-01') "
+            f"PARTITION BY LIST (regimen_tipo)"
+        ))
+        for tipo, _, _ in REGIMENES:
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS bdns.concesion_{anio}_{tipo} "
+                f"PARTITION OF bdns.concesion_{anio} FOR VALUES IN ('{tipo}')"
+            ))
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS bdns.concesion_{anio}_otros "
+            f"PARTITION OF bdns.concesion_{anio} DEFAULT"
+        ))
+
+
+async def _catalogos(conn: AsyncConnection, p: ParametrosGeneracion, columnas: Dict[str, Set[str]]) -> None:
+    s = p.semilla
+
+    await conn.execute(text(_insert("forma_juridica", {
+        "id": f"pg_temp.uuid_det({s}, 'forma', k)",
+        "api_id": "k",
+        "descripcion": f"({_valores([f[0] for f in FORMAS_JURIDICAS])})[k]",
+        "descripcion_norm": f"lower(({_valores([f[0] for f in FORMAS_JURIDICAS])})[k])",
+        "tipo": f"({_valores([f[1] for f in FORMAS_JURIDICAS])})[k]",
+    }, columnas.get("forma_juridica", set()), f"FROM generate_series(1, {len(FORMAS_JURIDICAS)}) AS k")))
+
+    await conn.execute(text(_insert("regimen_ayuda", {
+        "id": f"pg_temp.uuid_det({s}, 'regimen', k)",
+        "api_id": "k",
+        "descripcion": f"({_valores([r[1] for r in REGIMENES])})[k]",
+        "descripcion_norm": f"({_valores([r[0] for r in REGIMENES])})[k]",
+    }, columnas.get("regimen_ayuda", set()), f"FROM generate_series(1, {len(REGIMENES)}) AS k")))
+
+    if "region" in columnas:
+        await conn.execute(text(_insert("region", {
+            "id": f"pg_temp.uuid_det({s}, 'region', k)",
+            "api_id": "k",
+            "descripcion": f"({_valores(REGIONES)})[k]",
+            "descripcion_norm": f"lower(({_valores(REGIONES)})[k])",
+        }, columnas["region"], f"FROM generate_series(1, {len(REGIONES)}) AS k")))
+
+    await conn.execute(text(_insert("organo", {
+        "id": f"pg_temp.uuid_det({s}, 'organo', k)",
+        "codigo": "'SIN-' || k",
+        "nombre": "'Órgano sintético ' || k",
+        "tipo": (
+            f"({_valores([t[0] for t in TIPOS_ORGANO])})"
+            f"[1 + width_bucket(pg_temp.azar({s}, 'organo_tipo', k), {_umbrales([t[1] for t in TIPOS_ORGANO])})]"
+        ),
+        "nivel1": "'Nivel ' || (k % 20)",
+    }, columnas.get("organo", set()), f"FROM generate_series(1, {p.organos}) AS k")))
+
+
+async def _convocatorias(conn: AsyncConnection, p: ParametrosGeneracion, columnas: Dict[str, Set[str]]) -> None:
+    s = p.semilla
+    anios = p.anio_hasta - p.anio_desde + 1
+    importe = f"round((exp(11 + 1.5 * sqrt(-2 * ln(1 - pg_temp.azar({s}, 'conv_imp1', k))) * cos(2 * pi() * pg_temp.azar({s}, 'conv_imp2', k))))::numeric, 2)"
+    fecha = (
+        f"make_date({p.anio_desde} + floor(pg_temp.azar({s}, 'conv_anio', k) * {anios})::int, 1, 1)"
+        f" + floor(pg_temp.azar({s}, 'conv_dia', k) * 365)::int"
+    )
+
+    await conn.execute(text(_insert("convocatoria", {
+        "id": f"pg_temp.uuid_det({s}, 'conv', k)",
+        "id_bdns": "'SIN' || k",
+        "codigo_bdns": "'SIN' || k",
+        "titulo": "'Convocatoria sintética ' || k",
+        "fecha_publicacion": fecha,
+        "fecha_recepcion": fecha,
+        # Pocos organos concentran la mayoria de convocatorias
+        "organo_id": f"pg_temp.uuid_det({s}, 'organo', 1 + floor({p.organos} * power(pg_temp.azar({s}, 'conv_organo', k), {p.sesgo}))::bigint)",
+        "regimen_ayuda_id": f"pg_temp.uuid_det({s}, 'regimen', 1 + width_bucket(pg_temp.azar({s}, 'conv_regimen', k), {_umbrales([r[2] for r in REGIMENES])}))",
+        "importe_total": importe,
+        "presupuesto_total": importe,
+    }, columnas.get("convocatoria", set()), f"FROM generate_series(1, {p.convocatorias}) AS k")))
+
+
+async def _beneficiarios(conn: AsyncConnection, p: ParametrosGeneracion, columnas: Dict[str, Set[str]]) -> None:
+    s = p.semilla
+    publicos = max(1, int(p.beneficiarios * p.fraccion_publica))
+    # Formas no publicas: indices 2..n de FORMAS_JURIDICAS
+    forma_privada = f"2 + floor(pg_temp.azar({s}, 'ben_forma', k) * {len(FORMAS_JURIDICAS) - 1})::int"
+
+    await conn.execute(text(_insert("beneficiario", {
+        "id": f"pg_temp.uuid_det({s}, 'ben', k)",
+        "nif": "'S' || lpad(k::text, 9, '0')",
+        "nombre": f"CASE WHEN k <= {publicos} THEN 'Entidad pública ' || k ELSE 'Beneficiario ' || k END",
+        "tipo_nif": f"CASE WHEN k <= {publicos} THEN 'P' ELSE 'B' END",
+        "provincia": f"({_valores(REGIONES)})[1 + k % {len(REGIONES)}]",
+        "forma_juridica_id": f"pg_temp.uuid_det({s}, 'forma', CASE WHEN k <= {publicos} THEN 1 ELSE {forma_privada} END)",
+    }, columnas.get("beneficiario", set()), f"FROM generate_series(1, {p.beneficiarios}) AS k")))
+
+
+def _concesiones_sql(p: ParametrosGeneracion, columnas: Set[str], desde: int, hasta: int) -> str:
+    s = p.semilla
+    anios = p.anio_hasta - p.anio_desde + 1
+    # Crecimiento del numero de concesiones por año
+    umbrales_anio = _umbrales([1 + 0.08 * i for i in range(anios)])
+
+    # Una sola pasada: las variables aleatorias de la fila en un LATERAL
+    origen = f"""
+        FROM generate_series({desde}, {hasta}) AS i,
+        LATERAL (SELECT
+            1 + floor({p.beneficiarios} * power(pg_temp.azar({s}, 'c_ben', i), {p.sesgo}))::bigint AS ben,
+            1 + floor({p.convocatorias} * power(pg_temp.azar({s}, 'c_conv', i), {p.sesgo}))::bigint AS conv,
+            1 + width_bucket(pg_temp.azar({s}, 'c_regimen', i), {_umbrales([r[2] for r in REGIMENES])}) AS regimen,
+            make_date(
+                {p.anio_desde} + width_bucket(pg_temp.azar({s}, 'c_anio', i), {umbrales_anio}),
+                1 + width_bucket(pg_temp.azar({s}, 'c_mes', i), {_umbrales(PESOS_MES)}),
+                1 + floor(pg_temp.azar({s}, 'c_dia', i) * 28)::int
+            ) AS fecha,
+            exp(8 + 1.6 * sqrt(-2 * ln(1 - pg_temp.azar({s}, 'c_imp1', i)))
+                * cos(2 * pi() * pg_temp.azar({s}, 'c_imp2', i))) AS importe,
+            pg_temp.azar({s}, 'c_equiv', i) AS equiv
+        ) AS v
+    """
+    regimen_tipo = f"({_valores([r[0] for r in REGIMENES])})[v.regimen]"
+    return _insert("concesion", {
+        "id": f"pg_temp.uuid_det({s}, 'concesion', i)",
+        "fecha_concesion": "v.fecha",
+        "regimen_tipo": regimen_tipo,
+        "id_concesion": "'SIN' || i",
+        "beneficiario_id": f"pg_temp.uuid_det({s}, 'ben', v.ben)",
+        "convocatoria_id": f"pg_temp.uuid_det({s}, 'conv', v.conv)",
+        "regimen_ayuda_id": f"pg_temp.uuid_det({s}, 'regimen', v.regimen)",
+        "region_id": f"pg_temp.uuid_det({s}, 'region', 1 + v.ben % {len(REGIONES)})",
+        "importe_nominal": "round(v.importe::numeric, 2)",
+        # Equivalente de subvencion bruta solo en regimenes de ayuda de Estado
+        "importe_equivalente": (
+            f"CASE WHEN {regimen_tipo} IN ('minimis', 'ayuda_estado') "
+            f"THEN round((v.importe * (0.1 + 0.9 * v.equiv))::numeric, 2) END"
+        ),
+        "created_at": "v.fecha + interval '30 days'",
+    }, columnas, origen)
+
+
+async def generar(conn: AsyncConnection, p: ParametrosGeneracion, truncar: bool = False) -> dict:
+    """Genera el dataset. Devuelve el numero de filas por tabla."""
+    inicio = time.monotonic()
+    columnas = await _columnas(conn)
+
+    await conn.execute(text("SET synchronous_commit = off"))
+    await _funciones(conn)
+
+    if truncar:
+        existentes = [t for t in TABLAS if t in columnas]
+        await conn.execute(text(
+            "TRUNCATE " + ", ".join(f"bdns.{t}" for t in existentes) + " CASCADE"
+        ))
+
+    await _particiones(conn, p)
+    await _catalogos(conn, p, columnas)
+    await _convocatorias(conn, p, columnas)
+    await _beneficiarios(conn, p, columnas)
+    await conn.commit()
+    logger.info("Catalogos, convocatorias y beneficiarios generados", extra={"duracion_s": round(time.monotonic() - inicio, 2)})
+
+    for desde in range(1, p.concesiones + 1, p.lote):
+        hasta = min(desde + p.lote - 1, p.concesiones)
+        await conn.execute(text(_concesiones_sql(p, columnas["concesion"], desde, hasta)))
+        await conn.commit()
+        logger.info(
+            "Concesiones generadas",
+            extra={"hasta": hasta, "total": p.concesiones, "duracion_s": round(time.monotonic() - inicio, 2)}
+        )
+
+    filas = {}
+    for tabla in TABLAS:
+        if tabla in columnas:
+            await conn.execute(text(f"ANALYZE bdns.{tabla}"))
+            result = await conn.execute(text(f"SELECT count(*) FROM bdns.{tabla}"))
+            filas[tabla] = result.scalar()
+    await conn.commit()
+
+    logger.info("Dataset sintetico generado", extra={"filas": filas, "duracion_s": round(time.monotonic() - inicio, 2)})
+    return filas
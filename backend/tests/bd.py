@@ -0,0 +1,69 @@
+"""
+Acceso a PostgreSQL desde las pruebas.
+
+Las pruebas marcadas con requiere_bd usan BDNS_TEST_DATABASE_URL, una base
+de datos solo de pruebas con `alembic upgrade head` aplicado, y se omiten
+si no está definida.
+"""
+import json
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import text
+
+from bdns_portal.core.database import _async_url
+
+URL_PRUEBAS = os.environ.get("BDNS_TEST_DATABASE_URL")
+
+requiere_bd = pytest.mark.skipif(not URL_PRUEBAS, reason="BDNS_TEST_DATABASE_URL no definida")
+
+
+@asynccontextmanager
+async def conexion():
+    """Conexión sin pool: cada prueba corre en su propio bucle de eventos."""
+    engine = create_async_engine(_async_url(URL_PRUEBAS), poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            yield conn
+    finally:
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def sesion():
+    """AsyncSession sin pool, como la de una petición."""
+    engine = create_async_engine(_async_url(URL_PRUEBAS), poolclass=NullPool)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            yield db
+    finally:
+        await engine.dispose()
+
+
+def sql_literal(stmt) -> str:
+    """SQL de PostgreSQL con los parámetros en línea."""
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def tablas_recorridas(conn, stmt) -> set:
+    """Tablas (particiones hoja) que recorre el plan de stmt.
+
+    Con los valores en línea la poda se hace al planificar, así que el
+    plan solo contiene las particiones que se van a leer.
+    """
+    plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql_literal(stmt)}"))).scalar()
+    if isinstance(plan, str):
+        # asyncpg devuelve json como texto
+        plan = json.loads(plan)
+    tablas = set()
+    pendientes = [plan[0]["Plan"]]
+    while pendientes:
+        nodo = pendientes.pop()
+        if "Relation Name" in nodo:
+            tablas.add(nodo["Relation Name"])
+        pendientes.extend(nodo.get("Plans", []))
+    return tablas
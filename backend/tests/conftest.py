@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from bdns_portal.rollup import refresh_rollups
+from bdns_portal.sintetico.generador import ParametrosGeneracion, generar
+
+from .bd import URL_PRUEBAS, conexion, sesion
+
+# Pequeño pero con todas las dimensiones y varios años
+PARAMETROS_SINTETICOS = ParametrosGeneracion(
+    concesiones=20_000,
+    beneficiarios=2_000,
+    convocatorias=300,
+    organos=40,
+    anio_desde=2021,
+    anio_hasta=2024,
+    lote=20_000
+)
+
+
+@pytest.fixture(scope="session")
+def bd_sintetica() -> ParametrosGeneracion:
+    """Dataset sintético con los rollups reconstruidos, una vez por sesión."""
+    if not URL_PRUEBAS:
+        pytest.skip("BDNS_TEST_DATABASE_URL no definida")
+
+    async def preparar():
+        async with conexion() as conn:
+            await generar(conn, PARAMETROS_SINTETICOS, truncar=True)
+        async with sesion() as db:
+            await refresh_rollups(db)
+
+    asyncio.run(preparar())
+    return PARAMETROS_SINTETICOS
@@ -0,0 +1,235 @@
+"""Capa de cache Redis (fakeredis) y codec."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from bdns_portal.cache import redis_cache as modulo
+from bdns_portal.cache.redis_cache import CacheLocal, RedisCache, con_todos, etiqueta
+
+
+def _cache(cliente=None) -> RedisCache:
+    cache = RedisCache()
+    cache.client = cliente or fakeredis.aioredis.FakeRedis()
+    cache.local = CacheLocal(max_entradas=10, ttl=60)
+    cache.version_sondeo_segundos = 0
+    return cache
+
+
+def test_conjuntos_de_etiquetas_por_version():
+    async def probar():
+        cache = _cache()
+        todos = etiqueta("organo")
+
+        clave_v0 = await cache.con_version("estadisticas:a")
+        await cache.set(clave_v0, 1, expire=60, etiquetas=[todos])
+        await cache.incrementar_version_datos()
+        clave_v1 = await cache.con_version("estadisticas:a")
+        await cache.set(clave_v1, 2, expire=60, etiquetas=[todos])
+
+        cliente = cache.client
+        return (
+            await cliente.smembers("etiqueta:v0:organo:todos"),
+            await cliente.smembers("etiqueta:v1:organo:todos"),
+            await cliente.ttl("etiqueta:v0:organo:todos"),
+            await cache.invalidar_etiquetas([todos]),
+            await cliente.exists(clave_v0, clave_v1),
+        )
+
+    v0, v1, ttl_v0, borradas, existen = asyncio.run(probar())
+    # El conjunto catch-all no acumula claves de versiones distintas y caduca
+    assert v0 == {b"estadisticas:v0:a"}
+    assert v1 == {b"estadisticas:v1:a"}
+    assert 0 < ttl_v0 <= 60
+    # Invalidar toca solo la versión vigente
+    assert borradas == 1
+    assert existen == 1
+
+
+def test_invalidar_un_valor_invalida_todos():
+    assert con_todos(["anio:2024", "anio:2023", "organo:todos"]) == ["anio:2024", "anio:todos", "anio:2023", "organo:todos"]
+
+    async def probar():
+        cache = _cache()
+        sin_filtro = await cache.con_version("estadisticas:sin_filtro")
+        otro_anio = await cache.con_version("estadisticas:2023")
+        await cache.set(sin_filtro, 1, expire=60, etiquetas=[etiqueta("anio")])
+        await cache.set(otro_anio, 2, expire=60, etiquetas=[etiqueta("anio", 2023)])
+        await cache.invalidar_etiquetas([etiqueta("anio", 2024)])
+        cache.local.limpiar()
+        return await cache.get(sin_filtro), await cache.get(otro_anio)
+
+    assert asyncio.run(probar()) == (None, 2)
+
+
+def test_invalidacion_llega_a_la_l1_de_otros_procesos():
+    async def probar():
+        cliente = fakeredis.aioredis.FakeRedis()
+        api, cli = _cache(cliente), _cache(cliente)
+        clave = await api.con_version("estadisticas:a")
+        await api.set(clave, 1, expire=60, etiquetas=[etiqueta("anio", 2024)])
+
+        await cli.invalidar_etiquetas([etiqueta("anio", 2024)])
+        # Hasta su siguiente sondeo de versión el worker sirve su L1
+        antes = await api.get(clave)
+        await api.con_version("estadisticas:a")
+        return antes, await api.get(clave)
+
+    assert asyncio.run(probar()) == (1, None)
+
+
+def test_oyentes_de_version():
+    async def probar():
+        cache = _cache()
+        vistas = []
+        cache.al_cambiar_version(vistas.append)
+        await cache.version_datos()
+        await cache.incrementar_version_datos()
+        # Refresco publicado por otro proceso: se ve en el siguiente sondeo
+        await cache.client.incr("version_datos")
+        await cache.version_datos()
+        await cache.version_datos()
+        return vistas
+
+    assert asyncio.run(probar()) == [1, 2]
+
+
+def test_entrada_ilegible_se_recalcula():
+    async def probar():
+        cache = _cache()
+        await cache.client.set("estadisticas:v0:rota", b"mz" + b"\x00" * 16)
+        return await cache.get_or_set("estadisticas:v0:rota", _cuarenta_y_dos, expire=60)
+
+    assert asyncio.run(probar()) == 42
+
+
+async def _cuarenta_y_dos():
+    return 42
+
+
+def test_cache_local_lru_acotada():
+    local = CacheLocal(max_entradas=2, ttl=60)
+    local.set("a", 1, expire=60)
+    local.set("b", 2, expire=60)
+    # Leer "a" la hace la más reciente: sale "b", la menos usada
+    assert local.get("a") == 1
+    local.set("c", 3, expire=60)
+    assert len(local) == 2
+    assert local.get("b") is modulo._AUSENTE
+    assert (local.get("a"), local.get("c")) == (1, 3)
+
+
+def test_cache_local_caduca(monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr(modulo, "time", SimpleNamespace(monotonic=lambda: reloj[0], time=time.time))
+    local = CacheLocal(max_entradas=10, ttl=5)
+    local.set("corta", 1, expire=2)
+    local.set("larga", 2, expire=3600)
+
+    reloj[0] += 3
+    assert local.get("corta") is modulo._AUSENTE
+    assert local.get("larga") == 2
+    # El TTL de la L1 acota incluso a las claves con expire largo
+    reloj[0] += 3
+    assert local.get("larga") is modulo._AUSENTE
+    assert len(local) == 0
+
+
+def test_ratios_por_capa():
+    async def probar():
+        cliente = fakeredis.aioredis.FakeRedis()
+        await _cache(cliente).set("estadisticas:v0:a", 1, expire=60)
+
+        # Otro proceso: su L1 está vacía y la primera lectura llega a Redis
+        cache = _cache(cliente)
+        await cache.get_or_set("estadisticas:v0:a", _cuarenta_y_dos, expire=60)
+        await cache.get_or_set("estadisticas:v0:a", _cuarenta_y_dos, expire=60)
+        await cache.get_or_set("estadisticas:v0:b", _cuarenta_y_dos, expire=60)
+        return cache.estadisticas()
+
+    estadisticas = asyncio.run(probar())
+    assert estadisticas["lecturas"] == 3
+    assert estadisticas["fallos"] == 1
+    assert (estadisticas["l1"]["aciertos"], estadisticas["l1"]["ratio"]) == (1, round(1 / 3, 4))
+    # El ratio de L2 es sobre las 2 lecturas que no acertaron en L1
+    assert (estadisticas["l2"]["aciertos"], estadisticas["l2"]["ratio"]) == (1, 0.5)
+    assert estadisticas["l1"]["entradas"] == 2
+
+
+class _Calculo:
+    """calcular lento que cuenta sus ejecuciones."""
+
+    def __init__(self, valor):
+        self.valor = valor
+        self.llamadas = 0
+        self.terminadas = 0
+
+    async def __call__(self):
+        self.llamadas += 1
+        await asyncio.sleep(0.05)
+        self.terminadas += 1
+        return self.valor
+
+
+def _reloj(monkeypatch, inicio: float = 1000.0) -> list:
+    """time.time del módulo controlado por la prueba (fresco_hasta)."""
+    reloj = [inicio]
+    monkeypatch.setattr(modulo, "time", SimpleNamespace(time=lambda: reloj[0], monotonic=time.monotonic))
+    return reloj
+
+
+def test_obsoleta_se_sirve_y_se_recalcula_una_vez(monkeypatch):
+    reloj = _reloj(monkeypatch)
+
+    async def probar():
+        cliente = fakeredis.aioredis.FakeRedis()
+        await _cache(cliente).set("estadisticas:v0:swr", "viejo", expire=600, fresco=10)
+        reloj[0] += 20
+
+        # Dos procesos con tres lecturas cada uno sobre la entrada obsoleta
+        procesos = [_cache(cliente), _cache(cliente)]
+        calculo = _Calculo("nuevo")
+        servidos = await asyncio.gather(*(
+            cache.get_or_set("estadisticas:v0:swr", calculo, expire=600, fresco=10)
+            for cache in procesos for _ in range(3)
+        ))
+        sin_esperar = calculo.terminadas
+        for cache in procesos:
+            await asyncio.gather(*cache._refrescos)
+        despues = await _cache(cliente).get_or_set("estadisticas:v0:swr", calculo, expire=600, fresco=10)
+        return servidos, sin_esperar, calculo.llamadas, despues, procesos
+
+    servidos, sin_esperar, llamadas, despues, procesos = asyncio.run(probar())
+    # Se responde al momento, sin esperar al recálculo
+    assert servidos == ["viejo"] * 6
+    assert sin_esperar == 0
+    # Un solo recálculo entre los dos procesos (cerrojo en Redis)
+    assert llamadas == 1
+    assert sum(cache.refrescos for cache in procesos) == 1
+    assert despues == "nuevo"
+
+
+def test_pasado_el_ttl_duro_se_espera(monkeypatch):
+    # Sin Redis: el TTL duro es el de la L1, que va con time.monotonic
+    reloj = [1000.0]
+    monkeypatch.setattr(modulo, "time", SimpleNamespace(time=lambda: reloj[0], monotonic=lambda: reloj[0]))
+
+    async def probar():
+        cache = RedisCache()
+        cache.local = CacheLocal(max_entradas=10, ttl=600)
+        await cache.set("estadisticas:v0:duro", "viejo", expire=60, fresco=10)
+        reloj[0] += 120
+
+        calculo = _Calculo("nuevo")
+        valor = await cache.get_or_set("estadisticas:v0:duro", calculo, expire=60, fresco=10)
+        return valor, calculo.terminadas, cache
+
+    valor, terminadas, cache = asyncio.run(probar())
+    # La entrada caducó: la lectura espera al cálculo y no sirve la obsoleta
+    assert valor == "nuevo"
+    assert terminadas == 1
+    assert cache.obsoletas_servidas == 0
+    assert cache.fallos == 1
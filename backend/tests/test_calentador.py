@@ -0,0 +1,100 @@
+"""Catálogo del calentador frente a las peticiones reales del dashboard."""
+import asyncio
+
+import pytest
+
+from bdns_portal.graphql import sesiones
+from bdns_portal.graphql.calentador import (
+    ANIO,
+    ANIO_OBLIGATORIO,
+    CATALOGO,
+    COMPARATIVA,
+    FILTROS,
+    RANGO,
+    catalogo
+)
+from bdns_portal.graphql.cargadores import Cargadores
+from bdns_portal.graphql.resolvers import estadisticas
+from bdns_portal.graphql.schema import schema
+
+RECIENTES = [2023, 2024]
+ANIOS = [2021, 2022, 2023, 2024]
+
+# Argumentos en línea de una petición del dashboard para un año (None = sin año)
+PETICION = {
+    FILTROS: lambda anio: f"filtros: {{anio: {anio}}}" if anio else "",
+    ANIO: lambda anio: f"anio: {anio}" if anio else "",
+    ANIO_OBLIGATORIO: lambda anio: f"anio: {anio}",
+    COMPARATIVA: lambda anio: f"anioBase: {anio - 1}, anioComparar: {anio}",
+    RANGO: lambda anio: f"anioDesde: {min(ANIOS)}, anioHasta: {max(ANIOS)}",
+}
+FIJOS = {"estadisticas": "dimensiones: [REGION, TIPO_ENTIDAD]"}
+
+
+class _Sesion:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Anotada(Exception):
+    pass
+
+
+@pytest.fixture
+def claves(monkeypatch):
+    """Ejecuta una consulta y devuelve las claves de cache que pide, sin calcular."""
+    monkeypatch.setattr(sesiones, "get_sessionmaker", lambda: _Sesion)
+
+    def ejecutar(query: str, variables: dict = None) -> list:
+        anotadas = []
+
+        async def anotar(info, cache_key, calcular, etiquetas=()):
+            anotadas.append(cache_key)
+            raise _Anotada()
+
+        with pytest.MonkeyPatch.context() as parche:
+            parche.setattr(estadisticas, "_cacheado", anotar)
+            asyncio.run(schema.execute(
+                query, variable_values=variables, context_value={"cargadores": Cargadores(_Sesion)}
+            ))
+        return anotadas
+
+    return ejecutar
+
+
+def _peticion(campo: str, variante: str, anio) -> str:
+    argumentos = ", ".join(a for a in (FIJOS.get(campo, ""), PETICION[variante](anio)) if a)
+    return f"{{ {campo}{f'({argumentos})' if argumentos else ''} {{ __typename }} }}"
+
+
+def test_catalogo_usa_las_claves_de_las_peticiones(claves):
+    consultas = catalogo(RECIENTES, ANIOS)
+    assert consultas
+    for consulta in consultas:
+        campo, _, sufijo = consulta.nombre.partition(":")
+        variante = CATALOGO[campo][0]
+        anio = None if sufijo == "todos" else int(sufijo)
+        calentada = claves(consulta.query, consulta.variables)
+        assert len(calentada) == 1, consulta.nombre
+        assert calentada == claves(_peticion(campo, variante, anio)), consulta.nombre
+
+
+def test_variantes_del_catalogo():
+    por_campo = {}
+    for consulta in catalogo(RECIENTES, ANIOS):
+        campo, _, anio = consulta.nombre.partition(":")
+        por_campo.setdefault(CATALOGO[campo][0], {}).setdefault(campo, []).append(anio)
+    # Sin año y por año reciente; las de año obligatorio solo por año; el rango una vez
+    assert all(a == ["todos", "2023", "2024"] for a in por_campo[FILTROS].values())
+    assert all(a == ["todos", "2023", "2024"] for a in por_campo[ANIO].values())
+    assert all(a == ["2023", "2024"] for a in por_campo[ANIO_OBLIGATORIO].values())
+    assert all(a == ["2023", "2024"] for a in por_campo[COMPARATIVA].values())
+    assert all(a == ["todos"] for a in por_campo[RANGO].values())
+
+
+def test_campo_fuera_del_catalogo():
+    with pytest.raises(ValueError):
+        catalogo(RECIENTES, ANIOS, ["estadisticasPorOrgano", "noExiste"])
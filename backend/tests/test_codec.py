@@ -0,0 +1,50 @@
+"""Codec de las entradas de cache."""
+import json
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from bdns_portal.cache.codec import COMPRIMIDO, FORMATOS, SIN_COMPRIMIR, Codec, CodecError
+
+
+def _json(primitivo) -> bytes:
+    return FORMATOS["json"] + SIN_COMPRIMIR + json.dumps(primitivo).encode()
+
+
+@pytest.mark.parametrize("formato", ["json", "orjson", "msgpack"])
+def test_ida_y_vuelta(formato):
+    codec = Codec(formato, compresion_min_bytes=1)
+    valor = {"fecha": date(2024, 2, 29), "id": uuid4(), "importe": Decimal("1.10"), "lista": [1, None, "a"]}
+    assert codec.decodificar(codec.codificar(valor)) == valor
+
+
+def test_trama_zstd_corrupta():
+    pytest.importorskip("zstandard")
+    datos = Codec("json", compresion_min_bytes=1).codificar({"valor": "x" * 100})
+    assert datos[1:2] == COMPRIMIDO
+    with pytest.raises(CodecError):
+        Codec().decodificar(datos[:2] + b"\x00" * 8 + datos[10:])
+
+
+def test_tipo_no_registrado():
+    with pytest.raises(CodecError):
+        Codec().decodificar(_json({"__tipo__": "NoRegistrado", "campos": {}}))
+
+
+@pytest.mark.parametrize("primitivo", [
+    {"__tipo__": "date"},
+    {"__tipo__": "decimal", "valor": "no-es-un-numero"},
+    {"__tipo__": "uuid", "valor": 7},
+])
+def test_marcas_de_tipo_corruptas(primitivo):
+    with pytest.raises(CodecError):
+        Codec().decodificar(_json(primitivo))
+
+
+def test_cuerpo_ilegible():
+    with pytest.raises(CodecError):
+        Codec().decodificar(FORMATOS["msgpack"] + SIN_COMPRIMIR + b"\xc1")
+    with pytest.raises(CodecError):
+        Codec().decodificar(FORMATOS["json"] + SIN_COMPRIMIR + b"{no json")
@@ -0,0 +1,72 @@
+"""Coste estimado de las operaciones GraphQL."""
+import asyncio
+
+from graphql import parse
+
+from bdns_portal.core.config import get_settings
+from bdns_portal.graphql.coste import PESOS, coste_operacion
+from bdns_portal.graphql.schema import schema
+
+MAXIMO_PAGINA = get_settings().GRAPHQL_MAX_PAGINA
+MAXIMO_ANIOS = get_settings().ESTADISTICAS_MAX_ANIOS
+
+
+def _coste(consulta: str, variables: dict = None):
+    return coste_operacion(schema._schema, parse(consulta), None, variables)
+
+
+def _concesiones(first: int, extra: str = "") -> float:
+    coste, errores = _coste(
+        "query($n: Int) { concesiones(pagination: {first: $n}) { edges { node { id } } %s } }" % extra,
+        {"n": first}
+    )
+    assert errores == []
+    return coste
+
+
+def test_la_pagina_multiplica_solo_edges():
+    for first in (1, 10, MAXIMO_PAGINA):
+        assert _concesiones(first, "totalCount") - _concesiones(first) == PESOS["*.totalCount"]
+        assert _concesiones(first, "pageInfo { hasNextPage endCursor }") - _concesiones(first) == 1
+    assert _concesiones(MAXIMO_PAGINA) > _concesiones(10) > _concesiones(1)
+
+
+def test_conexion_sin_tamano_cuesta_una_pagina_maxima():
+    sin_tamano, errores = _coste("{ concesiones { edges { node { id } } } }")
+    assert errores == []
+    assert sin_tamano == _concesiones(MAXIMO_PAGINA)
+
+
+def test_pagina_mayor_que_el_maximo():
+    _, errores = _coste("{ concesiones(pagination: {first: %d}) { totalCount } }" % (MAXIMO_PAGINA + 1))
+    assert len(errores) == 1
+
+
+def _serie(campo: str, desde: int, hasta: int):
+    return _coste("{ %s(anioDesde: %d, anioHasta: %d) { anio } }" % (campo, desde, hasta))
+
+
+def test_series_por_anios_cuestan_por_anio():
+    for campo in ("estadisticasEvolucionMensualAnios", "comparativaAnualSerie"):
+        uno, errores_uno = _serie(campo, 2024, 2024)
+        cinco, errores_cinco = _serie(campo, 2020, 2024)
+        assert errores_uno == errores_cinco == []
+        assert cinco > uno
+
+
+def test_series_por_anios_acotadas():
+    for campo in ("estadisticasEvolucionMensualAnios", "comparativaAnualSerie"):
+        _, errores = _serie(campo, 2000, 2000 + MAXIMO_ANIOS - 1)
+        assert errores == []
+        for desde, hasta in ((1, 1_000_000), (2024, 2020)):
+            _, errores = _serie(campo, desde, hasta)
+            assert len(errores) == 1, (campo, desde, hasta)
+
+
+def test_profundidad_maxima():
+    anidado = "id"
+    for _ in range(get_settings().GRAPHQL_PROFUNDIDAD_MAXIMA + 1):
+        anidado = "padre { %s }" % anidado
+    resultado = asyncio.run(schema.execute("{ organos { %s } }" % anidado))
+    assert resultado.errors
+    assert "depth" in resultado.errors[0].message
@@ -0,0 +1,88 @@
+"""Sentencias del cubo de estadísticas."""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from bdns_portal.graphql.resolvers.cubo import cubo_stmt, etiqueta_agregado
+from bdns_portal.graphql.types.estadisticas import (
+    AgrupacionEstadistica,
+    DimensionEstadistica,
+    FiltroEstadisticas
+)
+from bdns_portal.rollup import rollup_concesion_mensual
+
+from .bd import requiere_bd, sesion, sql_literal
+
+DIMENSIONES = [DimensionEstadistica.REGION, DimensionEstadistica.ANIO]
+FILTROS = FiltroEstadisticas(anio_desde=2022, anio_hasta=2023)
+
+
+def _sql(**kwargs) -> str:
+    return sql_literal(cubo_stmt(DIMENSIONES, FILTROS, AgrupacionEstadistica.ROLLUP, **kwargs))
+
+
+def test_beneficiarios_desde_sketches():
+    sql = _sql(beneficiarios=True)
+    assert "hll_union_agg" in sql
+    assert "bdns.rollup_beneficiarios_hll" in sql
+
+
+def test_beneficiarios_exactos_sin_hll():
+    sql = _sql(beneficiarios=True, beneficiarios_exactos=True)
+    assert "hll" not in sql
+    assert "count(DISTINCT" in sql
+    # Mismo ROLLUP que las concesiones y poda por fecha_concesion
+    assert sql.count("ROLLUP") == 2
+    assert "bdns.concesion.fecha_concesion >= '2022-01-01'" in sql
+    assert "bdns.concesion.fecha_concesion < '2024-01-01'" in sql
+
+
+def test_beneficiarios_exactos_solo_en_su_grano():
+    with pytest.raises(ValueError):
+        cubo_stmt(
+            [DimensionEstadistica.TIPO_ENTIDAD], beneficiarios=True, beneficiarios_exactos=True
+        )
+
+
+def test_rollup_no_descarta_desconocidos():
+    assert "IS NOT NULL" not in _sql()
+    assert "IS NOT NULL" in sql_literal(cubo_stmt(DIMENSIONES, FILTROS, descartar_desconocidos=True))
+    with pytest.raises(ValueError):
+        cubo_stmt(DIMENSIONES, FILTROS, AgrupacionEstadistica.ROLLUP, descartar_desconocidos=True)
+
+
+@requiere_bd
+def test_total_del_rollup_igual_al_total_sin_desglosar(bd_sintetica):
+    dimensiones = [
+        DimensionEstadistica.REGION,
+        DimensionEstadistica.ORGANO,
+        DimensionEstadistica.TIPO_ENTIDAD,
+        DimensionEstadistica.REGIMEN,
+        DimensionEstadistica.ANIO,
+    ]
+
+    async def probar():
+        async with sesion() as db:
+            # Celda sin región, órgano, tipo ni régimen; la sesión no confirma
+            await db.execute(rollup_concesion_mensual.insert().values(
+                anio=2022, mes=1, organo_id=None, tipo_entidad=None, region_id=None, regimen=None,
+                numero_concesiones=7, importe_total=700
+            ))
+            rollup = rollup_concesion_mensual.c
+            total = (await db.execute(
+                select(func.sum(rollup.numero_concesiones), func.sum(rollup.importe_total))
+            )).one()
+            filas = (await db.execute(cubo_stmt(dimensiones, agrupacion=AgrupacionEstadistica.ROLLUP))).all()
+            return total, filas
+
+    (numero, importe), filas = asyncio.run(probar())
+    general = [f for f in filas if f.nivel == 5]
+    assert len(general) == 1
+    assert (general[0].numero_concesiones, general[0].importe_total) == (numero, importe)
+    # Desconocido (GROUPING = 0) y agregado (GROUPING = 1) se distinguen
+    desconocidas = [
+        f for f in filas
+        if f.region_id is None and not getattr(f, etiqueta_agregado(DimensionEstadistica.REGION))
+    ]
+    assert sum(f.numero_concesiones for f in desconocidas if f.nivel == 0) == 7
@@ -0,0 +1,149 @@
+"""Resolvers de estadísticas sin base de datos."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bdns_portal.cache.redis_cache import RedisCache
+from bdns_portal.core.config import get_settings
+from bdns_portal.graphql.resolvers import estadisticas
+from bdns_portal.graphql.resolvers.estadisticas import (
+    _beneficiarios_stmt,
+    _cacheado,
+    _etiquetas,
+    get_comparativa_anual_serie,
+    get_concentracion_subvenciones,
+    get_estadisticas_evolucion_mensual_anios,
+    rango_anios,
+    TOP_K_CANONICO
+)
+from bdns_portal.graphql.types.estadisticas import FiltroEstadisticas
+
+from .bd import sql_literal
+
+MAXIMO = get_settings().ESTADISTICAS_MAX_ANIOS
+
+# Falla si el resolver llega a consultar
+SIN_BD = SimpleNamespace(context={})
+
+
+def test_rango_de_anios_dentro_del_maximo():
+    assert list(rango_anios(2020, 2024)) == [2020, 2021, 2022, 2023, 2024]
+    assert len(rango_anios(2000, 2000 + MAXIMO - 1)) == MAXIMO
+
+
+def test_rango_de_anios_demasiado_largo():
+    with pytest.raises(ValueError):
+        rango_anios(2000, 2000 + MAXIMO)
+    with pytest.raises(ValueError):
+        rango_anios(1, 9999)
+
+
+def test_rango_de_anios_invertido():
+    with pytest.raises(ValueError):
+        rango_anios(2024, 2020)
+
+
+@pytest.mark.parametrize("resolver", [get_estadisticas_evolucion_mensual_anios, get_comparativa_anual_serie])
+def test_series_rechazan_rangos_sin_limite(resolver):
+    with pytest.raises(ValueError):
+        asyncio.run(resolver(SIN_BD, 1, 1_000_000))
+
+
+def test_etiquetas_de_rango_largo_cuentan_como_todos():
+    assert "anio:todos" in _etiquetas(FiltroEstadisticas(anio_desde=1, anio_hasta=9999))
+    assert "anio:2023" in _etiquetas(FiltroEstadisticas(anio_desde=2022, anio_hasta=2023))
+
+
+class _SesionPropia:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def test_cacheado_calcula_con_su_propia_sesion(monkeypatch):
+    monkeypatch.setattr(estadisticas, "get_sessionmaker", lambda: _SesionPropia)
+    sesiones = []
+
+    async def calcular(db):
+        sesiones.append(db)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def dos_peticiones():
+        # Fallos simultáneos: un solo cálculo, con una sesión que no es de ninguna petición
+        peticiones = [SimpleNamespace(context={"db": object()}) for _ in range(2)]
+        return await asyncio.gather(*(
+            _cacheado(info, "estadisticas:prueba_sesion_propia", calcular) for info in peticiones
+        )), peticiones
+
+    resultados, peticiones = asyncio.run(dos_peticiones())
+    assert resultados == [42, 42]
+    assert len(sesiones) == 1
+    assert isinstance(sesiones[0], _SesionPropia)
+    assert all(sesiones[0] is not info.context["db"] for info in peticiones)
+
+
+def test_beneficiarios_exactos_solo_de_los_anios_pedidos():
+    # comparativaAnual(2010, 2024) no debe recorrer 2011..2023
+    sql = sql_literal(_beneficiarios_stmt(True, agrupar=("anio",), anios=[2010, 2024]))
+    assert "'2010-01-01'" in sql and "'2011-01-01'" in sql
+    assert "'2024-01-01'" in sql and "'2025-01-01'" in sql
+    assert "'2012-01-01'" not in sql and "'2023-01-01'" not in sql
+
+
+class _SesionTopK(_SesionPropia):
+    """Devuelve las filas del top pedido y anota cada consulta."""
+
+    consultas = []
+
+    async def execute(self, stmt):
+        _SesionTopK.consultas.append(stmt)
+        filas = [
+            SimpleNamespace(
+                beneficiario_id=f"b{i}", beneficiario_nombre=None, tipo_entidad="empresa",
+                anio=2024, numero_concesiones=1, importe_total=float(1000 - i)
+            )
+            for i in range(stmt._limit)
+        ]
+        return SimpleNamespace(all=lambda: filas)
+
+
+@pytest.fixture
+def top_k(monkeypatch):
+    monkeypatch.setattr(estadisticas, "get_sessionmaker", lambda: _SesionTopK)
+    monkeypatch.setattr(estadisticas, "redis_cache", RedisCache())
+    _SesionTopK.consultas = []
+    return estadisticas.redis_cache
+
+
+def test_top_k_comparte_la_entrada_canonica(top_k):
+    async def pedir():
+        info = SimpleNamespace(context={"db": object()})
+        return (
+            await get_concentracion_subvenciones(info, anio=2024, limite=10),
+            await get_concentracion_subvenciones(info, anio=2024, limite=50)
+        )
+
+    diez, cincuenta = asyncio.run(pedir())
+    # Una sola consulta del top canónico, recortada en cada petición
+    assert [c._limit for c in _SesionTopK.consultas] == [TOP_K_CANONICO]
+    assert len(top_k.local) == 1
+    assert [e.beneficiario_id for e in diez] == [f"b{i}" for i in range(10)]
+    assert [e.beneficiario_id for e in cincuenta] == [f"b{i}" for i in range(50)]
+
+
+def test_top_k_mayor_que_el_canonico_sin_cache(top_k):
+    limite = TOP_K_CANONICO + 1
+
+    async def pedir():
+        info = SimpleNamespace(context={"db": _SesionTopK()})
+        return [await get_concentracion_subvenciones(info, anio=2024, limite=limite) for _ in range(2)]
+
+    primera, segunda = asyncio.run(pedir())
+    # SQL en vivo con la sesión de la petición, cada vez y sin guardar nada
+    assert [c._limit for c in _SesionTopK.consultas] == [limite, limite]
+    assert len(top_k.local) == 0
+    assert len(primera) == len(segunda) == limite
@@ -0,0 +1,274 @@
+"""Motor de estadísticas en memoria frente a las consultas SQL."""
+import asyncio
+import dataclasses
+from datetime import date
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sqlalchemy import func, select
+
+from bdns_portal.analytics.motor import DIMENSIONES_CODIFICADAS, Diccionario, MotorEstadisticas
+from bdns_portal.graphql.resolvers import estadisticas, estadisticas_motor
+from bdns_portal.graphql.resolvers.cubo import cubo_stmt
+from bdns_portal.graphql.resolvers.estadisticas import _beneficiarios_stmt
+from bdns_portal.graphql.types.estadisticas import DimensionEstadistica, FiltroEstadisticas
+from bdns_portal.rollup import rollup_concesion_mensual
+
+from .bd import requiere_bd, sesion
+
+ORGANO_A, ORGANO_B = uuid4(), uuid4()
+REGION_A, REGION_B = uuid4(), uuid4()
+
+# (fecha, importe, beneficiario, organo, region, tipo_entidad, regimen)
+HECHOS = [
+    (date(2021, 3, 1), 100.0, "b1", ORGANO_A, REGION_A, "publica", "minimis"),
+    (date(2022, 5, 1), 200.0, "b2", ORGANO_A, REGION_B, "privada", "ayuda_estado"),
+    (date(2022, 7, 1), 300.0, "b1", ORGANO_B, REGION_A, "privada", "minimis"),
+    (date(2023, 1, 1), 400.0, "b3", ORGANO_B, REGION_B, "publica", "ordinaria"),
+    (date(2024, 2, 1), 500.0, "b2", ORGANO_A, REGION_A, "privada", "minimis"),
+]
+
+
+def _motor(hechos) -> MotorEstadisticas:
+    """Motor con las mismas columnas que deja MotorEstadisticas.cargar."""
+    motor = MotorEstadisticas()
+    diccionarios = {d: Diccionario() for d in DIMENSIONES_CODIFICADAS}
+    fechas, importes, *dimensiones = zip(*hechos)
+    columnas = {
+        nombre: np.array([diccionarios[nombre].codificar(v) for v in valores], dtype=np.int32)
+        for nombre, valores in zip(("beneficiario", "organo", "region", "tipo_entidad", "regimen"), dimensiones)
+    }
+    columnas["fecha"] = np.array(fechas, dtype="datetime64[D]")
+    columnas["anio"] = (columnas["fecha"].astype("datetime64[Y]").astype(np.int64) + 1970).astype(np.int16)
+    columnas["mes"] = (columnas["fecha"].astype("datetime64[M]").astype(np.int64) % 12 + 1).astype(np.int8)
+    columnas["importe"] = np.array(importes, dtype=np.float64)
+    motor.columnas, motor.diccionarios = columnas, diccionarios
+    return motor
+
+
+class _Nombres:
+    """Sesión que solo sabe resolver nombres (_nombres)."""
+
+    async def execute(self, stmt):
+        return SimpleNamespace(all=lambda: [(ORGANO_A, "A"), (ORGANO_B, "B")])
+
+
+@pytest.fixture
+def motor(monkeypatch):
+    motor = _motor(HECHOS)
+    monkeypatch.setattr(estadisticas_motor, "motor", motor)
+    return motor
+
+
+def _importes(filas, dimension) -> dict:
+    return {(getattr(f, dimension), f.anio): f.importe_total for f in filas}
+
+
+def test_por_tipo_entidad_aplica_todos_los_filtros(motor):
+    filtros = FiltroEstadisticas(organo_id=ORGANO_A, region_id=REGION_A, regimen="minimis")
+    filas = asyncio.run(estadisticas_motor.por_tipo_entidad(None, filtros))
+    assert _importes(filas, "tipo_entidad") == {("publica", 2021): 100.0, ("privada", 2024): 500.0}
+
+
+def test_por_organo_aplica_todos_los_filtros(motor):
+    filtros = FiltroEstadisticas(tipo_entidad="privada", region_id=REGION_A)
+    filas = asyncio.run(estadisticas_motor.por_organo(_Nombres(), filtros))
+    assert _importes(filas, "organo_id") == {(ORGANO_B, 2022): 300.0, (ORGANO_A, 2024): 500.0}
+
+
+def test_un_solo_extremo_del_rango(motor):
+    desde = asyncio.run(estadisticas_motor.por_tipo_entidad(None, FiltroEstadisticas(anio_desde=2023)))
+    hasta = asyncio.run(estadisticas_motor.por_tipo_entidad(None, FiltroEstadisticas(anio_hasta=2021)))
+    assert {f.anio for f in desde} == {2023, 2024}
+    assert {f.anio for f in hasta} == {2021}
+
+
+def test_anio_manda_sobre_el_rango(motor):
+    filtros = FiltroEstadisticas(anio=2022, anio_desde=2023, anio_hasta=2024)
+    filas = asyncio.run(estadisticas_motor.por_tipo_entidad(None, filtros))
+    assert {f.anio for f in filas} == {2022}
+
+
+def test_numero_beneficiarios(motor):
+    assert estadisticas_motor.numero_beneficiarios(None) == 3
+    assert estadisticas_motor.numero_beneficiarios(FiltroEstadisticas(region_id=REGION_A, anio_desde=2022)) == 2
+    assert estadisticas_motor.numero_beneficiarios(FiltroEstadisticas(organo_id=uuid4())) == 0
+
+
+def test_motor_obsoleto_deja_de_responder():
+    motor = _motor(HECHOS)
+    motor.version = 3
+    assert not motor.notificar_version(3)
+    assert motor.activo
+    # Refresco de rollups: hasta recargar responden los rollups SQL
+    assert motor.notificar_version(4)
+    assert not motor.activo
+    motor.version = 4
+    assert motor.activo
+    assert not MotorEstadisticas().notificar_version(5)
+
+
+# --- Paridad con SQL sobre el dataset sintético ---------------------------
+
+async def _mas_frecuente(db, columna):
+    rollup = rollup_concesion_mensual.c
+    return await db.scalar(
+        select(columna)
+        .where(columna.isnot(None))
+        .group_by(columna)
+        .order_by(func.sum(rollup.numero_concesiones).desc())
+        .limit(1)
+    )
+
+
+async def _combinaciones(db) -> list:
+    rollup = rollup_concesion_mensual.c
+    organo = await _mas_frecuente(db, rollup.organo_id)
+    region = await _mas_frecuente(db, rollup.region_id)
+    tipo = await _mas_frecuente(db, rollup.tipo_entidad)
+    regimen = await _mas_frecuente(db, rollup.regimen)
+    return [
+        None,
+        FiltroEstadisticas(anio=2023),
+        FiltroEstadisticas(anio_desde=2022),
+        FiltroEstadisticas(anio_hasta=2022),
+        FiltroEstadisticas(anio_desde=2022, anio_hasta=2023, organo_id=organo),
+        FiltroEstadisticas(tipo_entidad=tipo, region_id=region),
+        FiltroEstadisticas(anio_desde=2022, regimen=regimen, organo_id=organo),
+        FiltroEstadisticas(anio=2024, tipo_entidad=tipo, region_id=region, regimen=regimen),
+    ]
+
+
+def _aproximado(objeto) -> dict:
+    return {k: pytest.approx(v) if isinstance(v, float) else v for k, v in dataclasses.asdict(objeto).items()}
+
+
+def _por_clave(objetos, *clave) -> dict:
+    return {tuple(getattr(o, c) for c in clave): _aproximado(o) for o in objetos}
+
+
+def _top_k(objetos, orden, *clave):
+    """Top-K comparable: los empates en el corte pueden caer en cualquier lado."""
+    corte = min((getattr(o, orden) for o in objetos), default=None)
+    return (
+        _por_clave([o for o in objetos if getattr(o, orden) != corte], *clave),
+        sorted(getattr(o, orden) for o in objetos)
+    )
+
+
+async def _sql_y_memoria(monkeypatch, motor, llamada):
+    """Mismo resolver sin motor (rollups SQL) y con el motor cargado."""
+    monkeypatch.setattr(estadisticas, "motor_estadisticas", MotorEstadisticas())
+    sql = await llamada()
+    monkeypatch.setattr(estadisticas, "motor_estadisticas", motor)
+    return sql, await llamada()
+
+
+def _normalizar(filas, dimension) -> dict:
+    return {
+        (getattr(f, dimension), int(f.anio)): (int(f.numero_concesiones), pytest.approx(float(f.importe_total)))
+        for f in filas
+    }
+
+
+@requiere_bd
+def test_paridad_motor_sql(bd_sintetica, monkeypatch):
+    async def comparar():
+        async with sesion() as db:
+            motor = MotorEstadisticas()
+            await motor.cargar(db)
+            monkeypatch.setattr(estadisticas_motor, "motor", motor)
+
+            for filtros in await _combinaciones(db):
+                for dimension, etiqueta, resolver in (
+                    (DimensionEstadistica.TIPO_ENTIDAD, "tipo_entidad", estadisticas_motor.por_tipo_entidad),
+                    (DimensionEstadistica.ORGANO, "organo_id", estadisticas_motor.por_organo),
+                ):
+                    sql = (await db.execute(cubo_stmt([dimension, DimensionEstadistica.ANIO], filtros, descartar_desconocidos=True))).all()
+                    memoria = await resolver(db, filtros)
+                    assert _normalizar(memoria, etiqueta) == _normalizar(sql, etiqueta), (etiqueta, filtros)
+
+                anios = {}
+                if filtros and filtros.anio:
+                    anios = {"anio_desde": filtros.anio, "anio_hasta": filtros.anio}
+                elif filtros:
+                    anios = {"anio_desde": filtros.anio_desde, "anio_hasta": filtros.anio_hasta}
+                exacto = await db.scalar(_beneficiarios_stmt(
+                    True,
+                    **anios,
+                    region_id=filtros.region_id if filtros else None,
+                    organo_id=filtros.organo_id if filtros else None,
+                    tipo_entidad=filtros.tipo_entidad if filtros else None,
+                    regimen=filtros.regimen if filtros else None
+                ))
+                assert estadisticas_motor.numero_beneficiarios(filtros) == exacto, filtros
+
+    asyncio.run(comparar())
+
+
+@requiere_bd
+def test_paridad_resolvers_motor_sql(bd_sintetica, monkeypatch):
+    async def sin_cache(info, cache_key, calcular, etiquetas=()):
+        return await calcular(info.context["db"])
+
+    monkeypatch.setattr(estadisticas, "_cacheado", sin_cache)
+
+    async def comparar():
+        async with sesion() as db:
+            motor = MotorEstadisticas()
+            await motor.cargar(db)
+            monkeypatch.setattr(estadisticas_motor, "motor", motor)
+            info = SimpleNamespace(context={"db": db})
+            desde, hasta = bd_sintetica.anio_desde, bd_sintetica.anio_hasta
+
+            async def paridad(llamada, normalizar):
+                sql, memoria = await _sql_y_memoria(monkeypatch, motor, llamada)
+                assert normalizar(memoria) == normalizar(sql), llamada
+
+            def meses(filas):
+                return {(f.anio, m.mes): _aproximado(m) for f in filas for m in f.meses}
+
+            # Acumulados y porcentajes por año (cumsum/bincount a mano)
+            await paridad(
+                lambda: estadisticas.get_estadisticas_evolucion_mensual_anios(info, desde, hasta), meses
+            )
+            for anio in (desde, hasta):
+                await paridad(
+                    lambda: estadisticas.get_estadisticas_evolucion_mensual(info, anio),
+                    lambda filas: _por_clave(filas, "mes")
+                )
+
+            for anio in (None, hasta):
+                await paridad(
+                    lambda: estadisticas.get_estadisticas_por_regimen(info, anio),
+                    lambda filas: _por_clave(filas, "regimen", "anio")
+                )
+                await paridad(
+                    lambda: estadisticas.get_estadisticas_por_region(info, anio, exacto=True),
+                    lambda filas: _por_clave(filas, "region_id", "anio")
+                )
+                for tipo in (None, "publica"):
+                    await paridad(
+                        lambda: estadisticas.get_concentracion_subvenciones(info, anio, tipo, limite=50),
+                        lambda filas: _top_k(filas, "importe_total", "beneficiario_id", "anio")
+                    )
+                await paridad(
+                    lambda: estadisticas.get_beneficiarios_recurrentes(info, anio, 3, limite=50),
+                    lambda filas: _top_k(filas, "numero_concesiones", "beneficiario_id", "anio")
+                )
+
+            # metricas_anuales, a traves de los dos resolvers que la usan
+            await paridad(
+                lambda: estadisticas.get_comparativa_anual_serie(info, desde, hasta, exacto=True),
+                lambda filas: _por_clave(filas, "anio")
+            )
+            await paridad(
+                lambda: estadisticas.get_comparativa_anual(info, desde, hasta, exacto=True),
+                _aproximado
+            )
+
+    asyncio.run(comparar())
@@ -0,0 +1,100 @@
+"""Predicados de fecha semiabiertos y poda de particiones de bdns.concesion."""
+import asyncio
+from datetime import date
+
+from sqlalchemy import extract, func, select
+
+from bdns_core.db.models import Concesion as ConcesionModel
+from bdns_portal.graphql.inputs.concesion import ConcesionFilterInput
+from bdns_portal.graphql.resolvers.concesion import build_filters
+from bdns_portal.graphql.resolvers.filtros_fecha import (
+    filtro_anio, filtro_anios, filtro_fechas, filtro_rango_anios, filtros_fecha_concesion
+)
+from bdns_portal.sintetico.generador import ParametrosGeneracion, _particiones
+
+from .bd import conexion, requiere_bd, sql_literal, tablas_recorridas
+
+ANIOS = (2021, 2024)
+
+
+def _sql(condiciones) -> str:
+    return " AND ".join(sql_literal(c) for c in condiciones)
+
+
+def test_anio_es_intervalo_semiabierto():
+    sql = _sql(filtro_anio(2024))
+    assert "fecha_concesion >= '2024-01-01'" in sql
+    assert "fecha_concesion < '2025-01-01'" in sql
+    assert "EXTRACT" not in sql.upper()
+
+
+def test_rango_de_anios_admite_un_solo_extremo():
+    assert _sql(filtro_rango_anios(anio_desde=2022)) == "bdns.concesion.fecha_concesion >= '2022-01-01'"
+    assert _sql(filtro_rango_anios(anio_hasta=2022)) == "bdns.concesion.fecha_concesion < '2023-01-01'"
+
+
+def test_fecha_hasta_incluye_el_ultimo_dia():
+    sql = _sql(filtro_fechas(date(2024, 2, 1), date(2024, 2, 29)))
+    assert "fecha_concesion >= '2024-02-01'" in sql
+    assert "fecha_concesion < '2024-03-01'" in sql
+
+
+def test_anios_sueltos_por_tramos():
+    sql = _sql(filtro_anios([2024, 2010, 2011]))
+    assert "fecha_concesion >= '2010-01-01'" in sql and "fecha_concesion < '2012-01-01'" in sql
+    assert "fecha_concesion >= '2024-01-01'" in sql and "fecha_concesion < '2025-01-01'" in sql
+    assert "2013" not in sql and " OR " in sql
+    assert filtro_anios([]) == []
+
+
+def _conteo(condiciones):
+    return select(func.count()).select_from(ConcesionModel).where(*condiciones)
+
+
+async def _particiones_de(condiciones) -> set:
+    async with conexion() as conn:
+        await _particiones(conn, ParametrosGeneracion(anio_desde=ANIOS[0], anio_hasta=ANIOS[1]))
+        await conn.commit()
+        return await tablas_recorridas(conn, _conteo(condiciones))
+
+
+def _anios(tablas: set) -> set:
+    # concesion_<anio>_<regimen_tipo>
+    return {int(tabla.split("_")[1]) for tabla in tablas}
+
+
+@requiere_bd
+def test_anio_recorre_solo_su_particion():
+    tablas = asyncio.run(_particiones_de(filtro_anio(2023)))
+    assert tablas and _anios(tablas) == {2023}
+
+
+@requiere_bd
+def test_rango_de_anios_recorre_solo_sus_particiones():
+    tablas = asyncio.run(_particiones_de(filtros_fecha_concesion(anio_desde=2022, anio_hasta=2023)))
+    assert _anios(tablas) == {2022, 2023}
+
+
+@requiere_bd
+def test_rango_de_fechas_recorre_solo_su_particion():
+    tablas = asyncio.run(_particiones_de(filtro_fechas(date(2024, 2, 1), date(2024, 2, 29))))
+    assert _anios(tablas) == {2024}
+
+
+@requiere_bd
+def test_filtro_de_concesiones_poda_por_anio():
+    tablas = asyncio.run(_particiones_de(build_filters(ConcesionFilterInput(anio=2022))))
+    assert _anios(tablas) == {2022}
+
+
+@requiere_bd
+def test_anios_sueltos_recorren_solo_sus_particiones():
+    tablas = asyncio.run(_particiones_de(filtro_anios([2021, 2024])))
+    assert _anios(tablas) == {2021, 2024}
+
+
+@requiere_bd
+def test_extract_no_poda():
+    # Referencia: la forma anterior recorre todos los años
+    tablas = asyncio.run(_particiones_de([extract("year", ConcesionModel.fecha_concesion) == 2023]))
+    assert _anios(tablas) == set(range(ANIOS[0], ANIOS[1] + 1))
@@ -0,0 +1,69 @@
+"""Percentiles y detección de regresiones del benchmark."""
+import pytest
+
+from bdns_portal.benchmark.medicion import MODOS, comprobar_regresiones, percentil
+
+
+def test_percentil_interpola_entre_rangos():
+    valores = [40, 10, 30, 20]
+    assert percentil(valores, 0) == 10
+    assert percentil(valores, 100) == 40
+    assert percentil(valores, 50) == pytest.approx(25)
+    # posición (4 - 1) * 0.95 = 2.85: entre 30 y 40
+    assert percentil(valores, 95) == pytest.approx(38.5)
+
+
+def test_percentil_casos_limite():
+    assert percentil([], 95) == 0.0
+    assert percentil([7], 50) == 7
+    assert percentil([7], 99) == 7
+
+
+def _medidas(**cambios) -> dict:
+    medidas = {"p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0, "consultas": 2, "filas": 100, "errores": 0}
+    medidas.update(cambios)
+    return medidas
+
+
+def _resultado(**cambios) -> dict:
+    """Escenario "concesiones" con las mismas medidas en todos los modos salvo la fría."""
+    modos = {modo: _medidas() for modo in MODOS}
+    modos["fria"] = _medidas(**cambios)
+    return {"escenarios": {"concesiones": modos}}
+
+
+def _regresiones(resultado, **kwargs) -> set:
+    return {
+        (r["modo"], r["metrica"], r["origen"])
+        for r in comprobar_regresiones(resultado, **kwargs)
+    }
+
+
+def test_sin_regresiones_frente_a_si_mismo():
+    assert comprobar_regresiones(_resultado(), base=_resultado()) == []
+
+
+def test_errores_siempre_son_regresion():
+    assert _regresiones(_resultado(errores=1)) == {("fria", "errores", "errores")}
+
+
+def test_umbrales_del_mas_general_al_mas_especifico():
+    umbrales = {"*": {"p95_ms": 15}, "concesiones:caliente": {"p95_ms": 25}}
+    assert _regresiones(_resultado(), umbrales=umbrales) == {
+        ("fria", "p95_ms", "umbral"),
+        ("l2", "p95_ms", "umbral"),
+    }
+
+
+def test_tolerancia_solo_para_latencias():
+    base = _resultado()
+    # +10% de p95 entra en la tolerancia del 20%; una consulta más no
+    assert _regresiones(_resultado(p95_ms=22.0), base=base) == set()
+    assert _regresiones(_resultado(p95_ms=25.0), base=base) == {("fria", "p95_ms", "base")}
+    assert _regresiones(_resultado(consultas=3), base=base) == {("fria", "consultas", "base")}
+    assert _regresiones(_resultado(p95_ms=25.0), base=base, tolerancia=0.5) == set()
+
+
+def test_escenario_nuevo_sin_base():
+    base = {"escenarios": {}}
+    assert comprobar_regresiones(_resultado(consultas=50), base=base) == []
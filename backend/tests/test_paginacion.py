@@ -0,0 +1,217 @@
+"""Cursores y consultas de la paginación por cursor."""
+import asyncio
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from bdns_core.db.models import Concesion as ConcesionModel
+from bdns_portal.cache.codec import a_primitivo
+from bdns_portal.core.config import get_settings
+from bdns_portal.graphql.resolvers import paginacion
+from bdns_portal.graphql.inputs import PaginationInput
+from bdns_portal.graphql.resolvers.paginacion import (
+    ClaveOrden,
+    _despues_de,
+    codificar_cursor,
+    decodificar_cursor,
+    ordenacion,
+    paginar
+)
+from bdns_portal.sintetico.generador import ParametrosGeneracion, _particiones
+
+from .bd import conexion, requiere_bd, sql_literal, tablas_recorridas
+
+CLAVES = ordenacion(
+    ConcesionModel, None,
+    por_defecto=[ClaveOrden("fecha_concesion", ConcesionModel.fecha_concesion, descendente=True)]
+)
+
+
+def _cursor(datos) -> str:
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+
+def _manipulado(valor, sustituto) -> str:
+    primitivo = a_primitivo(valor)
+    primitivo["valor"] = sustituto
+    return _cursor({"t": "concesion", "o": "fecha_concesion:desc,id:desc", "k": [primitivo, None]})
+
+
+def test_cursor_ida_y_vuelta():
+    claves = CLAVES + [ClaveOrden("importe", ConcesionModel.importe_nominal)]
+    valores = [date(2024, 2, 29), uuid4(), Decimal("1234.56")]
+    assert decodificar_cursor(codificar_cursor("concesion", claves, valores), "concesion", claves) == valores
+
+    con_nulo = [date(2024, 2, 29), uuid4(), None]
+    assert decodificar_cursor(codificar_cursor("concesion", claves, con_nulo), "concesion", claves) == con_nulo
+
+
+@pytest.mark.parametrize("cursor", [
+    "no es base64!",
+    base64.urlsafe_b64encode(b"no es json").decode(),
+    _cursor([1, 2]),
+    _cursor({"t": "concesion", "o": "fecha_concesion:desc,id:desc", "k": 7}),
+    # Decimal("x") lanza InvalidOperation y UUID(7) AttributeError, no ValueError
+    _manipulado(Decimal("1"), "x"),
+    _manipulado(uuid4(), 7),
+    _manipulado(date(2024, 1, 1), "2024-13-45"),
+])
+def test_cursor_manipulado_es_value_error(cursor):
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor, "concesion", CLAVES)
+
+
+def test_cursor_de_otra_ordenacion():
+    cursor = codificar_cursor("concesion", CLAVES, [date(2024, 1, 1), uuid4()])
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor, "concesion", [c.invertida() for c in CLAVES])
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor, "convocatoria", CLAVES)
+
+
+def test_cota_sobre_la_primera_clave():
+    desc = sql_literal(_despues_de(CLAVES, [date(2023, 6, 1), uuid4()]))
+    assert desc.startswith("bdns.concesion.fecha_concesion <= '2023-06-01'")
+
+    asc = sql_literal(_despues_de([c.invertida() for c in CLAVES], [date(2023, 6, 1), uuid4()]))
+    assert asc.startswith("bdns.concesion.fecha_concesion >= '2023-06-01'")
+
+
+def test_sin_cota_si_los_nulos_van_detras():
+    # En ASC los NULL quedan después del cursor: c1 >= v1 los perdería
+    claves = [ClaveOrden("importe", ConcesionModel.importe_nominal), ClaveOrden("id", ConcesionModel.id)]
+    sql = sql_literal(_despues_de(claves, [10.0, uuid4()]))
+    assert "IS NULL" in sql
+    assert not sql.startswith("bdns.concesion.importe_nominal >= 10.0")
+
+
+class _Sesion:
+    def __init__(self):
+        self.consultas = []
+
+    async def execute(self, consulta):
+        self.consultas.append(consulta)
+        return SimpleNamespace(unique=lambda: SimpleNamespace(all=lambda: []))
+
+
+def _campo(nombre: str, *selecciones):
+    return SimpleNamespace(name=nombre, selections=list(selecciones))
+
+
+def _paginar(pagination, selecciones=(), exacto=False):
+    db = _Sesion()
+    info = SimpleNamespace(context={"db": db}, selected_fields=[_campo("concesiones", *selecciones)])
+    conexion = asyncio.run(paginar(
+        info, select(ConcesionModel), CLAVES, pagination, "concesion",
+        conexion=lambda **kw: SimpleNamespace(**kw),
+        arista=lambda **kw: SimpleNamespace(**kw),
+        conteo=select(ConcesionModel.id),
+        exacto=exacto
+    ))
+    return conexion, db.consultas[0]
+
+
+def test_first_cero_es_pagina_vacia():
+    conexion, consulta = _paginar(PaginationInput(first=0))
+    assert conexion.edges == []
+    assert consulta._limit == 1
+
+
+def test_sin_tamano_usa_el_maximo():
+    _, consulta = _paginar(PaginationInput())
+    _, acotada = _paginar(PaginationInput(first=10_000))
+    assert consulta._limit == acotada._limit > 1
+
+
+def test_tamano_negativo():
+    with pytest.raises(ValueError):
+        _paginar(PaginationInput(first=-1))
+
+
+class _SesionConteo:
+    """Sesión de _total: EXPLAIN con filas_estimadas y count(*) con filas."""
+
+    consultas = []
+
+    def __init__(self, filas_estimadas: int, filas: int):
+        self.filas_estimadas = filas_estimadas
+        self.filas = filas
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, consulta):
+        if isinstance(consulta, paginacion._Explain):
+            _SesionConteo.consultas.append("explain")
+            return json.dumps([{"Plan": {"Plan Rows": self.filas_estimadas}}])
+        _SesionConteo.consultas.append("count")
+        return self.filas
+
+
+@pytest.fixture
+def conteo(monkeypatch):
+    monkeypatch.setattr(get_settings(), "GRAPHQL_CONTEO_ESTIMADO_UMBRAL", 10_000)
+    _SesionConteo.consultas = []
+
+    def sesion(filas_estimadas: int, filas: int):
+        monkeypatch.setattr(paginacion, "get_sessionmaker", lambda: _SesionConteo(filas_estimadas, filas))
+
+    return sesion
+
+
+def test_sin_total_no_cuenta(conteo):
+    conteo(filas_estimadas=50_000, filas=49_000)
+    conexion, _ = _paginar(PaginationInput(first=10), [_campo("edges", _campo("node"))])
+    assert _SesionConteo.consultas == []
+    assert conexion.page_info.total_count_estimado is False
+
+
+@pytest.mark.parametrize("seleccion", [
+    _campo("totalCount"),
+    _campo("pageInfo", _campo("totalCount")),
+    _campo("pageInfo", _campo("totalCountEstimado")),
+])
+def test_estimado_por_encima_del_umbral(conteo, seleccion):
+    conteo(filas_estimadas=50_000, filas=49_000)
+    conexion, _ = _paginar(PaginationInput(first=10), [seleccion])
+    assert _SesionConteo.consultas == ["explain"]
+    assert (conexion.total_count, conexion.page_info.total_count_estimado) == (50_000, True)
+
+
+def test_exacto_por_debajo_del_umbral(conteo):
+    conteo(filas_estimadas=900, filas=1_000)
+    conexion, _ = _paginar(PaginationInput(first=10), [_campo("totalCount")])
+    assert _SesionConteo.consultas == ["explain", "count"]
+    assert (conexion.total_count, conexion.page_info.total_count_estimado) == (1_000, False)
+
+
+def test_exacto_pedido_no_estima(conteo):
+    conteo(filas_estimadas=50_000, filas=49_000)
+    conexion, _ = _paginar(PaginationInput(first=10), [_campo("totalCount")], exacto=True)
+    assert _SesionConteo.consultas == ["count"]
+    assert (conexion.total_count, conexion.page_info.total_count_estimado) == (49_000, False)
+
+
+@requiere_bd
+def test_pagina_siguiente_poda_particiones():
+    async def tablas():
+        async with conexion() as conn:
+            await _particiones(conn, ParametrosGeneracion(anio_desde=2021, anio_hasta=2024))
+            await conn.commit()
+            consulta = select(ConcesionModel.id).where(_despues_de(CLAVES, [date(2022, 6, 1), uuid4()]))
+            return await tablas_recorridas(conn, consulta)
+
+    # Orden descendente desde 2022: 2023 y 2024 quedan fuera
+    assert {int(t.split("_")[1]) for t in asyncio.run(tablas())} == {2021, 2022}
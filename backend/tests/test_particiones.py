@@ -0,0 +1,59 @@
+"""Subconsultas por año en paralelo."""
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+from sqlalchemy import select
+
+from bdns_core.db.models import Concesion as ConcesionModel
+from bdns_portal.core.config import get_settings
+from bdns_portal.graphql.resolvers import particiones
+from bdns_portal.graphql.resolvers.particiones import agregar_por_anio, anios_con_datos
+
+
+class _Extremos:
+    def __init__(self, primera, ultima):
+        self.extremos = (primera, ultima)
+
+    async def execute(self, stmt):
+        return SimpleNamespace(one=lambda: self.extremos)
+
+
+def test_anios_de_la_tabla_base():
+    # Un año intermedio sin concesiones también se consulta (vacío)
+    assert asyncio.run(anios_con_datos(_Extremos(date(2021, 3, 1), date(2024, 1, 2)))) == [2021, 2022, 2023, 2024]
+    assert asyncio.run(anios_con_datos(_Extremos(None, None))) == []
+
+
+class _Sesion:
+    en_curso = 0
+    maximo = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        _Sesion.en_curso += 1
+        _Sesion.maximo = max(_Sesion.maximo, _Sesion.en_curso)
+        await asyncio.sleep(0.01)
+        _Sesion.en_curso -= 1
+        return SimpleNamespace(all=lambda: [])
+
+
+def test_concurrencia_acotada_entre_peticiones(monkeypatch):
+    async def anios(db):
+        return list(range(2010, 2025))
+
+    monkeypatch.setattr(particiones, "anios_con_datos", anios)
+    monkeypatch.setattr(particiones, "get_sessionmaker", lambda: _Sesion)
+    _Sesion.maximo = 0
+    stmt = select(ConcesionModel.id)
+
+    async def peticiones():
+        await asyncio.gather(*(agregar_por_anio(None, stmt, clave=lambda fila: 0) for _ in range(5)))
+
+    asyncio.run(peticiones())
+    assert _Sesion.maximo == get_settings().ESTADISTICAS_PARALELO
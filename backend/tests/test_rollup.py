@@ -0,0 +1,139 @@
+"""Tablas de rollup y su refresco."""
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import extract, func, select, text, update
+
+from bdns_core.db.models import Concesion as ConcesionModel
+from bdns_portal.rollup import (
+    refresh_rollups,
+    refresh_rollups_incremental,
+    rollup_actividad_beneficiario,
+    rollup_beneficiarios_hll,
+    rollup_concesion_mensual,
+    tables
+)
+from bdns_portal.rollup import __main__ as cli
+from bdns_portal.rollup.refresh import _huella, _ultima_marca_agua
+
+from .bd import requiere_bd, sesion, sql_literal
+
+
+class _Sesion:
+    def __init__(self, existe: bool):
+        self.existe = existe
+        self.consultas = 0
+
+    async def scalar(self, stmt):
+        self.consultas += 1
+        return self.existe
+
+
+def test_hll_disponible_se_comprueba_una_vez(monkeypatch):
+    monkeypatch.setattr(tables, "_hll_disponible", None)
+    sesion = _Sesion(existe=False)
+
+    async def comprobar():
+        return [await tables.hll_disponible(sesion) for _ in range(3)]
+
+    assert asyncio.run(comprobar()) == [False, False, False]
+    assert sesion.consultas == 1
+
+
+async def _contenido(db) -> dict:
+    tablas = {
+        "mensual": select(rollup_concesion_mensual),
+        "actividad": select(rollup_actividad_beneficiario),
+    }
+    if await tables.hll_disponible(db):
+        sketch = rollup_beneficiarios_hll.c
+        tablas["hll"] = select(
+            sketch.anio, sketch.region_id, sketch.organo_id, func.hll_cardinality(sketch.beneficiarios)
+        )
+    return {nombre: set((await db.execute(stmt)).all()) for nombre, stmt in tablas.items()}
+
+
+@requiere_bd
+def test_incremental_igual_a_completo(bd_sintetica):
+    async def probar():
+        async with sesion() as db:
+            # date_trunc de un día 1 cae en el mes anterior si se pasa por UTC
+            await db.execute(text("SET TIME ZONE 'Europe/Madrid'"))
+            await refresh_rollups(db)
+            marca = await _ultima_marca_agua(db)
+
+            primeros_de_mes = (await db.execute(
+                select(ConcesionModel.id)
+                .where(extract('day', ConcesionModel.fecha_concesion) == 1)
+                .order_by(ConcesionModel.id)
+                .limit(20)
+            )).scalars().all()
+            assert primeros_de_mes
+
+            # La mitad como una carga normal y la otra como una transacción
+            # que confirma después del refresco con marcas de tiempo anteriores
+            for ids, updated_at in (
+                (primeros_de_mes[::2], marca + timedelta(seconds=1)),
+                (primeros_de_mes[1::2], marca - timedelta(seconds=60)),
+            ):
+                await db.execute(
+                    update(ConcesionModel)
+                    .where(ConcesionModel.id.in_(ids))
+                    .values(
+                        importe_nominal=func.coalesce(ConcesionModel.importe_nominal, 0) + 1000,
+                        updated_at=updated_at
+                    )
+                )
+            await db.commit()
+
+            await refresh_rollups_incremental(db)
+            incremental = await _contenido(db)
+            await refresh_rollups(db)
+            completo = await _contenido(db)
+        return incremental, completo
+
+    incremental, completo = asyncio.run(probar())
+    assert incremental == completo
+
+
+class _SesionHuella:
+    def __init__(self):
+        self.consultas = []
+
+    async def execute(self, stmt):
+        self.consultas.append(stmt)
+        return SimpleNamespace(one=lambda: (0, None))
+
+
+def test_huella_de_las_celdas_reemplazadas():
+    db = _SesionHuella()
+    mensual = rollup_concesion_mensual.c
+    asyncio.run(_huella(db, rollup_concesion_mensual, mensual.anio == 2024))
+    sql = sql_literal(db.consultas[0])
+    assert "hashtextextended(CAST(rollup_concesion_mensual AS TEXT), 0)" in sql
+    assert sql.endswith("WHERE bdns.rollup_concesion_mensual.anio = 2024")
+
+
+@requiere_bd
+def test_sin_datos_nuevos_no_se_publica_version(bd_sintetica, monkeypatch):
+    publicadas = []
+
+    async def publicar():
+        publicadas.append(True)
+
+    monkeypatch.setattr(cli, "_publicar_version", publicar)
+    monkeypatch.setattr(cli, "get_sessionmaker", lambda: sesion)
+
+    async def pasadas():
+        # La primera deja los rollups al dia; las siguientes solo
+        # reescriben las celdas del solape, iguales que estaban
+        await cli._run(completo=False)
+        publicadas.clear()
+        await cli._run(completo=False)
+        await cli._run(completo=False)
+        async with sesion() as db:
+            return await refresh_rollups_incremental(db)
+
+    assert asyncio.run(pasadas()) == {}
+    assert publicadas == []
@@ -0,0 +1,48 @@
+"""Carga de columnas y relaciones según la selección GraphQL."""
+from types import SimpleNamespace
+
+from bdns_core.db.models import Convocatoria
+from bdns_portal.graphql.resolvers.convocatoria import CARGA_CONVOCATORIA
+from bdns_portal.graphql.seleccion import opciones_carga, rutas_bajo, rutas_seleccionadas
+
+
+def _campo(nombre: str, *selecciones):
+    return SimpleNamespace(name=nombre, selections=list(selecciones))
+
+
+def _info(*nodo):
+    """info de convocatorias { edges { node { ...nodo } } }."""
+    return SimpleNamespace(selected_fields=[_campo("convocatorias", _campo("edges", _campo("node", *nodo)))])
+
+
+def _cargas(info) -> tuple:
+    """(relaciones con carga ansiosa, columnas de Convocatoria leídas)."""
+    rutas = rutas_bajo(rutas_seleccionadas(info), "edges.node")
+    relaciones, columnas = set(), set()
+    for opcion in opciones_carga(Convocatoria, CARGA_CONVOCATORIA, rutas):
+        for elemento in opcion.context:
+            ruta = elemento.path.path
+            if dict(elemento.strategy or ()).get("lazy"):
+                relaciones.add(ruta[1].key)
+            elif len(ruta) == 2 and dict(elemento.strategy).get("deferred") is False:
+                columnas.add(ruta[1].key)
+    return relaciones, columnas
+
+
+def test_solo_titulo_no_carga_documentos_ni_anuncios():
+    relaciones, columnas = _cargas(_info(_campo("titulo")))
+    assert relaciones == set()
+    assert columnas == {"id", "titulo"}
+
+
+def test_documentos_solo_si_se_piden():
+    relaciones, _ = _cargas(_info(_campo("titulo"), _campo("documentos", _campo("nombre"))))
+    assert relaciones == {"documentos"}
+    assert "anuncios" not in relaciones
+
+
+def test_organo_por_cargador_solo_su_clave():
+    relaciones, columnas = _cargas(_info(_campo("organo", _campo("nombre"))))
+    # Lo resuelve el DataLoader: sin JOIN, pero con organo_id para la clave
+    assert relaciones == set()
+    assert "organo_id" in columnas
@@ -0,0 +1,98 @@
+"""Campos raíz resueltos a la vez, cada uno con su sesión."""
+import asyncio
+from types import SimpleNamespace
+
+from bdns_portal.graphql import sesiones
+from bdns_portal.graphql.cargadores import Cargadores
+from bdns_portal.graphql.resolvers import estadisticas
+from bdns_portal.graphql.schema import Query, schema
+from bdns_portal.graphql.sesiones import SesionPropia
+
+
+class _Sesion:
+    """Falla como AsyncSession si recibe dos operaciones a la vez."""
+
+    abiertas = []
+
+    def __init__(self):
+        self.ocupada = False
+        self.cerrada = False
+        _Sesion.abiertas.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def close(self):
+        self.cerrada = True
+
+    async def execute(self, stmt):
+        if self.ocupada:
+            raise RuntimeError("operacion concurrente en la misma sesion")
+        self.ocupada = True
+        await asyncio.sleep(0.01)
+        self.ocupada = False
+        return SimpleNamespace(all=lambda: [])
+
+
+def test_campos_raiz_con_sesiones_distintas(monkeypatch):
+    monkeypatch.setattr(sesiones, "get_sessionmaker", lambda: _Sesion)
+    # Por encima del top canónico no hay cache: cada campo consulta con sesion(info)
+    monkeypatch.setattr(estadisticas, "TOP_K_CANONICO", 5)
+    _Sesion.abiertas = []
+    compartida = _Sesion()
+
+    consulta = """
+        {
+          a: concentracionSubvenciones(limite: 10) { beneficiarioId }
+          b: concentracionSubvenciones(limite: 20, anio: 2024) { beneficiarioId }
+          c: concentracionSubvenciones(limite: 30, tipoEntidad: "publica") { beneficiarioId }
+        }
+    """
+    resultado = asyncio.run(schema.execute(consulta, context_value={"db": compartida, "cargadores": Cargadores(_Sesion)}))
+
+    assert resultado.errors is None
+    assert resultado.data == {"a": [], "b": [], "c": []}
+    assert len(_Sesion.abiertas) == 4
+    assert not compartida.ocupada
+    # Las de los campos se cierran al terminar; la del contexto no es suya
+    assert all(s.cerrada for s in _Sesion.abiertas[1:])
+    assert not compartida.cerrada
+
+
+def test_sesion_solo_si_el_campo_la_usa(monkeypatch):
+    monkeypatch.setattr(sesiones, "get_sessionmaker", lambda: _Sesion)
+    infos = []
+
+    async def sin_consultar(info, cache_key, calcular, etiquetas=()):
+        infos.append(info)
+        return []
+
+    # Dentro del top canónico el resolver no toca la sesión de la petición
+    monkeypatch.setattr(estadisticas, "_cacheado", sin_consultar)
+    _Sesion.abiertas = []
+    contexto = {"cargadores": Cargadores(_Sesion)}
+
+    consulta = "{ a: concentracionSubvenciones { beneficiarioId } b: estadisticasPorRegimen { regimen } }"
+    resultado = asyncio.run(schema.execute(consulta, context_value=contexto))
+
+    assert resultado.errors is None
+    assert _Sesion.abiertas == []
+    # Cada resolver recibe el Info de Strawberry, con el contexto compartido
+    assert len(infos) == 2
+    assert all(info.context is contexto for info in infos)
+    assert contexto[sesiones.SESIONES] == {}
+
+
+def test_fuera_de_un_campo_raiz_usa_la_del_contexto():
+    db = object()
+    assert sesiones.sesion(SimpleNamespace(context={"db": db})) is db
+
+
+def test_todos_los_campos_raiz_abren_sesion():
+    campos = Query.__strawberry_definition__.fields
+    assert campos
+    sin_sesion = [c.name for c in campos if not any(isinstance(e, SesionPropia) for e in c.extensions)]
+    assert sin_sesion == []
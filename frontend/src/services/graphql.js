@@ -12,6 +12,9 @@ import {
 // Configurar el cliente GraphQL
 const API_URL = import.meta.env.VITE_GRAPHQL_URL || 'http://localhost:8001/graphql';
 
+// Maximo de elementos por pagina que acepta la API (GRAPHQL_MAX_PAGINA)
+export const MAX_PAGINA = 100;
+
 const client = new GraphQLClient(API_URL, {
   headers: {
     'Content-Type': 'application/json',
@@ -198,7 +201,7 @@ export async function fetchEstadisticasPorTipoEntidad() {
   }
 }
 
-export async function fetchConcesiones(filtros = {}, limite = 100, offset = 0) {
+export async function fetchConcesiones(filtros = {}, limite = MAX_PAGINA, offset = 0) {
   try {
     const data = await client.request(queries.concesiones, {
       filtros: filtros || undefined,
@@ -222,7 +225,7 @@ export async function fetchConcesionById(id) {
   }
 }
 
-export async function fetchConcesionesPorBeneficiario(beneficiario_id, anio = null, limite = 100, offset = 0) {
+export async function fetchConcesionesPorBeneficiario(beneficiario_id, anio = null, limite = MAX_PAGINA, offset = 0) {
   try {
     const data = await client.request(queries.concesionesPorBeneficiario, {
       beneficiario_id,
@@ -237,7 +240,7 @@ export async function fetchConcesionesPorBeneficiario(beneficiario_id, anio = nu
   }
 }
 
-export async function fetchBeneficiarios(filtros = {}, limite = 100, offset = 0) {
+export async function fetchBeneficiarios(filtros = {}, limite = MAX_PAGINA, offset = 0) {
   try {
     const data = await client.request(queries.beneficiarios, {
       filtros: filtros || undefined,